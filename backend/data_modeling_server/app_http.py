@@ -9,16 +9,21 @@ for stream in (sys.stdin, sys.stdout, sys.stderr):
     except Exception:
         pass
 
+from contextlib import asynccontextmanager
+
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
+from database import close_all_pools
+from ipc import close_ipc_client
 from middlewares import (
     ErrorHandlingMiddleware,
     ExecutionTimeMiddleware,
     LoggingMiddleware,
     AbortOnDisconnectMiddleware,
+    LlmCacheMiddleware,
 )
 from routes import (
     collection_routes,
@@ -44,7 +49,17 @@ from routes.states import (
 
 load_dotenv()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        yield
+    finally:
+        # Write out progress and log lines still queued for the IPC server.
+        await close_ipc_client()
+        close_all_pools()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -54,6 +69,7 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+app.add_middleware(LlmCacheMiddleware)
 app.add_middleware(AbortOnDisconnectMiddleware)
 app.add_middleware(ExecutionTimeMiddleware)
 app.add_middleware(ErrorHandlingMiddleware)
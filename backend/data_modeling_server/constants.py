@@ -13,6 +13,42 @@ TRANSMISSION_RPC_URL = "http://localhost:9091/transmission/rpc"
 OLLAMA_API_BASE = "http://localhost:11434"
 CHROMA_PORT = 8000
 
+# Budgets shared by every backend process (see services/llm_scheduler.py).
+# requests_per_minute=None disables the token bucket, max_concurrency=None disables the slot limit.
+LLM_PROVIDER_LIMITS = {
+    "ollama": {"max_concurrency": 2, "requests_per_minute": None, "burst": 1},
+    "openai": {"max_concurrency": 5, "requests_per_minute": 20, "burst": 3},
+    "google": {"max_concurrency": 5, "requests_per_minute": 20, "burst": 3},
+    "vertexai": {"max_concurrency": 5, "requests_per_minute": 20, "burst": 3},
+}
+
+# Texts per embedding request when context files are added to a vector store.
+EMBEDDING_BATCH_SIZES = {"ollama": 64, "openai": 2048, "google": 100, "vertexai": 250, "default": 64}
+
+# Embeddings of every provider, stored in EMBEDDING_CACHE_PATH (see services/embedding_cache.py). Vectors are
+# stored as dtype ("float32" or "float16"); past max_bytes the least recently used ones go first.
+EMBEDDING_CACHE = {"max_bytes": 512 * 1024 * 1024, "dtype": "float32", "evict_every": 500}
+
+# Responses to identical prompts (see services/llm_response_cache.py). Entries older than max_age_days
+# are ignored and evicted; past max_entries the least recently used entries go first.
+LLM_RESPONSE_CACHE = {"max_entries": 20000, "max_age_days": 30, "evict_every": 200}
+
+# Post-level work pools of the coding routes (see utils/work_pool.py). Per LLM slot of the queue manager,
+# posts_per_slot posts are coded at once, and new posts wait while more than backlog_per_slot jobs are unresolved.
+CODING_WORK_POOL = {"posts_per_slot": 2, "backlog_per_slot": 4, "prefetch_per_consumer": 2}
+
+# In-memory progress of long-running functions (see services/progress_tracker.py) is written to
+# function_progress and pushed to the app at most once per flush_interval_ms.
+FUNCTION_PROGRESS = {"flush_interval_ms": 500}
+
+# Per app websocket (see routes/websocket_routes.py): frames are written at most max_flush_hz times a second,
+# and at most max_queued log/error lines wait per app before the oldest are dropped.
+WS_EVENTS = {"max_flush_hz": 10, "max_queued": 500}
+
+# Per Chroma collection and process (see services/retriever_service.py): top-k results and query embeddings
+# kept in memory.
+RETRIEVER_CACHE = {"max_results": 1000, "max_embeddings": 5000}
+
 RANDOM_SEED = 42
 
 def get_app_data_path() -> str:
@@ -34,9 +70,27 @@ CONTEXT_FILES_DIR = os.path.join(get_app_data_path(), APP_NAME, "executables", "
 DATABASE_DIR = os.path.join(get_app_data_path(), APP_NAME, "executables", "databases")
 DATABASE_PATH = os.path.join(DATABASE_DIR, "main.db")
 STUDY_DATABASE_PATH = os.path.join(DATABASE_DIR, "study.db")
+EMBEDDING_CACHE_PATH = os.path.join(DATABASE_DIR, "embedding_cache.db")
 LOG_FILE = os.path.join(get_app_data_path(), APP_NAME, "executables", "logs.jsonl")
 TEMP_DIR = os.path.join(get_app_data_path(), APP_NAME, "executables", "temp")
 
+# Request/response log written by middlewares/route_logger.py. Only the first max_body_bytes of a body are
+# kept; sample_rates maps route prefixes to the share of requests logged (polled routes log a sample).
+REQUEST_LOG = {
+    "max_body_bytes": 4096,
+    "max_queue": 10000,
+    "max_file_bytes": 50 * 1024 * 1024,
+    "backup_count": 3,
+    "rotate_retry_seconds": 30,
+    "default_sample_rate": 1.0,
+    "sample_rates": {
+        "/api/miscellaneous/get-function-progress": 0.1,
+        "/api/miscellaneous/db-pool-stats": 0.1,
+        "/api/miscellaneous/llm-cache-stats": 0.1,
+        "/api/miscellaneous/retriever-cache-stats": 0.1,
+    },
+}
+
 exe_ext = ".exe" if os.name == "nt" else ""
 
 PATHS = {
@@ -1,5 +1,6 @@
 import asyncio
 from collections import defaultdict
+import hashlib
 import json
 import os
 import re
@@ -8,16 +9,14 @@ from typing import Any, AsyncGenerator, Callable, Dict, Generator, List, Optiona
 import unicodedata
 from uuid import uuid4
 
-from chromadb import HttpClient
 from fastapi import UploadFile
 
 from chromadb.config import Settings as ChromaDBSettings
-from config import CustomSettings
-from constants import CHROMA_PORT, CONTEXT_FILES_DIR, PATHS
+from constants import CODING_WORK_POOL, CONTEXT_FILES_DIR, EMBEDDING_BATCH_SIZES, PATHS
+from controllers.collection_controller import get_reddit_posts_by_ids
 from database import( 
     QectRepository, SelectedPostIdsRepository
 )
-from database.llm_pending_tasks import LlmPendingTaskRepository
 from decorators import log_execution_time
 from errors.request_errors import RequestError
 from ipc import send_ipc_message
@@ -33,13 +32,15 @@ from langchain_core.prompts import ChatPromptTemplate
 from starlette.concurrency import run_in_threadpool
 
 from services.llm_service import GlobalQueueManager
+from services.llm_response_cache import llm_cache_context
+from services.retriever_service import get_chroma_client, invalidate_retriever_cache
 from database import LlmResponsesRepository
 from utils.prompts import TopicClustering
+from utils.token_counter import get_token_counter
 
 llm_responses_repo = LlmResponsesRepository()
 qect_repo = QectRepository()
 selected_post_ids_repo = SelectedPostIdsRepository()
-pending_task_repo  = LlmPendingTaskRepository()
 
 def get_temperature_and_random_seed():
     with open(PATHS["settings"], "r") as f:
@@ -48,22 +49,24 @@ def get_temperature_and_random_seed():
 
 
 def initialize_vector_store(workspace_id: str, model: str, embeddings: Any):
-    chroma_client = HttpClient(host="localhost", port=CHROMA_PORT)
-    print("DB name:", f"{workspace_id.replace('-','_')}_{model.replace(':','_')}"[:60]+"0")
     vector_store = Chroma(
         embedding_function=embeddings,
         collection_name=f"{workspace_id.replace('-','_')}_{model.replace(':','_')}"[:60]+"0",
-        client=chroma_client,
+        client=get_chroma_client(),
         client_settings=ChromaDBSettings(anonymized_telemetry=False)
     )
     return vector_store
 
+def chunk_id(file_name: str, content: str) -> str:
+    # Stable Chroma id of a context file chunk: the same text of the same file always maps to the same vector.
+    return hashlib.sha256(f"{file_name}\0{content}".encode("utf-8")).hexdigest()
+
+
 @log_execution_time()
-async def save_context_files(app_id: str, workspace_id: str, contextFiles: List[UploadFile], vector_store: Chroma):
+async def save_context_files(app_id: str, workspace_id: str, contextFiles: List[UploadFile], vector_store: Chroma, llm_model: str = ""):
     text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
     
     await send_ipc_message(app_id, f"Dataset {workspace_id}: Uploading files...")
-    await asyncio.sleep(5)
 
     print(f"Processing context files for dataset {workspace_id}..., num files: {len(contextFiles)}")
 
@@ -78,11 +81,10 @@ async def save_context_files(app_id: str, workspace_id: str, contextFiles: List[
         if os.path.isfile(file_path) and file.startswith(workspace_id):
             os.remove(file_path)
 
-    for file in contextFiles:
+    async def split_file(file: UploadFile) -> List[Any]:
         retries = 3
-        success = False
         file_content = await file.read()
-        while retries > 0 and not success:
+        while True:
             try:
                 file_name = file.filename
 
@@ -90,10 +92,6 @@ async def save_context_files(app_id: str, workspace_id: str, contextFiles: List[
                 with open(temp_file_path, "wb") as temp_file:
                     temp_file.write(file_content)
 
-                print("Temp file path:", temp_file_path)
-                if not os.path.exists(temp_file_path):
-                    print("File does not exist!")
-
                 ext = file_name.split('.')[-1].lower()
                 if ext == "pdf":
                     loader = PyPDFLoader(temp_file_path)
@@ -105,11 +103,7 @@ async def save_context_files(app_id: str, workspace_id: str, contextFiles: List[
                     raise ValueError(f"Unsupported file type: {ext}")
 
                 docs = await run_in_threadpool(loader.load)
-                chunks = await run_in_threadpool(text_splitter.split_documents, docs)
-                await run_in_threadpool(vector_store.add_documents, chunks)
-
-                success = True
-                await send_ipc_message(app_id, f"Dataset {workspace_id}: Successfully processed file {file_name}.")
+                return await run_in_threadpool(text_splitter.split_documents, docs)
             except Exception as e:
                 retries -= 1
                 await send_ipc_message(app_id, 
@@ -121,6 +115,38 @@ async def save_context_files(app_id: str, workspace_id: str, contextFiles: List[
                     )
                     raise e
 
+    split_files = await asyncio.gather(*(split_file(file) for file in contextFiles))
+
+    # Chunks are identified by content, so chunks already in the collection keep their vectors and only new
+    # or changed ones are embedded. Repeated chunks within the upload are embedded once. The upload is the
+    # workspace's whole set of context files, so chunks of edited or removed files are deleted afterwards.
+    chunks_by_id: Dict[str, Any] = {}
+    for file, chunks in zip(contextFiles, split_files):
+        for chunk in chunks:
+            chunks_by_id.setdefault(chunk_id(file.filename, chunk.page_content), chunk)
+
+    ids = list(chunks_by_id)
+    existing_ids = set((await run_in_threadpool(vector_store.get, include=[]))["ids"])
+    new_ids = [cid for cid in ids if cid not in existing_ids]
+    stale_ids = list(existing_ids - set(ids))
+
+    provider = llm_model.split("-", 1)[0] if llm_model else None
+    batch_size = EMBEDDING_BATCH_SIZES.get(provider, EMBEDDING_BATCH_SIZES["default"])
+    for i in range(0, len(new_ids), batch_size):
+        batch_ids = new_ids[i:i + batch_size]
+        await run_in_threadpool(vector_store.add_documents, [chunks_by_id[cid] for cid in batch_ids], ids=batch_ids)
+    for i in range(0, len(stale_ids), 1000):
+        await run_in_threadpool(vector_store.delete, ids=stale_ids[i:i + 1000])
+
+    for file in contextFiles:
+        await send_ipc_message(app_id, f"Dataset {workspace_id}: Successfully processed file {file.filename}.")
+    print(
+        f"Context files for dataset {workspace_id}: {len(ids)} chunks, {len(new_ids)} embedded, "
+        f"{len(ids) - len(new_ids)} reused, {len(stale_ids)} removed"
+    )
+
+    if new_ids or stale_ids:
+        invalidate_retriever_cache(vector_store._collection.name)
     await send_ipc_message(app_id, f"Dataset {workspace_id}: Files uploaded successfully.")
     await asyncio.sleep(1)
 
@@ -146,6 +172,7 @@ async def process_llm_task(
     llm_queue_manager: GlobalQueueManager = None,
     cacheable_args: Optional[Dict[str, Any]] = None,
     raise_error: bool = False,
+    use_cache: Optional[bool] = None,
     **prompt_params
 ):
     max_retries = retries
@@ -153,6 +180,7 @@ async def process_llm_task(
     extracted_data = None
     if not function_id:
         function_id = str(uuid4()) 
+    provider = llm_model.split("-", 1)[0] if llm_model else None
 
     await send_ipc_message(app_id, f"Dataset {workspace_id}: LLM process started...")
 
@@ -176,17 +204,20 @@ async def process_llm_task(
                 question_answer_chain = create_stuff_documents_chain(llm=llm_instance, prompt=prompt_template)
                 rag_chain = create_retrieval_chain(retriever=retriever, combine_docs_chain=question_answer_chain)
 
-                job_id, response_future = await llm_queue_manager.submit_task(rag_chain.invoke, function_id,{"input": input_text})  
+                job_id, response_future = await llm_queue_manager.submit_task(rag_chain.invoke, function_id,{"input": input_text}, provider=provider)  
             else:
                 if not prompt_builder_func:
                     raise ValueError("Standard LLM invocation requires a 'prompt_builder_func'.")
 
                 await send_ipc_message(app_id, f"Dataset {workspace_id}: Running direct LLM task...")
 
+                # use_cache=None follows the request's X-LLM-Cache header; False forces a fresh call. Retries always
+                # go to the model so a cached response that failed to parse is replaced rather than served again.
+                cache_context = llm_cache_context(workspace_id, llm_model, llm_instance, use_cache if retries == max_retries else False)
                 print("Cacheable Args in collector", cacheable_args)
                 if cacheable_args:
                     cacheable_args["kwargs"].append("prompt_builder_func")
-                    job_id, response_future = await llm_queue_manager.submit_task(llm_instance.invoke, function_id, cacheable_args=cacheable_args, **prompt_params, prompt_builder_func=prompt_builder_func)
+                    job_id, response_future = await llm_queue_manager.submit_task(llm_instance.invoke, function_id, cacheable_args=cacheable_args, provider=provider, cache_context=cache_context, **prompt_params, prompt_builder_func=prompt_builder_func)
                 else:
                     prompt_text = prompt_builder_func(**prompt_params)
                     print("Prompt Text", prompt_text)
@@ -194,24 +225,15 @@ async def process_llm_task(
                         async for chunk in llm_instance.stream(prompt_text):
                             await send_ipc_message(app_id, f"Dataset {workspace_id}: {chunk}")
                     else:
-                       job_id, response_future = await llm_queue_manager.submit_task(llm_instance.invoke, function_id, prompt_text)
+                       job_id, response_future = await llm_queue_manager.submit_task(llm_instance.invoke, function_id, prompt_text, provider=provider, cache_context=cache_context)
 
-            
-            while True:
-                rec = pending_task_repo.find_one({"task_id": job_id}, fail_silently=True)
-                if rec is None:
-                    raise RuntimeError(f"LLM task {job_id} vanished from the DB")
-                status = rec.status
 
-                if status == "completed":
-                    break
-
-                if status in ("failed", "cancelled"):
-                    error = getattr(rec, "error", "unknown")
-                    raise RuntimeError(f"LLM task {job_id} {status}: {error}")
-
-                await asyncio.sleep(15)
-            response = await asyncio.wait_for(response_future, timeout=CustomSettings().ai.cutoff)
+            # The queue worker resolves the future as soon as the job finishes (or fails,
+            # times out, is cancelled); the llm_pending_task row is kept only as an audit trail.
+            try:
+                response = await response_future
+            except Exception as e:
+                raise RuntimeError(f"LLM task {job_id} failed: {e}") from e
             response = response["answer"] if retriever else response.text
 
             match = re.search(regex_pattern, response, re.DOTALL)
@@ -286,6 +308,30 @@ def filter_codes_by_transcript(workspace_id: str, codes: list[dict], transcript:
     return duplicate_filtered_codes
 
 
+def split_packed_codes(parsed: Any, post_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    # Demultiplexes a multi-post coding response ({"posts": [{"post_id", "codes"}]}) into codes per post.
+    # Posts the model left out are missing from the result so the caller can code them on their own.
+    if isinstance(parsed, dict):
+        entries = parsed.get("posts", [])
+    elif isinstance(parsed, list):
+        entries = parsed
+    else:
+        return {}
+    if isinstance(entries, dict):
+        entries = [{"post_id": post_id, **(value if isinstance(value, dict) else {"codes": value})} for post_id, value in entries.items()]
+
+    wanted = set(post_ids)
+    codes_by_post: Dict[str, List[Dict[str, Any]]] = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        post_id = str(entry.get("post_id", "")).strip()
+        codes = entry.get("codes", [])
+        if post_id not in wanted or not isinstance(codes, list):
+            continue
+        codes_by_post.setdefault(post_id, []).extend(code for code in codes if isinstance(code, dict))
+    return codes_by_post
+
 def filter_duplicate_codes(codes: List[Dict[str, Any]], parent_function_name: str, workspace_id: str, function_id: str = None) -> List[Dict[str, Any]]:
     seen_pairs = set()
     filtered_codes = []
@@ -523,7 +569,7 @@ async def cluster_words_with_llm(
 
 
 def get_num_tokens(text: str, llm_instance: Any) -> int:
-    return llm_instance.get_num_tokens(text)
+    return get_token_counter(llm_instance).count(text)
 
 def truncate_text(text: str, max_tokens: int, llm_instance: Any) -> str:
     tokens = llm_instance.tokenize(text)
@@ -537,22 +583,17 @@ async def stream_qect_pages(
     codebook_types: List[int],
     page_size: int = 500
 ) -> AsyncGenerator[List[Dict[str, Any]], None]:
-    table = qect_repo.table_name
     types_placeholders = ", ".join("?" for _ in codebook_types)
-    base_sql = (
-        f"SELECT * FROM {table} "
-        f"WHERE workspace_id = ? AND codebook_type IN ({types_placeholders}) AND is_marked = 1 "
-        f"ORDER BY rowid "
-        f"LIMIT ? OFFSET ?"
+    pages = qect_repo.iter_pages(
+        f"workspace_id = ? AND codebook_type IN ({types_placeholders}) AND is_marked = 1",
+        (workspace_id, *codebook_types),
+        page_size=page_size,
     )
-    offset = 0
     while True:
-        params = [workspace_id, *codebook_types, page_size, offset]
-        rows = qect_repo.execute_raw_query(base_sql, tuple(params), keys=True)
-        if not rows:
+        rows = await asyncio.to_thread(next, pages, None)
+        if rows is None:
             break
         yield rows
-        offset += len(rows)
 
 async def summarize_with_llm(
     workspace_id: str,
@@ -586,17 +627,19 @@ async def summarize_with_llm(
 
     prompt_fn = prompt_builder_func or generic_prompt_builder
 
+    count_tokens = get_token_counter(llm_instance)
+
     def build_chunk(texts: List[str], max_tokens: int):
         fixed = prompt_fn(**{**kwargs, 'texts': []})
-        fixed_t = llm_instance.get_num_tokens(fixed)
-        sep = "\n\n"; sep_t = llm_instance.get_num_tokens(sep)
+        fixed_t = count_tokens(fixed)
+        sep = "\n\n"; sep_t = count_tokens(sep)
         chunk, used = [], 0
         for txt in texts:
-            tkns = llm_instance.get_num_tokens(txt)
+            tkns = count_tokens(txt)
             # if one piece too big, truncate it
             if fixed_t + (sep_t if chunk else 0) + tkns > max_tokens:
                 txt = truncate_text(txt, max_tokens - fixed_t - (sep_t if chunk else 0), llm_instance)
-                tkns = llm_instance.get_num_tokens(txt)
+                tkns = count_tokens(txt)
             if fixed_t + used + (sep_t if chunk else 0) + tkns > max_tokens:
                 break
             if chunk:
@@ -682,12 +725,13 @@ def split_into_batches(
         "```json\n{\"CODE1\": \"...\", \"CODE2\": \"...\"}\n```"
         "\n\n"
     )
-    fixed_t = llm_instance.get_num_tokens(fixed)
+    count_tokens = get_token_counter(llm_instance)
+    fixed_t = count_tokens(fixed)
     batches, cur, cur_t = [], [], fixed_t
 
     for code, exps in codes.items():
         section = f"\"{code}\": [\n" + ",\n".join(f"  {json.dumps(e)}" for e in exps) + "\n],\n"
-        sec_t = llm_instance.get_num_tokens(section)
+        sec_t = count_tokens(section)
         if cur_t + sec_t > max_tokens:
             if cur:
                 batches.append(cur)
@@ -930,24 +974,40 @@ def stream_selected_post_ids(
     responseTypes: List[str],
     page_size: int = 100
 ) -> Generator[list[Any], Any, None]:
-    params = []
-    base_sql = (
-        f"SELECT post_id FROM selected_post_ids "
-        f"WHERE workspace_id = ? AND type IN ({', '.join('?' for _ in responseTypes)}) "
-        f"ORDER BY rowid "
-        f"LIMIT ? OFFSET ?"
+    pages = selected_post_ids_repo.iter_pages(
+        f"workspace_id = ? AND type IN ({', '.join('?' for _ in responseTypes)})",
+        (workspace_id, *responseTypes),
+        columns="post_id",
+        page_size=page_size,
     )
-    params.append(workspace_id)
-    for responseType in responseTypes:
-        params.append(responseType)
-    params.append(page_size)
-    offset = 0
-    params.append(offset)
+    for rows in pages:
+        yield [row["post_id"] for row in rows]
+
+
+async def stream_selected_posts(
+    workspace_id: str,
+    responseTypes: List[str],
+    columns: Optional[List[str]] = None,
+    page_size: int = 100
+) -> AsyncGenerator[tuple[list, Dict[str, Dict[str, Any]]], None]:
+    # Pages of (post_ids, posts by id), read off the event loop so consumers keep running meanwhile.
+    pages = stream_selected_post_ids(workspace_id, responseTypes, page_size)
     while True:
-        params[-1] = offset
-        print("Params", params, "Base SQL", base_sql)
-        rows = selected_post_ids_repo.execute_raw_query(base_sql, tuple(params), keys=True)
-        if not rows:
+        batch = await asyncio.to_thread(next, pages, None)
+        if batch is None:
             break
-        yield [row["post_id"] for row in rows]
-        offset += len(rows)
\ No newline at end of file
+        posts = await asyncio.to_thread(get_reddit_posts_by_ids, workspace_id, batch, columns)
+        yield batch, posts
+
+
+def coding_work_pool_options(llm_queue_manager: GlobalQueueManager, llm_model: str) -> Dict[str, Any]:
+    # run_work_pool settings sized to what the queue manager can run for this model's provider.
+    provider = llm_model.split("-", 1)[0] if llm_model else None
+    slots = llm_queue_manager.capacity(provider)
+    concurrency = slots * CODING_WORK_POOL["posts_per_slot"]
+    max_backlog = slots * CODING_WORK_POOL["backlog_per_slot"]
+    return {
+        "concurrency": concurrency,
+        "queue_size": concurrency * CODING_WORK_POOL["prefetch_per_consumer"],
+        "should_pause": lambda: llm_queue_manager.backlog() >= max_backlog,
+    }
@@ -8,12 +8,9 @@ import os
 from pathlib import Path
 import re
 import shutil
-import subprocess
-import sys
 import tempfile
-import threading
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from uuid import uuid4
 from aiofiles import open as async_open
 import aiofiles
@@ -23,13 +20,14 @@ from dateutil.relativedelta import relativedelta
 
 import config
 from constants import DATASETS_DIR, PATHS, UPLOAD_DIR
-from database import DatasetsRepository, CommentsRepository, PostsRepository, PipelineStepsRepository, FileStatusRepository, TorrentDownloadProgressRepository, SelectedPostIdsRepository
-from decorators.execution_time_logger import log_execution_time
+from database import DatasetsRepository, CommentsRepository, PostsRepository, PipelineStepsRepository, FileStatusRepository, TorrentDownloadProgressRepository, SelectedPostIdsRepository, DumpExtractionsRepository, PostStatsRepository
 from ipc import send_ipc_message
-from models import Dataset, Comment, Post
+from models import Dataset
 from models.table_dataclasses import FileStatus
 from routes.websocket_routes import ConnectionManager
-from utils.coding_helpers import generate_transcript
+from utils.coding_helpers import build_transcript
+from utils.reddit_dump import iter_dump_batches
+from utils.reddit_ingest import COMMENT_COLUMNS, POST_COLUMNS, default_ingest_workers, file_type_for, iter_file_batches, iter_parallel_file_batches, record_to_row
 
 
 
@@ -40,6 +38,11 @@ pipeline_repo = PipelineStepsRepository()
 file_repo = FileStatusRepository()
 progress_repo = TorrentDownloadProgressRepository()
 selected_post_ids_repo = SelectedPostIdsRepository()
+dump_extraction_repo = DumpExtractionsRepository()
+post_stats_repo = PostStatsRepository()
+
+INGEST_BATCH_SIZE = 5000
+INGEST_PROGRESS_EVERY = 50_000
 
 
 def get_current_download_dir():
@@ -250,8 +253,8 @@ def update_run_progress(run_id: str, new_message: str, current_download_dir: str
             file_messages.append(new_message)
             file_repo.update_file_progress(run_id, key, {"messages": json.dumps(file_messages), "status": "extracting"})
 
-    if "JSON extracted:" in new_message:
-        m = re.search(r"JSON extracted:\s+(.*)/(R[S|C]_[\d-]+)\.json", new_message, re.IGNORECASE)
+    if "JSON extracted:" in new_message or "Records ingested:" in new_message:
+        m = re.search(r"(?:JSON extracted|Records ingested):\s+(.*)/(R[S|C]_[\d-]+)\.json", new_message, re.IGNORECASE)
         if m:
             dir_part = m.group(1).strip() 
             rel_dir = os.path.relpath(dir_part, DOWNLOAD_DIR)
@@ -461,34 +464,96 @@ def count_comments(comments):
     return total
 
 def get_reddit_post_by_id(workspace_id: str, post_id: str, columns: list = None):
-    # comment_repo.index_comments()
-    post = post_repo.find(
-        {"workspace_id": workspace_id, "id": post_id}, 
-        columns=columns,
-        map_to_model=not columns
-    )
+    post = next(iter_reddit_posts_with_comments(workspace_id, [post_id], columns), None)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
+    return post
 
-    comments = get_comments_recursive(post_id, workspace_id)
-    return {**post[0], "comments": comments}
-
-@log_execution_time()
-def get_comments_recursive(post_id: str, workspace_id: str):
-
-    comments = comment_repo.get_comments_by_post_optimized(workspace_id, post_id)
-    # print("Comments fetched:", comments)
 
+def build_comment_trees(comments: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    # Assembles the comment trees of any number of posts in one pass over flat rows and returns the
+    # top-level comments per post. Like the old recursive query, comments whose parent is missing are dropped.
     comment_map = {comment["id"]: comment for comment in comments}
-
+    roots: Dict[str, List[Dict[str, Any]]] = {}
     for comment in comments:
         parent_id = comment.get("parent_id")
+        if parent_id is None or parent_id == comment["post_id"]:
+            roots.setdefault(comment["post_id"], []).append(comment)
+        elif parent_id in comment_map:
+            comment_map[parent_id].setdefault("comments", []).append(comment)
+
+    level = [comment for top_level in roots.values() for comment in top_level]
+    depth = 0
+    while level:
+        next_level = []
+        for comment in level:
+            comment["depth"] = depth
+            next_level.extend(comment.get("comments", []))
+        level = next_level
+        depth += 1
+    return roots
+
+
+def iter_reddit_posts_with_comments(
+    workspace_id: str,
+    post_ids: List[str],
+    columns: list = None,
+    chunk_size: int = 500,
+) -> Iterator[Dict[str, Any]]:
+    # Yields posts (in post_ids order, missing ids skipped) with their comment trees attached, loading
+    # each chunk with one posts query and one comments query instead of a recursive CTE per post.
+    for start in range(0, len(post_ids), chunk_size):
+        chunk = post_ids[start:start + chunk_size]
+        posts = post_repo.find({"workspace_id": workspace_id, "id": chunk}, columns=columns, map_to_model=False)
+        by_id = {post["id"]: post for post in posts}
+        trees = build_comment_trees(comment_repo.get_comments_by_posts(workspace_id, list(by_id), chunk_size))
+        for post_id in chunk:
+            post = by_id.get(post_id)
+            if post is not None:
+                yield {**post, "comments": trees.get(post_id, [])}
+
+
+def get_reddit_posts_by_ids(workspace_id: str, post_ids: List[str], columns: list = None) -> Dict[str, Dict[str, Any]]:
+    return {post["id"]: post for post in iter_reddit_posts_with_comments(workspace_id, post_ids, columns)}
+
+
+def compute_post_stats(workspace_id: str, post: Dict[str, Any]) -> Tuple:
+    # One post_stats row (POST_STAT_COLUMNS order) from a post loaded by iter_reddit_posts_with_comments.
+    transcript_length = len(build_transcript(post)["transcript"])
+    comment_count = 0
+    max_depth = 0
+    level = post["comments"]
+    while level:
+        comment_count += len(level)
+        max_depth += 1
+        level = [child for comment in level for child in comment.get("comments", [])]
+    # ~4 characters per token is close enough for stratifying and budgeting; exact counts need the model's tokenizer.
+    return (workspace_id, post["id"], transcript_length, (transcript_length + 3) // 4, comment_count, max_depth, datetime.now())
+
+
+def refresh_post_stats(workspace_id: str, chunk_size: int = 500) -> int:
+    # Fills post_stats for every post of the workspace that has no row yet. Cheap when nothing is missing,
+    # so it runs after each ingestion and again lazily before sampling.
+    missing = post_stats_repo.missing_post_ids(workspace_id)
+    filled = 0
+    for start in range(0, len(missing), chunk_size):
+        chunk = missing[start:start + chunk_size]
+        rows = [
+            compute_post_stats(workspace_id, post)
+            for post in iter_reddit_posts_with_comments(workspace_id, chunk, ["id", "title", "selftext"], chunk_size)
+        ]
+        filled += post_stats_repo.insert_stats(rows)
+    return filled
 
-        if parent_id and parent_id in comment_map:
-            parent = comment_map[parent_id]
-            parent.setdefault("comments", []).append(comment)
 
-    return [comment for comment in comments if comment["parent_id"] is None or comment["parent_id"] == post_id]
+def iter_post_transcripts(workspace_id: str, post_ids: List[str], chunk_size: int = 500) -> Iterator[Tuple[str, Optional[str]]]:
+    # (post_id, whole-post transcript) in post_ids order; None for ids that are not in the workspace.
+    for start in range(0, len(post_ids), chunk_size):
+        chunk = post_ids[start:start + chunk_size]
+        posts = get_reddit_posts_by_ids(workspace_id, chunk, ["id", "title", "selftext"])
+        for post_id in chunk:
+            post = posts.get(post_id)
+            yield post_id, build_transcript(post)["transcript"] if post else None
 
 
 async def upload_dataset_file(file: UploadFile, workspace_id: str) -> str:
@@ -514,15 +579,7 @@ async def stream_upload_file(file: UploadFile) -> dict:
     return {"message": f"File {file.filename} uploaded successfully.", "path": file_path}
 
 
-def omit_first_if_matches_structure(data: list) -> list:
-    if data and isinstance(data[0], dict) and "id" not in data[0]:
-        return data[1:]
-    return data
-
-async def parse_reddit_files(app_id: str, workspace_id: str, dataset_path: str = None, date_filter: dict[str, datetime] = None, is_primary: bool = False) -> dict:
-    await send_ipc_message(app_id, "Starting to parse Reddit dataset")
-
-    await send_ipc_message(app_id, "Clearing existing posts and comments for this workspace")
+def clear_workspace_reddit_data(workspace_id: str):
     existing_posts_count = post_repo.count({"workspace_id": workspace_id})
     if existing_posts_count > 0:
         post_repo.delete({"workspace_id": workspace_id})
@@ -531,6 +588,27 @@ async def parse_reddit_files(app_id: str, workspace_id: str, dataset_path: str =
     if existing_comments_count > 0:
         comment_repo.delete({"workspace_id": workspace_id})
 
+    post_stats_repo.delete({"workspace_id": workspace_id})
+
+
+def get_date_filter_bounds(date_filter: dict[str, datetime] = None):
+    start_ts = end_ts = None
+    if date_filter:
+        start_date = date_filter.get("start_date")
+        end_date = date_filter.get("end_date")
+        if start_date:
+            start_ts = start_date.timestamp()
+        if end_date:
+            end_ts = end_date.timestamp()
+    return start_ts, end_ts
+
+
+async def parse_reddit_files(app_id: str, workspace_id: str, dataset_path: str = None, date_filter: dict[str, datetime] = None, is_primary: bool = False) -> dict:
+    await send_ipc_message(app_id, "Starting to parse Reddit dataset")
+
+    await send_ipc_message(app_id, "Clearing existing posts and comments for this workspace")
+    clear_workspace_reddit_data(workspace_id)
+
     await send_ipc_message(app_id, f"Setting up dataset directory for workspace {workspace_id}")
     dataset_path = dataset_path or os.path.join(DATASETS_DIR, workspace_id)
     
@@ -552,7 +630,7 @@ async def parse_reddit_files(app_id: str, workspace_id: str, dataset_path: str =
         return {"error": f"Unexpected error: {e}"}
     
     for f in files:
-        if f.endswith(".json"):
+        if f.endswith(".json") or f.endswith(".jsonl"):
             full_path = os.path.join(dataset_path, f)
             if f.startswith("RS_") or f.startswith("RC_"):
                 parts = f.split('_')
@@ -575,240 +653,149 @@ async def parse_reddit_files(app_id: str, workspace_id: str, dataset_path: str =
                     except ValueError:
                         print(f"Invalid date in filename: {f}")
                         continue
-            elif f.endswith("_submissions.json"):
+            elif f.endswith(("_submissions.json", "_submissions.jsonl")):
                 all_files.append({"type": "submissions", "path": full_path})
-            elif f.endswith("_comments.json"):
+            elif f.endswith(("_comments.json", "_comments.jsonl")):
                 all_files.append({"type": "comments", "path": full_path})
 
-    total_files = len(all_files)
-    processed_files = 0
-    await send_ipc_message(app_id, f"Starting to parse Reddit dataset with {total_files} files")
-
-    start_ts = end_ts = None
-    if date_filter:
-        start_date = date_filter.get("start_date")
-        end_date = date_filter.get("end_date")
-        if start_date:
-            start_ts = start_date.timestamp()
-        if end_date:
-            end_ts = end_date.timestamp()
-
-    subreddit = ""
-    for file in all_files:
-        try:
-            with open(file["path"], "r", encoding="utf-8") as f:
-                raw_data_str = f.read()
-        except FileNotFoundError:
-            print(f"File not found: {file['path']}")
-            raise 
-        except PermissionError:
-            print(f"Permission denied: {file['path']}")
-            raise 
-        except IOError as e:
-            print(f"IO error reading file {file['path']}: {e}")
-            raise e
-        except Exception as e:
-            print(f"Unexpected error reading file {file['path']}: {e}")
-            raise e
-        try:
-            raw_data = json.loads(raw_data_str, strict=False)
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON in file {file['path']}: {e}")
-            continue
-
-        filtered_data = omit_first_if_matches_structure(raw_data)
-
-        if file["type"] == "submissions":
-            posts = []
-            for p in filtered_data:
-                try:
-                    created = float(p.get("created_utc", 0))
-                except (ValueError, TypeError):
-                    created = 0.0
-
-                if date_filter:
-                    if (start_ts and created < start_ts) or (end_ts and created > end_ts):
-                        continue
-                subreddit = p.get("subreddit", subreddit)
-                posts.append(Post(
-                    id=p["id"],
-                    over_18=p.get("over_18", 0),
-                    subreddit=p.get("subreddit", ""),
-                    score=p.get("score", 0),
-                    thumbnail=p.get("thumbnail", ""),
-                    permalink=p.get("permalink", ""),
-                    is_self=p.get("is_self", 0),
-                    domain=p.get("domain", ""),
-                    created_utc=int(created),
-                    url=p.get("url", ""),
-                    num_comments=p.get("num_comments", 0),
-                    title=p.get("title", ""),
-                    selftext=p.get("selftext", ""),
-                    author=p.get("author", ""),
-                    hide_score=p.get("hide_score", 0),
-                    subreddit_id=p.get("subreddit_id", ""),
-                    workspace_id=workspace_id
-                ))
-            post_repo.insert_batch(posts)
-
-        elif file["type"] == "comments":
-            comments = []
-            for c in filtered_data:
-                try:
-                    created = float(c.get("created_utc", 0))
-                except (ValueError, TypeError):
-                    created = 0.0
-
-                if date_filter:
-                    if (start_ts and created < start_ts) or (end_ts and created > end_ts):
-                        continue
-
-                subreddit = c.get("subreddit", "unknown")
+    await send_ipc_message(app_id, f"Starting to parse Reddit dataset with {len(all_files)} files")
 
-                link_id_str = str(c.get("link_id", ""))
-                parent_id_str = str(c.get("parent_id", ""))
+    start_ts, end_ts = get_date_filter_bounds(date_filter)
+    subreddit = await ingest_reddit_files(app_id, workspace_id, all_files, start_ts, end_ts)
 
-                post_id = link_id_str.split("_")[1] if "_" in link_id_str else None
-                link_id = link_id_str.split("_")[1] if "_" in link_id_str else None
-                parent_id = parent_id_str.split("_")[1] if "_" in parent_id_str else None
-
-                if not c.get("id", ""):
-                    print(f"Skipping comment without id: {c}")
-                    continue
-                if not workspace_id:
-                    print(f"Skipping comment without workspace_id: {c}")
-                    continue
-                if not post_id:
-                    print(f"Skipping comment with invalid post_id: {c}")
-                    continue
-                if not parent_id:
-                    print(f"Skipping comment with invalid parent_id: {c}")
-                    continue
-
-                comments.append(Comment(
-                    id=c.get("id", ""),
-                    body=c.get("body", ""),
-                    author=c.get("author", ""),
-                    post_id=post_id,
-                    created_utc=int(created),
-                    link_id=link_id,
-                    parent_id=parent_id,
-                    controversiality=c.get("controversiality", 0),
-                    score_hidden=c.get("score_hidden", False),
-                    score=c.get("score", 0),
-                    subreddit_id=c.get("subreddit_id", ""),
-                    retrieved_on=c.get("retrieved_on", 0),
-                    gilded=c.get("gilded", 0),
-                    workspace_id=workspace_id 
-                ))
-            seen = set()
-            unique_comments = []
-            for comment in comments:
-                key = (comment.id, comment.workspace_id, comment.post_id, comment.parent_id)
-                if key not in seen:
-                    seen.add(key)
-                    unique_comments.append(comment)
-                else:
-                    print(f"Skipping duplicate comment with key: {key}")
-            comment_repo.insert_batch(unique_comments)
-
-        processed_files += 1
-        message = f"Processed {processed_files} of {total_files} files"
-        await send_ipc_message(app_id, message)
+    await send_ipc_message(app_id, "Computing post statistics")
+    await asyncio.to_thread(refresh_post_stats, workspace_id)
 
     update_dataset(workspace_id, name=subreddit)
     await send_ipc_message(app_id, "Finished parsing Reddit dataset")
     return {"message": "Reddit dataset parsed successfully"}
 
 
-async def run_command_async(command: str) -> str:
-    process = await asyncio.create_subprocess_shell(
-        command,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE
-    )
-    stdout, stderr = await process.communicate()
-    if process.returncode != 0:
-        print("Command failed with return code:", process.returncode)
-        error_message = stderr.decode().strip()
-        print("Error output:", error_message)
-        if "No such file or directory" in error_message:
-            raise FileNotFoundError(error_message)
-        elif "Permission denied" in error_message:
-            raise PermissionError(error_message)
-        elif "Out of memory" in error_message:
-            raise MemoryError(error_message)
-        elif "No space left on device" in error_message:
-            raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
-        elif "Input/output error" in error_message:
-            raise OSError(errno.EIO, os.strerror(errno.EIO))
-        elif "Broken pipe" in error_message:
-            raise OSError(errno.EPIPE, os.strerror(errno.EPIPE))
-        else:
-            raise RuntimeError(f"Torrent failed to extract data, try fallback torrent.")
-    else:
-        print("Command executed successfully.")
-    return stdout.decode()
-
-async def run_command_and_stream(command):
-    if sys.platform == "win32":
-        loop = asyncio.get_running_loop()
-        proc = await loop.run_in_executor(
-            None,
-            lambda: subprocess.Popen(
-                command,
-                shell=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                bufsize=1 
-            )
-        )
-        queue: asyncio.Queue[str | None] = asyncio.Queue()
+async def ingest_reddit_files(app_id: str, workspace_id: str, all_files: List[Dict[str, str]], start_ts: float = None, end_ts: float = None) -> str:
+    total_files = len(all_files)
+    processed_files = 0
+    subreddit = ""
+    if not all_files:
+        return subreddit
 
-        def _reader():
-            for raw in proc.stdout:
-                line = raw.decode("utf-8", errors="ignore").rstrip("\r\n")
-                loop.call_soon_threadsafe(queue.put_nowait, line)
-            loop.call_soon_threadsafe(queue.put_nowait, None)
+    workers = min(default_ingest_workers(), total_files)
+    if workers > 1:
+        batches = iter_parallel_file_batches(all_files, workspace_id, start_ts, end_ts, batch_size=INGEST_BATCH_SIZE, workers=workers)
+    else:
+        batches = iter_file_batches(all_files, workspace_id, start_ts, end_ts, batch_size=INGEST_BATCH_SIZE)
 
-        threading.Thread(target=_reader, daemon=True).start()
+    started = time.monotonic()
+    records_read = [0] * total_files
+    inserted = 0
+    next_report = INGEST_PROGRESS_EVERY
+    try:
         while True:
-            line = await queue.get()
-            if line is None:
+            message = await asyncio.to_thread(next, batches, None)
+            if message is None:
                 break
-            yield line
-        await loop.run_in_executor(None, proc.wait)
-
-    else:
-        process = await asyncio.create_subprocess_shell(
-            command,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            limit=1024 * 1024 * 512,  # 512 MB buffer
-        )
-        buffer = bytearray()
+            kind, index, payload, detail, file_records = message
+            file = all_files[index]
+            records_read[index] = file_records
+
+            if kind == "rows":
+                subreddit = detail or subreddit
+                repo, columns = (post_repo, POST_COLUMNS) if file["type"] == "submissions" else (comment_repo, COMMENT_COLUMNS)
+                inserted += await asyncio.to_thread(repo.insert_rows, columns, payload, True)
+            elif kind == "error":
+                if payload in ("FileNotFoundError", "PermissionError"):
+                    raise RuntimeError(f"Cannot read file {file['path']}: {detail}")
+                print(f"Error decoding JSON in file {file['path']}: {detail}")
+            else:
+                processed_files += 1
+
+            total_read = sum(records_read)
+            if kind != "rows" or total_read >= next_report:
+                next_report = total_read + INGEST_PROGRESS_EVERY
+                rate = inserted / max(time.monotonic() - started, 1e-6)
+                await send_ipc_message(
+                    app_id,
+                    f"Processed {processed_files} of {total_files} files: {total_read} records read, {inserted} stored ({rate:,.0f} records/s)",
+                )
+    finally:
         try:
-            while True:
-                chunk = await process.stdout.read(65536)
-                if not chunk:
-                    if buffer:
-                        yield buffer.decode("utf-8", errors="ignore").strip()
-                    break
-                buffer.extend(chunk)
-
-                while True:
-                    newline_idx = buffer.find(b"\n")
-                    if newline_idx == -1:
-                        break
-                    line = buffer[:newline_idx].decode("utf-8", errors="ignore").strip()
-                    buffer = buffer[newline_idx + 1 :]
-                    if line:
-                        yield line
-        except Exception as e:
-            print(f"Error reading stream: {e}")
-            raise
-        finally:
-            await process.wait()
+            batches.close()
+        except ValueError:
+            # Still running in the worker thread (request cancelled); the parser processes are daemons.
+            pass
+
+    elapsed = time.monotonic() - started
+    print(f"Parsed {sum(records_read)} records into {inserted} rows in {elapsed:.1f}s using {workers} parser(s)")
+    return subreddit
+
+
+async def iterate_in_thread(iterator):
+    # Pulls a blocking iterator from a worker thread, one item per hop, so decompression never blocks the loop.
+    try:
+        while True:
+            item = await asyncio.to_thread(next, iterator, None)
+            if item is None:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close:
+            try:
+                close()
+            except ValueError:
+                pass
+
+
+async def ingest_dump_batches(
+    app_id: str,
+    workspace_id: str,
+    batches,
+    file_type: str,
+    start_ts: float = None,
+    end_ts: float = None,
+) -> int:
+    # Direct mode: rows go from the decompressor straight into SQLite, no intermediate files.
+    repo, columns = (post_repo, POST_COLUMNS) if file_type == "submissions" else (comment_repo, COMMENT_COLUMNS)
+    records = inserted = 0
+    next_report = INGEST_PROGRESS_EVERY
+    started = time.monotonic()
+    async for batch in batches:
+        records += len(batch)
+        rows = [row for row in (record_to_row(record, file_type, workspace_id, start_ts, end_ts) for _, _, record in batch) if row]
+        inserted += await asyncio.to_thread(repo.insert_rows, columns, rows, True)
+        if records >= next_report:
+            next_report = records + INGEST_PROGRESS_EVERY
+            rate = inserted / max(time.monotonic() - started, 1e-6)
+            await send_ipc_message(app_id, f"Ingested {inserted} {file_type} ({records} records read, {rate:,.0f} records/s)")
+    return inserted
+
+
+async def write_subreddit_files(batches, output_paths: Dict[str, str]) -> Dict[str, int]:
+    # Fans records out to one JSONL file per subreddit. Files are written under a .part name and only
+    # renamed into place once the whole dump has been read, so an interrupted run leaves nothing that
+    # looks complete.
+    counts = {subreddit: 0 for subreddit in output_paths}
+    files = {}
+    try:
+        for subreddit, path in output_paths.items():
+            files[subreddit] = await aiofiles.open(path + ".part", "wb")
+        async for batch in batches:
+            by_subreddit = {}
+            for subreddit, line, _ in batch:
+                if subreddit in files:
+                    by_subreddit.setdefault(subreddit, []).append(line)
+            for subreddit, lines in by_subreddit.items():
+                counts[subreddit] += len(lines)
+                await files[subreddit].write(b"\n".join(lines) + b"\n")
+    except BaseException:
+        for subreddit, file in files.items():
+            await file.close()
+            os.remove(output_paths[subreddit] + ".part")
+        raise
+    for subreddit, file in files.items():
+        await file.close()
+        os.replace(output_paths[subreddit] + ".part", output_paths[subreddit])
+    return counts
+
 
 async def process_reddit_data(
     manager: ConnectionManager,
@@ -817,134 +804,89 @@ async def process_reddit_data(
     subreddit: str,
     zst_filename: str,
     is_primary: bool = False,
-    current_download_dir: str = None
+    current_download_dir: str = None,
+    ingest_workspace_id: str = None,
+    start_ts: float = None,
+    end_ts: float = None,
 ) -> list[str]:
+    # Output is JSONL, which parse_reddit_files reads natively. With ingest_workspace_id set, records are
+    # written straight into that workspace's posts/comments and no files are produced.
     directory = os.path.dirname(zst_filename)
-    intermediate_filename = f"output_{time.time()}.jsonl"
-    intermediate_file = os.path.join(directory, intermediate_filename)
-    print(f"Intermediate file: {intermediate_file}")
-
+    base = os.path.splitext(os.path.basename(zst_filename))[0]
     zstd_executable = PATHS["executables"]["zstd"]
 
     if is_primary:
-        command = f'"{zstd_executable}" -cdq --memory=2048MB -T8 "{zst_filename}"'
-    else:
-        ripgrep_executable = PATHS["executables"]["ripgrep"]
-        regex = r'(?s)\{.*?"subreddit":\s*"' + subreddit + r'".*?\}'
-        if os.name == 'nt':
-            regex_escaped = regex.replace('"', '\\"')
-            command = (
-                f'"{zstd_executable}" -cdq --memory=2048MB -T8 "{zst_filename}" ^| '
-                f'"{ripgrep_executable}" -P "{regex_escaped}" > "{intermediate_file}" || exit /B 0'
-            )
+        if "_submissions.zst" in zst_filename:
+            data_type = "S"
+        elif "_comments.zst" in zst_filename:
+            data_type = "C"
         else:
-            command = (
-                f'"{zstd_executable}" -cdq --memory=2048MB -T8 "{zst_filename}" | '
-                f'"{ripgrep_executable}" -P \'{regex}\' > "{intermediate_file}" || true'
-            )
+            raise ValueError(f"Cannot determine data type from filename: {zst_filename}")
+    else:
+        data_type = "S" if base.startswith("RS_") else "C"
+    file_type = "submissions" if data_type == "S" else "comments"
 
-    print(f"Running command:\n{command}")
     message = f"Extracting data from {zst_filename}..."
     await send_ipc_message(app_id, message)
     update_run_progress(run_id, message, current_download_dir=current_download_dir)
 
-    if is_primary:
-        print("Primary magnet link processed.")
+    # Primary dumps are already per subreddit; the monthly fallback dumps hold every subreddit and are
+    # filtered on a byte search for "subreddit":"<name>" before any line is decoded.
+    batches = iterate_in_thread(
+        iter_dump_batches(zst_filename, None if is_primary else [subreddit], zstd_executable, INGEST_BATCH_SIZE)
+    )
 
-        if "_submissions.zst" in zst_filename:
-            data_type = "S"
-        elif "_comments.zst" in zst_filename:
-            data_type = "C"
-        else:
-            raise ValueError(f"Cannot determine data type from filename: {zst_filename}")
-        
-        data_type = "S" if "_submissions.zst" in zst_filename else "C" if "_comments.zst" in zst_filename else None
-        if not data_type:
-            raise ValueError(f"Cannot determine data type from filename: {zst_filename}")
+    if ingest_workspace_id:
+        inserted = await ingest_dump_batches(app_id, ingest_workspace_id, batches, file_type, start_ts, end_ts)
+        output_filename = os.path.join(directory, f"{base}.jsonl")
+        message = f"Records ingested: {output_filename} ({inserted} {file_type})"
+        await send_ipc_message(app_id, message)
+        update_run_progress(run_id, message, current_download_dir=current_download_dir)
+        return []
 
+    if is_primary:
+        print("Primary magnet link processed.")
         monthly_files = {}
-        async for line in run_command_and_stream(command):
-            try:
-                obj = json.loads(line)
-                created_utc = obj.get("created_utc")
-                if created_utc:
-                    dt = datetime.fromtimestamp(float(created_utc))
-                    key = f"{dt.year}-{dt.month:02d}"
+        try:
+            async for batch in batches:
+                by_month = {}
+                for _, line, record in batch:
+                    created_utc = record.get("created_utc")
+                    if not created_utc:
+                        continue
+                    try:
+                        dt = datetime.fromtimestamp(float(created_utc))
+                    except (TypeError, ValueError):
+                        continue
+                    by_month.setdefault(f"{dt.year}-{dt.month:02d}", []).append(line)
+                for key, lines in by_month.items():
                     if key not in monthly_files:
                         monthly_filename = os.path.join(directory, f"R{data_type}_{key}.jsonl")
-                        monthly_files[key] = await aiofiles.open(monthly_filename, "w", encoding="utf-8")
+                        monthly_files[key] = await aiofiles.open(monthly_filename, "wb")
                         await send_ipc_message(app_id, f"Creating monthly file: {monthly_filename}")
-                    await monthly_files[key].write(line + "\n")
-            except json.JSONDecodeError:
-                print("Skipping invalid JSON line.")
-        for key, file in monthly_files.items():
-            print(f"Closing monthly file: R{data_type}_{key}.jsonl")
-            await file.close()
+                    await monthly_files[key].write(b"\n".join(lines) + b"\n")
+        finally:
+            for key, file in monthly_files.items():
+                print(f"Closing monthly file: R{data_type}_{key}.jsonl")
+                await file.close()
 
-        json_files = []
-        for key in monthly_files:
-            jsonl_filename = os.path.join(directory, f"R{data_type}_{key}.jsonl")
-            json_filename = os.path.join(directory, f"R{data_type}_{key}.json")
-            message = f"Converting {jsonl_filename} to {json_filename}"
-            print(message)
-            await send_ipc_message(app_id, message)
-            async with aiofiles.open(jsonl_filename, "r", encoding="utf-8") as jsonl_file, \
-                    aiofiles.open(json_filename, "w", encoding="utf-8") as json_file:
-                await json_file.write("[\n")
-                first = True
-                async for line in jsonl_file:
-                    if not first:
-                        await json_file.write(",\n")
-                    await json_file.write(line.strip())
-                    first = False
-                await json_file.write("\n]")
-            json_files.append(json_filename)
-            os.remove(jsonl_filename) 
+        jsonl_files = [os.path.join(directory, f"R{data_type}_{key}.jsonl") for key in monthly_files]
 
         message = f"Processed data saved to monthly JSON files for {zst_filename}"
         await send_ipc_message(app_id, message)
         update_run_progress(run_id, message, current_download_dir=current_download_dir)
 
-        return json_files
+        return jsonl_files
 
-    else:
-        await run_command_async(command)
-
-        print(f"Fallback magnet link processed for subreddit '{subreddit}'.")
-        base = os.path.splitext(os.path.basename(zst_filename))[0]
-        output_filename = os.path.join(directory, f"{base}.json")
-
-        print(f"Opening intermediate file for reading: {intermediate_file}")
-        print(f"Opening output file for writing: {output_filename}")
-        async with aiofiles.open(intermediate_file, "r", encoding="utf-8") as infile, \
-                   aiofiles.open(output_filename, "w", encoding="utf-8") as outfile:
-            await outfile.write("[\n")
-            first = True
-            async for line in infile:
-                try:
-                    obj = json.loads(line.strip())
-                    if obj.get("subreddit") == subreddit:
-                        if not first:
-                            await outfile.write(",\n")
-                        await outfile.write(json.dumps(obj, ensure_ascii=False))
-                        first = False
-                except json.JSONDecodeError:
-                    print("Skipping invalid JSON line.")
-            await outfile.write("\n]")
-
-        print(f"Processed data saved to {output_filename}")
-        message = f"JSON extracted: {output_filename}"
-        await send_ipc_message(app_id, message)
-        update_run_progress(run_id, message, current_download_dir=current_download_dir)
+    print(f"Fallback magnet link processed for subreddit '{subreddit}'.")
+    output_filename = os.path.join(directory, f"{base}.jsonl")
+    await write_subreddit_files(batches, {subreddit: output_filename})
+    print(f"Processed data saved to {output_filename}")
 
-        try:
-            print(f"Removing intermediate file: {intermediate_file}")
-            os.remove(intermediate_file)
-            print(f"Intermediate file {intermediate_filename} removed.")
-        except Exception as e:
-            print(f"Warning: Could not remove intermediate file {intermediate_filename}: {e}")
-
-        return [output_filename]
+    message = f"JSON extracted: {output_filename}"
+    await send_ipc_message(app_id, message)
+    update_run_progress(run_id, message, current_download_dir=current_download_dir)
+    return [output_filename]
 
 def wait_for_file_stable(file_path, stable_time=5, poll_interval=2) -> bool:
     if not os.path.exists(file_path):
@@ -1097,23 +1039,15 @@ def get_files_to_process(torrent_files: list[TorrentFile], wanted_range: list, s
             files_to_process.append(file.name)
     return files_to_process
 
-async def process_single_file(
-    manager: ConnectionManager,
+async def download_torrent_file(
     app_id: str,
     run_id: str,
-    c: Client, 
-    torrent: Torrent, 
-    file_name: str, 
-    download_dir: str, 
-    subreddit: str,
-    is_primary: bool = True
-):
-    print(f"\n--- Processing file: {file_name} ---")
-
-    message = f"Processing file: {file_name} ..."
-    await send_ipc_message(app_id, message)
-    update_run_progress(run_id, message, current_download_dir=download_dir)
-
+    c: Client,
+    torrent: Torrent,
+    file_name: str,
+    download_dir: str,
+) -> str:
+    # Downloads only file_name from the torrent and returns the path of the .zst once it is on disk.
     torrent_files = c.get_torrent(torrent.id).get_files()
 
     wanted_file = next((f for f in torrent_files if f.name == file_name), None)
@@ -1132,58 +1066,153 @@ async def process_single_file(
     file_path = os.path.join(download_dir, file_name)
     file_path_zst = file_path if file_path.endswith('.zst') else file_path + '.zst'
 
-    academic_file_paths = []
-    try:
-        while True:
-            curr_torrent = c.get_torrent(torrent.id)
-            if hasattr(curr_torrent, "error") and curr_torrent.error != 0:
-                err_msg = f"Error downloading {file_name}: {curr_torrent.error_string}"
-                print(err_msg)
-                await send_ipc_message(app_id, err_msg)
-                update_run_progress(run_id, err_msg)
-                if "Out of memory" in err_msg:
-                    raise MemoryError(err_msg)
-                elif "No space left on device" in err_msg:
-                    raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
-                elif "Input/output error" in err_msg:
-                    raise OSError(errno.EIO, os.strerror(errno.EIO))
-                elif "Broken pipe" in err_msg:
-                    raise OSError(errno.EPIPE, os.strerror(errno.EPIPE))
-                else:
-                    raise RuntimeError(f"Torrent download failed: {err_msg}")
-            
-            file_status = next((f for f in curr_torrent.get_files() if f.id == file_id), None)
-            if file_status and file_status.completed >= file_status.size:
-                print(f"File {file_name} has been fully downloaded.")
-                message = f"File {file_name} fully downloaded ({file_status.completed}/{file_status.size} bytes)."
+    while True:
+        curr_torrent = c.get_torrent(torrent.id)
+        if hasattr(curr_torrent, "error") and curr_torrent.error != 0:
+            err_msg = f"Error downloading {file_name}: {curr_torrent.error_string}"
+            print(err_msg)
+            await send_ipc_message(app_id, err_msg)
+            update_run_progress(run_id, err_msg)
+            if "Out of memory" in err_msg:
+                raise MemoryError(err_msg)
+            elif "No space left on device" in err_msg:
+                raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+            elif "Input/output error" in err_msg:
+                raise OSError(errno.EIO, os.strerror(errno.EIO))
+            elif "Broken pipe" in err_msg:
+                raise OSError(errno.EPIPE, os.strerror(errno.EPIPE))
+            else:
+                raise RuntimeError(f"Torrent download failed: {err_msg}")
+
+        file_status = next((f for f in curr_torrent.get_files() if f.id == file_id), None)
+        if file_status and file_status.completed >= file_status.size:
+            print(f"File {file_name} has been fully downloaded.")
+            message = f"File {file_name} fully downloaded ({file_status.completed}/{file_status.size} bytes)."
+            print(message)
+            await send_ipc_message(app_id, message)
+            update_run_progress(run_id, message, current_download_dir=download_dir)
+            break
+        else:
+            if file_status and file_status.size != 0:
+                pct_done = (file_status.completed / file_status.size) * 100
+                message = f"Downloading {file_name}: {pct_done:.2f}% ({file_status.completed}/{file_status.size} bytes)"
                 print(message)
                 await send_ipc_message(app_id, message)
                 update_run_progress(run_id, message, current_download_dir=download_dir)
-                break
             else:
-                if file_status and file_status.size != 0:
-                    pct_done = (file_status.completed / file_status.size) * 100
-                    message = f"Downloading {file_name}: {pct_done:.2f}% ({file_status.completed}/{file_status.size} bytes)"
-                    print(message)
-                    await send_ipc_message(app_id, message)
-                    update_run_progress(run_id, message, current_download_dir=download_dir)
-                else:
-                    print(f"Waiting for file {file_name} to start...")
-                await asyncio.sleep(5)
+                print(f"Waiting for file {file_name} to start...")
+            await asyncio.sleep(5)
 
-        check_start = time.time()
-        while not os.path.exists(file_path_zst):
-            if time.time() - check_start > 2 *60:
-                print(f"File {file_path_zst} not found after 120 seconds.")
-                await send_ipc_message(app_id, f"ERROR: File {file_path_zst} not found after 120 seconds. Try retrying the request.")
-                raise FileNotFoundError(f"File {file_path_zst} not found after 120 seconds. Try retrying the request.")
-            message = f"Waiting for file {file_path_zst} to appear on disk..."
-            print(message)
+    check_start = time.time()
+    while not os.path.exists(file_path_zst):
+        if time.time() - check_start > 2 *60:
+            print(f"File {file_path_zst} not found after 120 seconds.")
+            await send_ipc_message(app_id, f"ERROR: File {file_path_zst} not found after 120 seconds. Try retrying the request.")
+            raise FileNotFoundError(f"File {file_path_zst} not found after 120 seconds. Try retrying the request.")
+        message = f"Waiting for file {file_path_zst} to appear on disk..."
+        print(message)
+        await send_ipc_message(app_id, message)
+        update_run_progress(run_id, message, current_download_dir=download_dir)
+        await asyncio.sleep(5)
+
+    return file_path_zst
+
+
+async def link_academic_files(
+    app_id: str,
+    run_id: str,
+    links: list[tuple[str, str]],
+    download_dir: str = None,
+) -> list[str]:
+    # Moves each (extracted file, academic-torrent folder) pair into its folder and links it into DATASETS_DIR.
+    # On Windows all links go into one batch file, so the whole call needs a single UAC prompt.
+    academic_file_paths = []
+    symlinks = []
+    for output_file, academic_folder in links:
+        datasets_academic_folder = os.path.join(DATASETS_DIR, os.path.basename(academic_folder))
+        os.makedirs(datasets_academic_folder, exist_ok=True)
+
+        academic_file_path = os.path.join(academic_folder, os.path.basename(output_file))
+        if os.path.abspath(output_file) != os.path.abspath(academic_file_path):
+            shutil.move(output_file, academic_file_path)
+            msg = f"Moved file: {output_file} -> {academic_file_path}"
+            print(msg)
+            await send_ipc_message(app_id, msg)
+            update_run_progress(run_id, msg)
+
+        symlink_path = os.path.join(datasets_academic_folder, os.path.basename(output_file))
+        if os.path.lexists(symlink_path):
+            os.remove(symlink_path)
+        symlinks.append((symlink_path, academic_file_path))
+        academic_file_paths.append(academic_file_path)
+
+    if os.name == 'nt':  
+        if symlinks:
+            # Alert the user about the need for administrator access
+            message = "Administrator access is required to create symbolic links on Windows. A UAC prompt will appear to grant these permissions."
             await send_ipc_message(app_id, message)
             update_run_progress(run_id, message, current_download_dir=download_dir)
-            await asyncio.sleep(5)
-        
-        output_files = await process_reddit_data(manager, app_id, run_id, subreddit, file_path_zst, is_primary, download_dir)
+
+            # Create and execute a batch file with all mklink commands
+            with tempfile.NamedTemporaryFile(mode='w', suffix='.bat', delete=False) as bat_file:
+                bat_file.write("\n".join(f'mklink "{symlink_path}" "{target}"' for symlink_path, target in symlinks))
+                bat_file_path = bat_file.name
+
+            shell32 = ctypes.windll.shell32
+            result = shell32.ShellExecuteW(None, "runas", "cmd.exe", f'/c "{bat_file_path}"', None, 1)
+            if result <= 32:  # ShellExecuteW returns <= 32 on failure
+                os.unlink(bat_file_path)
+                error_msg = f"Failed to create symlinks: Administrator access was not granted (ShellExecute returned {result})."
+                await send_ipc_message(app_id, error_msg)
+                raise RuntimeError(error_msg)
+
+            await asyncio.sleep(2)  # Brief wait for the batch file to execute
+            os.unlink(bat_file_path)  # Clean up the temporary file
+
+            message = f"Created {len(symlinks)} symlinks in {DATASETS_DIR}"
+            await send_ipc_message(app_id, message)
+            update_run_progress(run_id, message, current_download_dir=download_dir)
+    else: 
+        for symlink_path, academic_file_path in symlinks:
+            os.symlink(academic_file_path, symlink_path)
+            message = f"Symlink created: {symlink_path} -> {academic_file_path}"
+            await send_ipc_message(app_id, message)
+            update_run_progress(run_id, message, current_download_dir=download_dir)
+
+    return academic_file_paths
+
+
+async def process_single_file(
+    manager: ConnectionManager,
+    app_id: str,
+    run_id: str,
+    c: Client, 
+    torrent: Torrent, 
+    file_name: str, 
+    download_dir: str, 
+    subreddit: str,
+    is_primary: bool = True,
+    ingest_workspace_id: str = None,
+    start_ts: float = None,
+    end_ts: float = None,
+):
+    print(f"\n--- Processing file: {file_name} ---")
+
+    message = f"Processing file: {file_name} ..."
+    await send_ipc_message(app_id, message)
+    update_run_progress(run_id, message, current_download_dir=download_dir)
+
+    file_path = os.path.join(download_dir, file_name)
+    file_path_zst = file_path if file_path.endswith('.zst') else file_path + '.zst'
+
+    academic_file_paths = []
+    try:
+        await download_torrent_file(app_id, run_id, c, torrent, file_name, download_dir)
+
+        output_files = await process_reddit_data(
+            manager, app_id, run_id, subreddit, file_path_zst, is_primary, download_dir,
+            ingest_workspace_id=ingest_workspace_id, start_ts=start_ts, end_ts=end_ts,
+        )
 
         parent_dir = os.path.dirname(os.path.dirname(file_path_zst))
         academic_folder_name = f"academic-torrent-{subreddit}"
@@ -1195,67 +1224,9 @@ async def process_single_file(
             await send_ipc_message(app_id, msg)
             update_run_progress(run_id, msg)
 
-        datasets_academic_folder = os.path.join(DATASETS_DIR, academic_folder_name)
-        os.makedirs(datasets_academic_folder, exist_ok=True)
-
-        if os.name == 'nt':  
-            symlink_commands = []
-            for output_file in output_files:
-                academic_file_path = os.path.join(academic_folder, os.path.basename(output_file))
-                shutil.move(output_file, academic_file_path)
-                msg = f"Moved file: {output_file} -> {academic_file_path}"
-                print(msg)
-                await send_ipc_message(app_id, msg)
-                update_run_progress(run_id, msg)
-                
-                symlink_path = os.path.join(datasets_academic_folder, os.path.basename(output_file))
-                if os.path.lexists(symlink_path):
-                    os.remove(symlink_path)
-                symlink_commands.append(f'mklink "{symlink_path}" "{academic_file_path}"')
-                academic_file_paths.append(academic_file_path)
-            
-            if symlink_commands:
-                # Alert the user about the need for administrator access
-                message = "Administrator access is required to create symbolic links on Windows. A UAC prompt will appear to grant these permissions."
-                await send_ipc_message(app_id, message)
-                update_run_progress(run_id, message, current_download_dir=download_dir)
-                
-                # Create and execute a batch file with all mklink commands
-                with tempfile.NamedTemporaryFile(mode='w', suffix='.bat', delete=False) as bat_file:
-                    bat_file.write("\n".join(symlink_commands))
-                    bat_file_path = bat_file.name
-                
-                shell32 = ctypes.windll.shell32
-                result = shell32.ShellExecuteW(None, "runas", "cmd.exe", f'/c "{bat_file_path}"', None, 1)
-                if result <= 32:  # ShellExecuteW returns <= 32 on failure
-                    os.unlink(bat_file_path)
-                    error_msg = f"Failed to create symlinks: Administrator access was not granted (ShellExecute returned {result})."
-                    await send_ipc_message(app_id, error_msg)
-                    raise RuntimeError(error_msg)
-                
-                await asyncio.sleep(2)  # Brief wait for the batch file to execute
-                os.unlink(bat_file_path)  # Clean up the temporary file
-                
-                message = f"Created {len(symlink_commands)} symlinks in {datasets_academic_folder}"
-                await send_ipc_message(app_id, message)
-                update_run_progress(run_id, message, current_download_dir=download_dir)
-        else: 
-            for output_file in output_files:
-                academic_file_path = os.path.join(academic_folder, os.path.basename(output_file))
-                shutil.move(output_file, academic_file_path)
-                msg = f"Moved file: {output_file} -> {academic_file_path}"
-                print(msg)
-                await send_ipc_message(app_id, msg)
-                update_run_progress(run_id, msg)
-                
-                symlink_path = os.path.join(datasets_academic_folder, os.path.basename(output_file))
-                if os.path.lexists(symlink_path):
-                    os.remove(symlink_path)
-                os.symlink(academic_file_path, symlink_path)
-                message = f"Symlink created: {symlink_path} -> {academic_file_path}"
-                await send_ipc_message(app_id, message)
-                update_run_progress(run_id, message, current_download_dir=download_dir)
-                academic_file_paths.append(academic_file_path)
+        academic_file_paths = await link_academic_files(
+            app_id, run_id, [(output_file, academic_folder) for output_file in output_files], download_dir
+        )
 
         for academic_file_path in academic_file_paths:
             if os.stat(academic_file_path).st_size <= 5:
@@ -1283,18 +1254,16 @@ async def process_single_file(
     await asyncio.sleep(1)
     return academic_file_paths
 
-async def get_reddit_data_from_torrent(
+async def open_reddit_torrent(
     manager: ConnectionManager,
     app_id: str,
     run_id: str,
-    workspace_id: str,
-    subreddit: str,
-    start_month: str = "2005-06",
-    end_month: str = "2023-12",
-    submissions_only: bool = True,
+    message: str,
     use_fallback: bool = False,
     download_dir: str = None,
 ):
+    # Adds (or reuses) the primary or fallback torrent in transmission and waits for its metadata.
+    # Returns (client, torrent, magnet link, absolute download dir).
     settings = config.CustomSettings()
     if not download_dir:
         TRANSMISSION_ABSOLUTE_DOWNLOAD_DIR = get_current_download_dir()
@@ -1307,19 +1276,12 @@ async def get_reddit_data_from_torrent(
     
     c = Client(host="localhost", port=9091, username="transmission", password="password")
 
-    academic_folder_name = f"academic-torrent-{subreddit}"
-    parent_dir = os.path.dirname(TRANSMISSION_ABSOLUTE_DOWNLOAD_DIR)
-    academic_folder = os.path.join(parent_dir, academic_folder_name)
-    if not os.path.exists(academic_folder):
-        os.makedirs(academic_folder, exist_ok=True)
     if not use_fallback:
         torrent_hash_string = PRIMARY_MAGNET_LINK.split("btih:")[1].split("&")[0]
         magnet_link = PRIMARY_MAGNET_LINK
-        message = f"Using primary torrent for subreddit '{subreddit}'."
     else:
         torrent_hash_string = FALLBACK_MAGNET_LINK.split("btih:")[1].split("&")[0]
         magnet_link = FALLBACK_MAGNET_LINK
-        message = f"Using fallback torrent with range {start_month} to {end_month}."
 
     torrents = c.get_torrents()
     current_torrent = next((t for t in torrents if t.hashString == torrent_hash_string), None)
@@ -1348,7 +1310,40 @@ async def get_reddit_data_from_torrent(
         update_run_progress(run_id, message, current_download_dir=download_dir)
 
     torrent_to_use = await wait_for_metadata(manager, app_id, run_id, c, current_torrent, current_download_dir=download_dir)
-    
+    return c, torrent_to_use, magnet_link, TRANSMISSION_ABSOLUTE_DOWNLOAD_DIR
+
+
+async def get_reddit_data_from_torrent(
+    manager: ConnectionManager,
+    app_id: str,
+    run_id: str,
+    workspace_id: str,
+    subreddit: str,
+    start_month: str = "2005-06",
+    end_month: str = "2023-12",
+    submissions_only: bool = True,
+    use_fallback: bool = False,
+    download_dir: str = None,
+    direct_to_database: bool = False,
+    start_ts: float = None,
+    end_ts: float = None,
+):
+    # With direct_to_database the decompressed records are inserted into workspace_id as they stream out
+    # of zstd; no JSONL files are written for new downloads and the return value is empty.
+    if not use_fallback:
+        message = f"Using primary torrent for subreddit '{subreddit}'."
+    else:
+        message = f"Using fallback torrent with range {start_month} to {end_month}."
+    c, torrent_to_use, magnet_link, TRANSMISSION_ABSOLUTE_DOWNLOAD_DIR = await open_reddit_torrent(
+        manager, app_id, run_id, message, use_fallback, download_dir
+    )
+
+    academic_folder_name = f"academic-torrent-{subreddit}"
+    parent_dir = os.path.dirname(TRANSMISSION_ABSOLUTE_DOWNLOAD_DIR)
+    academic_folder = os.path.join(parent_dir, academic_folder_name)
+    if not os.path.exists(academic_folder):
+        os.makedirs(academic_folder, exist_ok=True)
+
     if not use_fallback:
         files_to_process = get_files_to_process_primary(torrent_to_use.get_files(), subreddit, submissions_only)
     else:
@@ -1357,11 +1352,16 @@ async def get_reddit_data_from_torrent(
 
     files_to_process_actually = []
     files_already_processed = []
+    extracted_files = []
     for zst_file in files_to_process:
         base = os.path.splitext(os.path.basename(zst_file))[0]
-        json_file = os.path.join(academic_folder, f"{base}.json")
-        if os.path.exists(json_file):
+        existing = [
+            os.path.join(academic_folder, f"{base}{ext}") for ext in (".jsonl", ".json")
+            if os.path.exists(os.path.join(academic_folder, f"{base}{ext}"))
+        ]
+        if existing:
             files_already_processed.append(zst_file)
+            extracted_files.append(existing[0])
         else:
             files_to_process_actually.append(zst_file)
 
@@ -1370,6 +1370,13 @@ async def get_reddit_data_from_torrent(
         message = f"Files already downloaded: {', '.join(already_processed_names)}"
         await send_ipc_message(app_id, message)
         update_run_progress(run_id, message, current_download_dir=download_dir)
+
+        if direct_to_database:
+            await ingest_reddit_files(
+                app_id, workspace_id,
+                [{"type": file_type_for(f), "path": f} for f in extracted_files if file_type_for(f)],
+                start_ts, end_ts,
+            )
     
     message = f"Files to process: {len(files_to_process_actually)}"
     await send_ipc_message(app_id, message)
@@ -1383,7 +1390,13 @@ async def get_reddit_data_from_torrent(
 
     all_output_files = []
     for file in files_to_process_actually:
-        output_files = await process_single_file(manager, app_id, run_id, c, torrent_to_use, file, TRANSMISSION_ABSOLUTE_DOWNLOAD_DIR, subreddit, not use_fallback)
+        output_files = await process_single_file(
+            manager, app_id, run_id, c, torrent_to_use, file, TRANSMISSION_ABSOLUTE_DOWNLOAD_DIR, subreddit, not use_fallback,
+            ingest_workspace_id=workspace_id if direct_to_database else None, start_ts=start_ts, end_ts=end_ts,
+        )
+        if use_fallback and output_files:
+            base = os.path.splitext(os.path.basename(file))[0]
+            dump_extraction_repo.mark_completed(base, {subreddit: output_files[0]}, {})
         all_output_files.extend(output_files)
         
     
@@ -1394,6 +1407,140 @@ async def get_reddit_data_from_torrent(
     return all_output_files
 
 
+async def get_multi_subreddit_data_from_torrent(
+    manager: ConnectionManager,
+    app_id: str,
+    run_id: str,
+    workspace_id: str,
+    subreddits: list[str],
+    start_month: str = "2005-06",
+    end_month: str = "2023-12",
+    submissions_only: bool = True,
+    download_dir: str = None,
+) -> Dict[str, list[str]]:
+    # Batch mode for the monthly fallback torrent: every RC_/RS_ dump is downloaded and decompressed once
+    # and its records are fanned out to academic-torrent-<subreddit> folders. Completed (dump, subreddit)
+    # pairs are recorded in dump_extractions, so a rerun only reopens dumps that still miss a subreddit.
+    subreddits = list(dict.fromkeys(subreddits))
+    message = f"Using fallback torrent for {len(subreddits)} subreddits with range {start_month} to {end_month}."
+    c, torrent_to_use, magnet_link, TRANSMISSION_ABSOLUTE_DOWNLOAD_DIR = await open_reddit_torrent(
+        manager, app_id, run_id, message, True, download_dir
+    )
+
+    parent_dir = os.path.dirname(TRANSMISSION_ABSOLUTE_DOWNLOAD_DIR)
+    academic_folders = {subreddit: os.path.join(parent_dir, f"academic-torrent-{subreddit}") for subreddit in subreddits}
+    for folder in academic_folders.values():
+        os.makedirs(folder, exist_ok=True)
+
+    wanted_range = generate_month_range(start_month, end_month)
+    files_to_process = get_files_to_process_fallback(torrent_to_use.get_files(), wanted_range, submissions_only)
+
+    # (output file, academic folder) pairs linked into DATASETS_DIR once at the end of the run, which costs
+    # a single UAC prompt on Windows. Outputs of earlier runs whose link is missing are linked as well.
+    links = []
+    pending = {}
+    for zst_file in files_to_process:
+        base = os.path.splitext(os.path.basename(zst_file))[0]
+        done = dump_extraction_repo.completed_subreddits(base, subreddits)
+        for subreddit in done:
+            folder = academic_folders[subreddit]
+            if not os.path.lexists(os.path.join(DATASETS_DIR, os.path.basename(folder), f"{base}.jsonl")):
+                links.append((os.path.join(folder, f"{base}.jsonl"), folder))
+        remaining = [subreddit for subreddit in subreddits if subreddit not in done]
+        if remaining:
+            pending[zst_file] = remaining
+
+    skipped = [os.path.splitext(os.path.basename(f))[0] for f in files_to_process if f not in pending]
+    if skipped:
+        message = f"Files already downloaded: {', '.join(skipped)}"
+        await send_ipc_message(app_id, message)
+        update_run_progress(run_id, message, current_download_dir=download_dir)
+
+    message = f"Files to process: {len(pending)}"
+    await send_ipc_message(app_id, message)
+    update_run_progress(run_id, message, current_download_dir=download_dir)
+
+    file_repo.insert_batch(
+        list(map(lambda f: FileStatus(run_id=run_id, file_name=f, workspace_id=workspace_id), pending))
+    )
+
+    torrent_to_use = await verify_torrent_with_retry(manager, app_id, run_id, c, torrent_to_use, magnet_link, TRANSMISSION_ABSOLUTE_DOWNLOAD_DIR)
+
+    outputs = {subreddit: [] for subreddit in subreddits}
+    try:
+        await extract_pending_dumps(
+            app_id, run_id, c, torrent_to_use, pending, academic_folders, outputs, links,
+            TRANSMISSION_ABSOLUTE_DOWNLOAD_DIR, download_dir,
+        )
+    except Exception:
+        # Dumps extracted before the failure are recorded as done, so link them before giving up.
+        try:
+            await link_academic_files(app_id, run_id, links, download_dir)
+        except Exception as e:
+            print(f"Failed to link extracted files: {e}")
+        raise
+    await link_academic_files(app_id, run_id, links, download_dir)
+
+    message = f"All wanted files have been processed. Total new files: {sum(len(files) for files in outputs.values())}."
+    print(message)
+    await send_ipc_message(app_id, message)
+    update_run_progress(run_id, message, current_download_dir=download_dir)
+    return outputs
+
+
+async def extract_pending_dumps(
+    app_id: str,
+    run_id: str,
+    c: Client,
+    torrent_to_use: Torrent,
+    pending: Dict[str, list[str]],
+    academic_folders: Dict[str, str],
+    outputs: Dict[str, list[str]],
+    links: list[tuple[str, str]],
+    TRANSMISSION_ABSOLUTE_DOWNLOAD_DIR: str,
+    download_dir: str = None,
+):
+    zstd_executable = PATHS["executables"]["zstd"]
+    for file_name, remaining in pending.items():
+        message = f"Processing file: {file_name} for {len(remaining)} subreddits ..."
+        await send_ipc_message(app_id, message)
+        update_run_progress(run_id, message, current_download_dir=download_dir)
+
+        file_path = os.path.join(TRANSMISSION_ABSOLUTE_DOWNLOAD_DIR, file_name)
+        file_path_zst = file_path if file_path.endswith('.zst') else file_path + '.zst'
+        try:
+            await download_torrent_file(app_id, run_id, c, torrent_to_use, file_name, TRANSMISSION_ABSOLUTE_DOWNLOAD_DIR)
+
+            message = f"Extracting data from {file_path_zst}..."
+            await send_ipc_message(app_id, message)
+            update_run_progress(run_id, message, current_download_dir=download_dir)
+
+            base = os.path.splitext(os.path.basename(file_path_zst))[0]
+            output_paths = {subreddit: os.path.join(academic_folders[subreddit], f"{base}.jsonl") for subreddit in remaining}
+            batches = iterate_in_thread(iter_dump_batches(file_path_zst, remaining, zstd_executable, INGEST_BATCH_SIZE))
+            counts = await write_subreddit_files(batches, output_paths)
+
+            for subreddit in remaining:
+                outputs[subreddit].append(output_paths[subreddit])
+                links.append((output_paths[subreddit], academic_folders[subreddit]))
+            dump_extraction_repo.mark_completed(base, output_paths, counts)
+
+            summary = ", ".join(f"{subreddit}: {counts[subreddit]}" for subreddit in remaining)
+            message = f"Processed file: {file_name} ({summary})"
+            await send_ipc_message(app_id, message)
+            update_run_progress(run_id, message, current_download_dir=download_dir)
+        except Exception as e:
+            message = f"Error processing file {file_name}: {e}"
+            print(message)
+            await send_ipc_message(app_id, message)
+            raise e
+        finally:
+            c.stop_torrent(torrent_to_use.id)
+            if os.path.exists(file_path_zst):
+                print(f"Removing file {file_path_zst}")
+                os.remove(file_path_zst)
+
+
 def filter_posts_by_deleted(workspace_id: str):
     return post_repo.get_filtered_post_ids(workspace_id)
 
@@ -1547,44 +1694,16 @@ async def check_primary_torrent(
     
 
 async def get_post_transcripts_csv(workspace_id: str, post_ids: List[str], csv_file: str) -> None:
-    sem = asyncio.Semaphore(os.cpu_count())
-    transcripts = [None] * len(post_ids) 
-    next_index = 0
-    write_lock = asyncio.Lock()
-
-    async def fetch_post_transcript(post_id: str, index: int) -> None:
-        async with sem:
-            try:
-                post = await asyncio.to_thread(get_reddit_post_by_id, workspace_id, post_id, ["id", "title", "selftext"])
-                first_item = await anext(generate_transcript(post))
-                transcript = (
-                    first_item["transcript"]
-                    if isinstance(first_item, dict)
-                    else first_item
-                )
-            except HTTPException as e:
-                print(f"Post {post_id} not found: {e.detail}")
-                transcript = ""
-            except Exception as e:
-                print(f"Unexpected error for post {post_id}: {e}")
-                transcript = ""
-            transcripts[index] = transcript 
-            await write_consecutive()
-
-    async def write_consecutive():
-        nonlocal next_index
-        async with write_lock:
-            while next_index < len(post_ids) and transcripts[next_index] is not None:
-                writer.writerow({"Post ID": post_ids[next_index], "Transcript": transcripts[next_index]})
-                next_index += 1
-
-    with open(csv_file, "w", newline="", encoding="utf-8", errors="replace") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=["Post ID", "Transcript"])
-        writer.writeheader()
-
-        tasks = [fetch_post_transcript(post_id, i) for i, post_id in enumerate(post_ids)]
-        await asyncio.gather(*tasks) 
-
+    def write_csv():
+        with open(csv_file, "w", newline="", encoding="utf-8", errors="replace") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=["Post ID", "Transcript"])
+            writer.writeheader()
+            for post_id, transcript in iter_post_transcripts(workspace_id, post_ids):
+                if transcript is None:
+                    print(f"Post {post_id} not found")
+                writer.writerow({"Post ID": post_id, "Transcript": transcript or ""})
+
+    await asyncio.to_thread(write_csv)
     return csv_file
 
 
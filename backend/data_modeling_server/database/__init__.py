@@ -2,15 +2,21 @@ from .comments_table import CommentsRepository
 from .datasets_table import DatasetsRepository
 from .llm_responses_table import LlmResponsesRepository
 from .posts_table import PostsRepository
+from .post_stats_table import PostStatsRepository
 from .workspace_states_table import WorkspaceStatesRepository
 from .workspace_table import WorkspacesRepository
 from .pipeline_step_table import PipelineStepsRepository
 from .file_status_table import FileStatusRepository
+from .dump_extraction_table import DumpExtractionsRepository
 from .torrent_download_progress import TorrentDownloadProgressRepository
 from .function_progress_repository import FunctionProgressRepository
 from .qect_table import QectRepository
 from .llm_pending_tasks import LlmPendingTaskRepository
 from .llm_function_args_table import LlmFunctionArgsRepository
+from .llm_provider_budget_table import LlmProviderBudgetRepository
+from .llm_scheduler_lease_table import LlmSchedulerLeaseRepository
+from .llm_response_cache_table import LlmResponseCacheRepository
+from .embedding_cache_table import EmbeddingCacheRepository
 from .selected_post_ids_table import SelectedPostIdsRepository
 from .grouped_code_table import GroupedCodeEntriesRepository
 from .theme_table import ThemeEntriesRepository
@@ -24,24 +30,33 @@ from .selected_concepts_table import SelectedConceptsRepository
 from .concept_entry_table import ConceptEntriesRepository
 from .collection_context_table import CollectionContextRepository
 from .initial_codebook_table import InitialCodebookEntriesRepository
+from .state_version_table import StateVersionRepository
+from .collection_version_table import CollectionVersionRepository
 from .initialize import initialize_database, initialize_study_database
 from .db_helpers import execute_query, execute_query_with_retry
+from .connection_pool import close_all_pools, get_connection_pool, get_pool_stats, reset_connection_pool
 
 __all__ = [
     "CommentsRepository",
     "DatasetsRepository",
     "LlmResponsesRepository",
     "PostsRepository",
+    "PostStatsRepository",
     "WorkspaceStatesRepository",
     "WorkspacesRepository",
     "PipelineStepsRepository",
     "FileStatusRepository",
+    "DumpExtractionsRepository",
     "TorrentDownloadProgressRepository",
     "FunctionProgressRepository",
     "QectRepository",
     "SelectedPostIdsRepository",
     "LlmPendingTaskRepository",
     "LlmFunctionArgsRepository",
+    "LlmProviderBudgetRepository",
+    "LlmSchedulerLeaseRepository",
+    "LlmResponseCacheRepository",
+    "EmbeddingCacheRepository",
     "ErrorLogRepository",
     "BackgroundJobsRepository",
     "CodingContextRepository",
@@ -54,8 +69,14 @@ __all__ = [
     "ThemeEntriesRepository",
     "CollectionContextRepository",
     "InitialCodebookEntriesRepository",
+    "StateVersionRepository",
+    "CollectionVersionRepository",
     "initialize_database",
     "initialize_study_database",
     "execute_query",
     "execute_query_with_retry",
+    "get_connection_pool",
+    "get_pool_stats",
+    "reset_connection_pool",
+    "close_all_pools",
 ]
\ No newline at end of file
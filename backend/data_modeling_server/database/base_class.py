@@ -1,10 +1,10 @@
 import sqlite3
-from typing import Type, TypeVar, List, Optional, Dict, Any, Generic, get_type_hints
+from typing import Generator, Iterable, Type, TypeVar, List, Optional, Dict, Any, Generic, get_type_hints
 from sqlite3 import Cursor, Row
 from dataclasses import fields, asdict
 
 from constants import DATABASE_PATH
-from database.db_helpers import tuned_connection
+from database.connection_pool import SQLiteConnectionPool, get_connection_pool, is_read_only
 from database.initialize import SQLITE_TYPE_MAPPING, generate_create_table_statement
 from database.query_builder import QueryBuilder
 from errors.database_errors import (
@@ -18,7 +18,13 @@ from decorators import handle_db_errors, auto_recover
 
 T = TypeVar("T") 
 
+_state_version_repo = None
+
 class BaseRepository(Generic[T]):
+    # Workspace id column of tables that make up the versioned coding state; writes to them bump
+    # StateVersionRepository for that workspace.
+    state_version_column: Optional[str] = None
+
     def __init__(self, table_name: str, model: Type[T], database_path: str = DATABASE_PATH):
         print(f"Initializing BaseRepository with table_name: {table_name}, model: {model}, database_path: {database_path}")
         self.table_name = table_name
@@ -27,15 +33,38 @@ class BaseRepository(Generic[T]):
         self.database_path = database_path
         self.sync_table_schema()
 
+    def touch_state_version(self, workspace_ids: Optional[Iterable[str]] = None) -> None:
+        if not self.state_version_column:
+            return
+        global _state_version_repo
+        if _state_version_repo is None:
+            from database.state_version_table import StateVersionRepository
+            _state_version_repo = StateVersionRepository()
+        _state_version_repo.touch(workspace_ids)
+
+    def _filter_workspace_ids(self, filters: Optional[Dict[str, Any]]) -> Optional[List[str]]:
+        value = (filters or {}).get(self.state_version_column)
+        if isinstance(value, list):
+            return value
+        if isinstance(value, tuple):
+            return [value[1]] if value[0] == "=" else None
+        return None if value is None else [value]
+
+    def _row_workspace_ids(self, rows: List[Any]) -> List[str]:
+        return [getattr(row, self.state_version_column, None) for row in rows]
+
     def query_builder(self) -> QueryBuilder[T]:
         return self.query_builder_instance
+
+    def connection_pool(self) -> SQLiteConnectionPool:
+        return get_connection_pool(self.database_path)
     
     def set_database_path(self, database_path: str) -> None:
         self.database_path = database_path
 
     def get_table_schema(self) -> Dict[str, str]:
         try:
-            with tuned_connection(self.database_path) as conn:
+            with self.connection_pool().reader() as conn:
                 cursor = conn.cursor()
                 cursor.execute(f"PRAGMA table_info({self.table_name})")
                 return {col[1]: col[2] for col in cursor.fetchall()}
@@ -46,7 +75,7 @@ class BaseRepository(Generic[T]):
         return {field.name: field.type for field in fields(self.model)}
 
     def sync_table_schema(self) -> None:
-        with tuned_connection(self.database_path) as conn:
+        with self.connection_pool().writer() as conn:
             cursor = conn.cursor()
             cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{self.table_name}'")
             if not cursor.fetchone():
@@ -61,7 +90,7 @@ class BaseRepository(Generic[T]):
         extra_columns = set(table_schema.keys()) - set(model_fields.keys())
 
         if missing_columns or extra_columns:
-            with tuned_connection(self.database_path) as conn:
+            with self.connection_pool().writer() as conn:
                 cursor = conn.cursor()
                 if missing_columns:
                     for col in missing_columns:
@@ -114,7 +143,7 @@ class BaseRepository(Generic[T]):
     @handle_db_errors
     @auto_recover
     def execute_query(self, query: str, params: tuple = (), result = False)->(Cursor | None):
-        with tuned_connection(self.database_path) as conn:
+        with self.connection_pool().writer() as conn:
             cursor = conn.cursor()
             query_result = cursor.execute(query, params)
             conn.commit()
@@ -124,7 +153,7 @@ class BaseRepository(Generic[T]):
     @handle_db_errors   
     @auto_recover  
     def execute_many_query(self, query: str, params_list: List[tuple], result = False) -> None:
-        with tuned_connection(self.database_path) as conn:
+        with self.connection_pool().writer() as conn:
             cursor = conn.cursor()
             query_result = cursor.executemany(query, params_list)
             conn.commit()
@@ -134,7 +163,7 @@ class BaseRepository(Generic[T]):
     @handle_db_errors
     @auto_recover
     def fetch_all(self, query: str, params: tuple = (), map_to_model = True) -> List[T] | List[Dict[str, Any]]:
-        with tuned_connection(self.database_path) as conn:
+        with self.connection_pool().connection(query) as conn:
             conn.row_factory = Row
             cursor = conn.cursor()
             cursor.execute(query, params)
@@ -146,7 +175,7 @@ class BaseRepository(Generic[T]):
     @handle_db_errors
     @auto_recover
     def fetch_one(self, query: str, params: tuple = (), map_to_model = True) -> Optional[T] | Optional[Dict[str, Any]]:
-        with tuned_connection(self.database_path) as conn:
+        with self.connection_pool().connection(query) as conn:
             conn.row_factory = Row
             cursor = conn.cursor()
             cursor.execute(query, params)
@@ -163,7 +192,9 @@ class BaseRepository(Generic[T]):
         try:
             data_dict = asdict(data)
             query, params = self.query_builder_instance.insert(data_dict)
-            return self.execute_query(query, params, result=True)
+            cursor = self.execute_query(query, params, result=True)
+            self.touch_state_version(self._row_workspace_ids([data]))
+            return cursor
         except sqlite3.Error as e:
             raise InsertError(f"Failed to insert data into table {self.table_name}. Error: {e}")
 
@@ -178,15 +209,37 @@ class BaseRepository(Generic[T]):
             query, params_list = self.query_builder_instance.insert_batch(data_dicts)
 
             self.execute_many_query(query, params_list)
+            self.touch_state_version(self._row_workspace_ids(data_list))
         except sqlite3.Error as e:
             raise InsertError(f"Failed to insert batch data into table {self.table_name}. Error: {e}")
 
+    @handle_db_errors
+    @auto_recover
+    def insert_rows(self, columns: List[str], rows: List[tuple], ignore_conflicts: bool = False) -> int:
+        # Fast path for bulk loads: rows are already tuples in `columns` order, so skip asdict/validation.
+        if not rows:
+            return 0
+        for column in columns:
+            self.query_builder_instance._validate_column(column)
+        conflict = "OR IGNORE " if ignore_conflicts else ""
+        query = f"INSERT {conflict}INTO {self.table_name} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+        with self.connection_pool().writer() as conn:
+            cursor = conn.executemany(query, rows)
+            conn.commit()
+            inserted = cursor.rowcount
+        if self.state_version_column:
+            index = columns.index(self.state_version_column) if self.state_version_column in columns else None
+            self.touch_state_version(None if index is None else [row[index] for row in rows])
+        return inserted
+
     @handle_db_errors
     @auto_recover
     def update(self, filters: Dict[str, Any], updates: Dict[str,Any]) -> None:
         try:
             query, params = self.query_builder_instance.update(filters, updates)
-            return self.execute_query(query, params, result=True)
+            cursor = self.execute_query(query, params, result=True)
+            self.touch_state_version(self._filter_workspace_ids(filters))
+            return cursor
         except sqlite3.Error as e:
             raise UpdateError(f"Failed to update records in table {self.table_name}. Error: {e}")
 
@@ -203,6 +256,8 @@ class BaseRepository(Generic[T]):
             ]
 
             self.execute_many_query(query_params_list[0][0], [qp[1] for qp in query_params_list])
+            workspace_ids = [self._filter_workspace_ids(filters) for filters in filters_list]
+            self.touch_state_version(None if None in workspace_ids else [w for ids in workspace_ids for w in ids])
         except sqlite3.Error as e:
             raise UpdateError(f"Failed to perform batch update in table {self.table_name}. Error: {e}")
 
@@ -211,7 +266,9 @@ class BaseRepository(Generic[T]):
     def delete(self, filters: Dict[str, Any], *args, **kwargs):
         try:
             query, params = self.query_builder_instance.delete(filters, *args, **kwargs)
-            return self.execute_query(query, params, result=True)
+            cursor = self.execute_query(query, params, result=True)
+            self.touch_state_version(self._filter_workspace_ids(filters))
+            return cursor
         except sqlite3.Error as e:
             raise DeleteError(f"Failed to delete records from table {self.table_name}. Error: {e}")
 
@@ -263,7 +320,7 @@ class BaseRepository(Generic[T]):
     @auto_recover
     def count(self, filters: Optional[Dict[str, Any]] = None) -> int:
         query, params = self.query_builder_instance.count(filters)
-        with tuned_connection(self.database_path) as conn:
+        with self.connection_pool().reader() as conn:
             cursor = conn.cursor()
             cursor.execute(query, params)
             return cursor.fetchone()[0]
@@ -271,15 +328,45 @@ class BaseRepository(Generic[T]):
     @handle_db_errors
     @auto_recover
     def execute_raw_query(self, query: str, params: tuple = (), keys = False) -> dict | sqlite3.Cursor:
-        with tuned_connection(self.database_path) as conn:
+        with self.connection_pool().connection(query) as conn:
             if keys:
                 conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             result = cursor.execute(query, params)
             conn.commit()
             if keys:
-                return [dict(row) for row in result]
-            return result
+                result = [dict(row) for row in result]
+        if not is_read_only(query):
+            self.touch_state_version()
+        return result
+
+    def iter_pages(
+        self,
+        where: str,
+        params: tuple = (),
+        columns: str = "*",
+        page_size: int = 500
+    ) -> Generator[List[Dict[str, Any]], None, None]:
+        """
+        Yields the rows matching `where` in rowid order, page_size rows at a time. Each page continues after
+        the last rowid seen instead of using OFFSET, so a full scan reads every row once rather than
+        re-reading all earlier rows on every page.
+        """
+        query = (
+            f"SELECT rowid AS _page_rowid, {columns} FROM {self.table_name} "
+            f"WHERE ({where}) AND rowid > ? ORDER BY rowid LIMIT ?"
+        )
+        last_rowid = -(2 ** 63)
+        while True:
+            rows = self.execute_raw_query(query, (*params, last_rowid, page_size), keys=True)
+            if not rows:
+                return
+            last_rowid = rows[-1]["_page_rowid"]
+            for row in rows:
+                del row["_page_rowid"]
+            yield rows
+            if len(rows) < page_size:
+                return
         
     @handle_db_errors
     @auto_recover
@@ -311,6 +398,7 @@ class BaseRepository(Generic[T]):
         query, params = self.query_builder_instance.insert(data_dict)
         query = query.rstrip().rstrip(';') + " RETURNING *;"
         rows = self.fetch_all(query, params, map_to_model=False)
+        self.touch_state_version(self._row_workspace_ids([data]))
         return rows[0] if rows else {}
 
     @handle_db_errors
@@ -318,14 +406,18 @@ class BaseRepository(Generic[T]):
     def update_returning(self, filters: Dict[str, Any], updates:  Dict[str, Any]) -> List[Dict[str, Any]]:
         query, params = self.query_builder_instance.update(filters, updates)
         query = query.rstrip().rstrip(';') + " RETURNING *;"
-        return self.fetch_all(query, params, map_to_model=False)
+        rows = self.fetch_all(query, params, map_to_model=False)
+        self.touch_state_version(self._filter_workspace_ids(filters))
+        return rows
 
     @handle_db_errors
     @auto_recover
     def delete_returning(self, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
         query, params = self.query_builder_instance.delete(filters)
         query = query.rstrip().rstrip(';') + " RETURNING *;"
-        return self.fetch_all(query, params, map_to_model=False)
+        rows = self.fetch_all(query, params, map_to_model=False)
+        self.touch_state_version(self._filter_workspace_ids(filters))
+        return rows
     
 
     @handle_db_errors
@@ -0,0 +1,29 @@
+from .base_class import BaseRepository
+from decorators import handle_db_errors, auto_recover
+from models import CollectionVersion
+
+class CollectionVersionRepository(BaseRepository[CollectionVersion]):
+    # Change counter per Chroma collection, shared by every worker so their retriever caches agree on
+    # when a collection's documents were replaced.
+    model = CollectionVersion
+    def __init__(self, *args, **kwargs):
+        super().__init__("collection_versions", CollectionVersion, *args, **kwargs)
+
+    @handle_db_errors
+    @auto_recover
+    def bump(self, collection: str) -> int:
+        with self.connection_pool().writer() as conn:
+            return conn.execute(
+                "INSERT INTO collection_versions (collection, version) VALUES (?, 1) "
+                "ON CONFLICT(collection) DO UPDATE SET version = version + 1 RETURNING version",
+                (collection,),
+            ).fetchone()[0]
+
+    @handle_db_errors
+    @auto_recover
+    def get(self, collection: str) -> int:
+        with self.connection_pool().reader() as conn:
+            row = conn.execute(
+                "SELECT version FROM collection_versions WHERE collection = ?", (collection,)
+            ).fetchone()
+            return row[0] if row else 0
@@ -1,4 +1,5 @@
-from database.db_helpers import tuned_connection
+from typing import Any, Dict, List
+
 from .base_class import BaseRepository
 from models import Comment
 
@@ -45,50 +46,22 @@ class CommentsRepository(BaseRepository[Comment]):
             AND body NOT IN ('[removed]', '[deleted]');
         """,
         ]
-        with tuned_connection(self.database_path) as conn:
+        with self.connection_pool().writer() as conn:
             for sql in index_sqls:
                 conn.execute(sql)
                 conn.commit()
     
-    def get_comments_by_post_optimized(self, workspace_id: str, post_id: str):
-        recursive_sql = """
-        WITH RECURSIVE comment_tree AS (
-        SELECT
-            id,
-            body,
-            author,
-            parent_id,
-            post_id,
-            0 AS depth
-        FROM comments
-        WHERE
-            post_id    = ?
-            AND workspace_id = ?
-            AND parent_id  = post_id
-
-        UNION ALL
-        SELECT
-            c.id,
-            c.body,
-            c.author,
-            c.parent_id,
-            c.post_id,
-            ct.depth + 1
-        FROM comments AS c
-        JOIN comment_tree AS ct
-            ON c.parent_id = ct.id
-        WHERE
-            c.workspace_id = ?
-        )
-        SELECT *
-        FROM comment_tree;
-        """
-
-        rows = self.execute_raw_query(
-            recursive_sql,
-            (post_id, workspace_id, workspace_id),
-            keys=True
-        )
-        print(rows)
-        return rows or []
-
+    def get_comments_by_posts(self, workspace_id: str, post_ids: List[str], chunk_size: int = 500) -> List[Dict[str, Any]]:
+        # Flat rows for many posts via idx_comments_by_post, one IN (...) query per chunk of ids;
+        # callers assemble the trees. Chunks stay well under SQLite's bound-parameter limit.
+        rows = []
+        for start in range(0, len(post_ids), chunk_size):
+            chunk = post_ids[start:start + chunk_size]
+            placeholders = ", ".join("?" for _ in chunk)
+            query = f"""
+            SELECT id, body, author, parent_id, post_id
+            FROM comments
+            WHERE workspace_id = ? AND post_id IN ({placeholders})
+            """
+            rows.extend(self.execute_raw_query(query, (workspace_id, *chunk), keys=True) or [])
+        return rows
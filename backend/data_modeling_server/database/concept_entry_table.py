@@ -1,9 +1,25 @@
+from typing import List
+from decorators import handle_db_errors, auto_recover
 from models import ConceptEntry
 from .base_class import BaseRepository
 
 class ConceptEntriesRepository(BaseRepository[ConceptEntry]):
     model = ConceptEntry
+    state_version_column = "coding_context_id"
     def __init__(self, *args, **kwargs):
         super().__init__("concept_entries", ConceptEntry, *args, **kwargs)
-    
 
+    @handle_db_errors
+    @auto_recover
+    def replace_for_context(self, coding_context_id: str, entries: List[ConceptEntry]) -> int:
+        # Swaps all entries of a coding context in one transaction, so readers see either the old or the new set.
+        with self.connection_pool().writer() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM concept_entries WHERE coding_context_id = ?", (coding_context_id,))
+            conn.executemany(
+                "INSERT INTO concept_entries (id, coding_context_id, word, description, is_marked) VALUES (?, ?, ?, ?, ?)",
+                [(e.id, e.coding_context_id, e.word, e.description, e.is_marked) for e in entries],
+            )
+            conn.commit()
+        self.touch_state_version([coding_context_id])
+        return len(entries)
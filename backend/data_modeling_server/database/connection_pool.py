@@ -0,0 +1,209 @@
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from constants import DATABASE_PATH
+
+READ_ONLY_STATEMENT = re.compile(r"^\s*(SELECT|WITH|PRAGMA\s+table_info|EXPLAIN)\b", re.IGNORECASE)
+# A CTE can front a write (WITH ... DELETE/UPDATE/INSERT), which must go through the writer.
+DML_KEYWORD = re.compile(r"\b(INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+
+
+def configure_connection(conn: sqlite3.Connection) -> sqlite3.Connection:
+    c = conn.cursor()
+    c.execute("PRAGMA journal_mode = WAL;")
+    c.execute("PRAGMA wal_autocheckpoint = 500;")
+
+    c.execute("PRAGMA synchronous = NORMAL;")
+
+    c.execute("PRAGMA temp_store = MEMORY;")
+    c.execute("PRAGMA cache_size = -20000;")          # 20000 × 1024 bytes
+    c.close()
+    return conn
+
+
+def is_read_only(query: str) -> bool:
+    match = READ_ONLY_STATEMENT.match(query)
+    if not match or "RETURNING" in query.upper():
+        return False
+    return match.group(1).upper() != "WITH" or not DML_KEYWORD.search(query, match.end())
+
+
+class SQLiteConnectionPool:
+    # One pool per database file per process. Readers are handed out one thread at a time and kept
+    # in an idle list for reuse; all writes go through a single connection guarded by a lock, which
+    # matches SQLite's single-writer model and avoids "database is locked" churn between our own threads.
+    def __init__(self, db_path: str, max_idle_readers: int = 8, cached_statements: int = 256, timeout: float = 30.0):
+        self.db_path = db_path
+        self.max_idle_readers = max_idle_readers
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._writer_lock = threading.RLock()
+        self._idle_readers: List[sqlite3.Connection] = []
+        self._writer: Optional[sqlite3.Connection] = None
+        self._pid = os.getpid()
+
+        self.acquired = 0
+        self.opened = 0
+        self.closed = 0
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        configure_connection(conn)
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    def _check_fork(self):
+        # Connections must never cross a fork; a child process starts with an empty pool.
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._idle_readers = []
+                    self._writer = None
+                    self._pid = os.getpid()
+
+    def _close(self, conn: sqlite3.Connection):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self.closed += 1
+
+    @staticmethod
+    def _finish(conn: sqlite3.Connection, failed: bool):
+        if conn.in_transaction:
+            if failed:
+                conn.rollback()
+            else:
+                conn.commit()
+        conn.row_factory = None
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        self._check_fork()
+        with self._lock:
+            self.acquired += 1
+            conn = self._idle_readers.pop() if self._idle_readers else None
+        if conn is None:
+            conn = self._open()
+
+        failed = False
+        try:
+            yield conn
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            try:
+                self._finish(conn, failed)
+            except sqlite3.Error:
+                self._close(conn)
+                conn = None
+            if conn is not None:
+                with self._lock:
+                    keep = len(self._idle_readers) < self.max_idle_readers and self._pid == os.getpid()
+                    if keep:
+                        self._idle_readers.append(conn)
+                if not keep:
+                    self._close(conn)
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        self._check_fork()
+        with self._writer_lock:
+            with self._lock:
+                self.acquired += 1
+            if self._writer is None:
+                self._writer = self._open()
+            conn = self._writer
+
+            failed = False
+            try:
+                yield conn
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                try:
+                    self._finish(conn, failed)
+                except sqlite3.Error:
+                    self._close(conn)
+                    self._writer = None
+
+    @contextmanager
+    def connection(self, query: Optional[str] = None) -> Iterator[sqlite3.Connection]:
+        if query is not None and is_read_only(query):
+            with self.reader() as conn:
+                yield conn
+        else:
+            with self.writer() as conn:
+                yield conn
+
+    def close_all(self):
+        with self._writer_lock:
+            with self._lock:
+                idle, self._idle_readers = self._idle_readers, []
+                writer, self._writer = self._writer, None
+            for conn in idle + ([writer] if writer else []):
+                self._close(conn)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "database": self.db_path,
+                "acquired": self.acquired,
+                "opened": self.opened,
+                "closed": self.closed,
+                "reused": self.acquired - self.opened,
+                "idle_readers": len(self._idle_readers),
+                "writer_open": self._writer is not None,
+            }
+
+
+_pools: Dict[str, SQLiteConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(db_path: str = DATABASE_PATH) -> SQLiteConnectionPool:
+    pool = _pools.get(db_path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(db_path)
+            if pool is None:
+                pool = SQLiteConnectionPool(db_path)
+                _pools[db_path] = pool
+    return pool
+
+
+def get_pool_stats() -> List[Dict[str, int]]:
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
+
+
+def reset_connection_pool(db_path: str = DATABASE_PATH):
+    # For when the file at db_path is replaced or deleted: open connections would keep using the old inode,
+    # so they are closed and the next get_connection_pool() opens fresh ones on the new file.
+    with _pools_lock:
+        pool = _pools.pop(db_path, None)
+    if pool is not None:
+        pool.close_all()
+
+
+def close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
@@ -3,26 +3,18 @@ import sqlite3
 import time
 from typing import List, Dict, Any
 from constants import DATABASE_PATH
+from database.connection_pool import configure_connection, get_connection_pool
 
 
 
 def tuned_connection(db_path: str = DATABASE_PATH) -> sqlite3.Connection:
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute("PRAGMA journal_mode = WAL;")
-    c.execute("PRAGMA wal_autocheckpoint = 500;") 
-
-    c.execute("PRAGMA synchronous = NORMAL;")
-
-    c.execute("PRAGMA temp_store = MEMORY;")
-    c.execute("PRAGMA cache_size = -20000;")          # 20000 × 1024 bytes
-
-    return conn
+    # Standalone connection owned by the caller; repositories go through the pool instead.
+    return configure_connection(sqlite3.connect(db_path))
 
 
 
 def execute_query(query: str, params: tuple = (), keys = False) -> List[tuple]:
-    with tuned_connection(DATABASE_PATH) as conn:
+    with get_connection_pool(DATABASE_PATH).connection(query) as conn:
         if keys:
             conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
@@ -37,7 +29,7 @@ def execute_query(query: str, params: tuple = (), keys = False) -> List[tuple]:
 def execute_query_with_retry(query: str, params: tuple = (), retries: int = 5, backoff: float = 0.1):
     for attempt in range(retries):
         try:
-            with tuned_connection(DATABASE_PATH) as conn:
+            with get_connection_pool(DATABASE_PATH).writer() as conn:
                 sqlite3.threadsafety = 1
                 conn.execute("BEGIN")
                 cursor = conn.cursor()
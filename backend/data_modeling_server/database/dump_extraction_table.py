@@ -0,0 +1,25 @@
+import os
+from typing import Dict, Iterable, Set
+
+from .base_class import BaseRepository
+from models import DumpExtraction
+
+class DumpExtractionsRepository(BaseRepository[DumpExtraction]):
+    model = DumpExtraction
+    def __init__(self, *args, **kwargs):
+        super().__init__("dump_extractions", DumpExtraction, *args, **kwargs)
+
+    def completed_subreddits(self, dump_file: str, subreddits: Iterable[str]) -> Set[str]:
+        # A pair only counts as done while its output file is still on disk.
+        done = self.find({"dump_file": dump_file, "subreddit": list(subreddits)})
+        return {row.subreddit for row in done if os.path.exists(row.output_path)}
+
+    def mark_completed(self, dump_file: str, outputs: Dict[str, str], records: Dict[str, int]):
+        if not outputs:
+            return
+        # Replaces rows left behind by an earlier run whose output file was since removed.
+        self.delete({"dump_file": dump_file, "subreddit": list(outputs)})
+        self.insert_batch([
+            DumpExtraction(dump_file=dump_file, subreddit=subreddit, output_path=path, records=records.get(subreddit, 0))
+            for subreddit, path in outputs.items()
+        ])
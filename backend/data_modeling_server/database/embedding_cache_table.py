@@ -0,0 +1,81 @@
+import os
+import time
+from typing import Dict, List, Tuple
+
+from .base_class import BaseRepository
+from constants import EMBEDDING_CACHE_PATH
+from database.connection_pool import reset_connection_pool
+from decorators import handle_db_errors
+from models import EmbeddingCacheEntry
+
+class EmbeddingCacheRepository(BaseRepository[EmbeddingCacheEntry]):
+    # Not @auto_recover: that recovers main.db. The cache file holds nothing that cannot be recomputed,
+    # so a corrupt one is deleted and recreated instead (see reset()).
+    model = EmbeddingCacheEntry
+    def __init__(self, database_path: str = EMBEDDING_CACHE_PATH, *args, **kwargs):
+        super().__init__("embedding_cache", EmbeddingCacheEntry, database_path, *args, **kwargs)
+
+    def reset(self):
+        reset_connection_pool(self.database_path)
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(self.database_path + suffix)
+            except FileNotFoundError:
+                pass
+        self.sync_table_schema()
+
+    @handle_db_errors
+    def lookup_many(self, cache_keys: List[str]) -> Dict[str, Tuple[str, bytes]]:
+        # Returns {cache_key: (dtype, vector)} for the keys that are stored and marks them as used.
+        found: Dict[str, Tuple[str, bytes]] = {}
+        with self.connection_pool().reader() as conn:
+            for i in range(0, len(cache_keys), 500):
+                keys = cache_keys[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT cache_key, dtype, vector FROM embedding_cache WHERE cache_key IN ({', '.join('?' for _ in keys)})",
+                    keys,
+                ).fetchall()
+                found.update({row[0]: (row[1], row[2]) for row in rows})
+        if found:
+            now = time.time()
+            with self.connection_pool().writer() as conn:
+                conn.executemany(
+                    "UPDATE embedding_cache SET last_used_at = ? WHERE cache_key = ?",
+                    [(now, key) for key in found],
+                )
+        return found
+
+    @handle_db_errors
+    def store_many(self, entries: List[EmbeddingCacheEntry]):
+        with self.connection_pool().writer() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache "
+                "(cache_key, provider, model, text_hash, dtype, vector, size_bytes, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        e.cache_key, e.provider, e.model, e.text_hash, e.dtype, e.vector,
+                        e.size_bytes, e.created_at, e.last_used_at,
+                    )
+                    for e in entries
+                ],
+            )
+
+    @handle_db_errors
+    def evict(self, max_bytes: int) -> int:
+        # Drops the least recently used vectors until the stored ones fit in max_bytes.
+        with self.connection_pool().writer() as conn:
+            return conn.execute(
+                "DELETE FROM embedding_cache WHERE cache_key IN ("
+                "SELECT cache_key FROM ("
+                "SELECT cache_key, SUM(size_bytes) OVER (ORDER BY last_used_at DESC, cache_key) AS used "
+                "FROM embedding_cache) WHERE used > ?)",
+                (max_bytes,),
+            ).rowcount
+
+    def summary(self) -> Dict[str, int]:
+        with self.connection_pool().reader() as conn:
+            entries, size_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM embedding_cache"
+            ).fetchone()
+        return {"entries": entries, "size_bytes": size_bytes}
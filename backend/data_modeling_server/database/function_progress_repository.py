@@ -1,9 +1,19 @@
 from typing import List
 from .base_class import BaseRepository
+from decorators import handle_db_errors, auto_recover
 from models import FunctionProgress
 
 class FunctionProgressRepository(BaseRepository[FunctionProgress]):
     model = FunctionProgress
     def __init__(self, *args, **kwargs):
         super().__init__("function_progress", FunctionProgress, *args, **kwargs)
-    
\ No newline at end of file
+
+    @handle_db_errors
+    @auto_recover
+    def increment_current(self, function_id: str, amount: int) -> int:
+        # Adds to the stored count in place, so concurrent writers never overwrite each other's progress.
+        with self.connection_pool().writer() as conn:
+            return conn.execute(
+                "UPDATE function_progress SET current = current + ? WHERE function_id = ?",
+                (amount, function_id),
+            ).rowcount
@@ -1,4 +1,3 @@
-from database.db_helpers import tuned_connection
 from .base_class import BaseRepository
 from models import GroupedCodeEntry
 
@@ -27,7 +26,7 @@ class GroupedCodeEntriesRepository(BaseRepository[GroupedCodeEntry]):
               ON grouped_code_entries(coding_context_id, higher_level_code_id);
             """
         ]
-        with tuned_connection(self.database_path) as conn:
+        with self.connection_pool().writer() as conn:
             for sql in index_sqls:
                 conn.execute(sql)
             conn.commit()
@@ -3,6 +3,7 @@ from .base_class import BaseRepository
 
 class InitialCodebookEntriesRepository(BaseRepository[InitialCodebookEntry]):
     model = InitialCodebookEntry
+    state_version_column = "coding_context_id"
     def __init__(self, *args, **kwargs):
         super().__init__("initial_codebook_entries", InitialCodebookEntry, *args, **kwargs)
     
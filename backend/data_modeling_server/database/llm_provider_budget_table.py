@@ -0,0 +1,7 @@
+from .base_class import BaseRepository
+from models import LlmProviderBudget
+
+class LlmProviderBudgetRepository(BaseRepository[LlmProviderBudget]):
+    model = LlmProviderBudget
+    def __init__(self, *args, **kwargs):
+        super().__init__("llm_provider_budget", LlmProviderBudget, *args, **kwargs)
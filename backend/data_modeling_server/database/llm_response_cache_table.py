@@ -0,0 +1,70 @@
+import time
+from typing import Dict, Optional
+
+from .base_class import BaseRepository
+from decorators import handle_db_errors, auto_recover
+from models import LlmResponseCacheEntry
+
+class LlmResponseCacheRepository(BaseRepository[LlmResponseCacheEntry]):
+    model = LlmResponseCacheEntry
+    def __init__(self, *args, **kwargs):
+        super().__init__("llm_response_cache", LlmResponseCacheEntry, *args, **kwargs)
+
+    @handle_db_errors
+    @auto_recover
+    def lookup(self, cache_key: str, min_created_at: float = 0.0) -> Optional[str]:
+        # Returns the stored response and bumps its hit count, or None for a miss or an expired entry.
+        now = time.time()
+        with self.connection_pool().writer() as conn:
+            row = conn.execute(
+                "SELECT response_json FROM llm_response_cache WHERE cache_key = ? AND created_at >= ?",
+                (cache_key, min_created_at),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE llm_response_cache SET hits = hits + 1, last_used_at = ? WHERE cache_key = ?",
+                (now, cache_key),
+            )
+            return row[0]
+
+    @handle_db_errors
+    @auto_recover
+    def store(self, entry: LlmResponseCacheEntry):
+        # A refreshed prompt replaces the previous response for the same key.
+        with self.connection_pool().writer() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_response_cache "
+                "(cache_key, workspace_id, provider, model, prompt_hash, response_json, temperature, seed, hits, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    entry.cache_key, entry.workspace_id, entry.provider, entry.model, entry.prompt_hash,
+                    entry.response_json, entry.temperature, entry.seed, entry.hits, entry.created_at, entry.last_used_at,
+                ),
+            )
+
+    @handle_db_errors
+    @auto_recover
+    def evict(self, max_entries: Optional[int] = None, min_created_at: float = 0.0) -> int:
+        # Drops expired entries, then the least recently used ones beyond max_entries.
+        with self.connection_pool().writer() as conn:
+            removed = conn.execute(
+                "DELETE FROM llm_response_cache WHERE created_at < ?", (min_created_at,)
+            ).rowcount
+            if max_entries:
+                removed += conn.execute(
+                    "DELETE FROM llm_response_cache WHERE cache_key IN ("
+                    "SELECT cache_key FROM llm_response_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                    (max_entries,),
+                ).rowcount
+            return removed
+
+    def summary(self, workspace_id: Optional[str] = None) -> Dict[str, int]:
+        query = "SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM llm_response_cache"
+        params = ()
+        if workspace_id:
+            query += " WHERE workspace_id = ?"
+            params = (workspace_id,)
+        with self.connection_pool().reader() as conn:
+            entries, hits = conn.execute(query, params).fetchone()
+        return {"entries": entries, "stored_hits": hits}
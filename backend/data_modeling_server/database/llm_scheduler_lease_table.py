@@ -0,0 +1,66 @@
+import time
+from typing import Optional
+
+from .base_class import BaseRepository
+from decorators import handle_db_errors, auto_recover
+from models import LlmSchedulerLease
+
+class LlmSchedulerLeaseRepository(BaseRepository[LlmSchedulerLease]):
+    model = LlmSchedulerLease
+    def __init__(self, *args, **kwargs):
+        super().__init__("llm_scheduler_lease", LlmSchedulerLease, *args, **kwargs)
+
+    @handle_db_errors
+    @auto_recover
+    def try_acquire(
+        self,
+        lease_id: str,
+        provider: str,
+        owner: str,
+        max_concurrency: Optional[int],
+        requests_per_minute: Optional[float],
+        burst: int,
+        lease_ttl: float,
+    ) -> float:
+        # Returns 0 when a slot was granted, otherwise the number of seconds to wait before retrying.
+        # BEGIN IMMEDIATE takes the write lock up front so every process sees the same budget.
+        now = time.time()
+        with self.connection_pool().writer() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM llm_scheduler_lease WHERE expires_at <= ?", (now,))
+
+            if max_concurrency:
+                (in_flight,) = conn.execute(
+                    "SELECT COUNT(*) FROM llm_scheduler_lease WHERE provider = ?", (provider,)
+                ).fetchone()
+                if in_flight >= max_concurrency:
+                    conn.rollback()
+                    return 0.25
+
+            if requests_per_minute:
+                rate = requests_per_minute / 60.0
+                row = conn.execute(
+                    "SELECT tokens, updated_at FROM llm_provider_budget WHERE provider = ?", (provider,)
+                ).fetchone()
+                tokens = float(burst) if row is None else min(float(burst), row[0] + (now - row[1]) * rate)
+                if tokens < 1.0:
+                    conn.rollback()
+                    return (1.0 - tokens) / rate
+                conn.execute(
+                    "INSERT INTO llm_provider_budget (provider, tokens, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(provider) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                    (provider, tokens - 1.0, now),
+                )
+
+            conn.execute(
+                "INSERT INTO llm_scheduler_lease (lease_id, provider, owner, acquired_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (lease_id, provider, owner, now, now + lease_ttl),
+            )
+            conn.commit()
+            return 0.0
+
+    def release(self, lease_id: str):
+        return self.delete({"lease_id": lease_id})
+
+    def release_owner(self, owner: str):
+        return self.delete({"owner": owner})
@@ -0,0 +1,39 @@
+from typing import List, Tuple
+
+from .base_class import BaseRepository
+from models import PostStat
+
+POST_STAT_COLUMNS = ["workspace_id", "post_id", "transcript_length", "token_estimate", "comment_count", "max_depth", "updated_at"]
+
+class PostStatsRepository(BaseRepository[PostStat]):
+    model = PostStat
+    def __init__(self, *args, **kwargs):
+        super().__init__("post_stats", PostStat, *args, **kwargs)
+
+    def missing_post_ids(self, workspace_id: str) -> List[str]:
+        query = """
+        SELECT p.id
+        FROM posts p
+        LEFT JOIN post_stats s
+          ON s.workspace_id = p.workspace_id AND s.post_id = p.id
+        WHERE p.workspace_id = ? AND s.post_id IS NULL
+        ORDER BY p.rowid
+        """
+        return [row["id"] for row in self.execute_raw_query(query, (workspace_id,), keys=True)]
+
+    def insert_stats(self, rows: List[Tuple]) -> int:
+        # rows are tuples in POST_STAT_COLUMNS order; existing stats for a post are kept
+        return self.insert_rows(POST_STAT_COLUMNS, rows, ignore_conflicts=True)
+
+    def get_sampling_frame(self, workspace_id: str, selection_type: str = "ungrouped") -> List[Tuple[str, int, int]]:
+        # (post_id, transcript_length, comment_count) for the selected posts, in selection order.
+        query = """
+        SELECT sp.post_id, s.transcript_length, s.comment_count
+        FROM selected_post_ids sp
+        JOIN post_stats s
+          ON s.workspace_id = sp.workspace_id AND s.post_id = sp.post_id
+        WHERE sp.workspace_id = ? AND sp.type = ?
+        ORDER BY sp.rowid
+        """
+        with self.connection_pool().reader() as conn:
+            return conn.execute(query, (workspace_id, selection_type)).fetchall()
@@ -1,6 +1,5 @@
 from typing import List
 
-from database.db_helpers import tuned_connection
 from .base_class import BaseRepository
 from models import Post
 
@@ -48,7 +47,7 @@ class PostsRepository(BaseRepository[Post]):
         ON posts(workspace_id);
         """,
         ]
-        with tuned_connection(self.database_path) as conn:
+        with self.connection_pool().writer() as conn:
             for sql in index_sqls:
                 conn.execute(sql)
                 conn.commit()
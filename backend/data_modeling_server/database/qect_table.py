@@ -1,6 +1,5 @@
 from typing import List
 
-from database.db_helpers import tuned_connection
 from .base_class import BaseRepository
 from models import QectResponse
 
@@ -54,7 +53,7 @@ class QectRepository(BaseRepository[QectResponse]):
             """,
         ]
 
-        with tuned_connection(self.database_path) as conn:
+        with self.connection_pool().writer() as conn:
             for sql in index_sqls:
                 conn.execute(sql)
                 conn.commit()
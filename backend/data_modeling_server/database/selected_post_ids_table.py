@@ -6,5 +6,16 @@ class SelectedPostIdsRepository(BaseRepository[SelectedPostId]):
     model = SelectedPostId
     def __init__(self, *args, **kwargs):
         super().__init__("selected_post_ids", SelectedPostId, *args, **kwargs)
-    
+        self.index_selected_post_ids()
 
+    def index_selected_post_ids(self):
+        # The primary key index orders rows by post_id within a workspace; this one keeps them in rowid
+        # order, so paging by rowid (iter_pages) is a range seek instead of a sort of the whole workspace.
+        with self.connection_pool().writer() as conn:
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_selected_post_ids_workspace_id
+                ON selected_post_ids(workspace_id);
+                """
+            )
+            conn.commit()
@@ -0,0 +1,65 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Iterator, Optional
+
+from .base_class import BaseRepository
+from decorators import handle_db_errors, auto_recover
+from models import StateVersion
+
+# Set while a caller writes the versioned tables and bumps the version once itself (see deferred()).
+_deferred: ContextVar[bool] = ContextVar("state_version_deferred", default=False)
+
+class StateVersionRepository(BaseRepository[StateVersion]):
+    """
+    One counter per workspace over the coding state tables (the repositories that set state_version_column).
+    Every write through those repositories bumps it, so a client can tell whether its copy is still current.
+    """
+    model = StateVersion
+    def __init__(self, *args, **kwargs):
+        super().__init__("state_versions", StateVersion, *args, **kwargs)
+
+    @handle_db_errors
+    @auto_recover
+    def bump(self, workspace_id: str) -> int:
+        # Creates the row on first use; the increment happens in SQL so concurrent saves never reuse a version.
+        with self.connection_pool().writer() as conn:
+            return conn.execute(
+                "INSERT INTO state_versions (workspace_id, version) VALUES (?, 1) "
+                "ON CONFLICT(workspace_id) DO UPDATE SET version = version + 1 RETURNING version",
+                (workspace_id,),
+            ).fetchone()[0]
+
+    @handle_db_errors
+    @auto_recover
+    def touch(self, workspace_ids: Optional[Iterable[str]] = None) -> None:
+        # Called by the versioned repositories after a write. None means the workspace is not known
+        # (raw SQL, filters without the workspace column), so every workspace is bumped.
+        if _deferred.get():
+            return
+        with self.connection_pool().writer() as conn:
+            if workspace_ids is None:
+                conn.execute("UPDATE state_versions SET version = version + 1")
+            else:
+                conn.executemany(
+                    "INSERT INTO state_versions (workspace_id, version) VALUES (?, 1) "
+                    "ON CONFLICT(workspace_id) DO UPDATE SET version = version + 1",
+                    [(workspace_id,) for workspace_id in set(workspace_ids) if workspace_id],
+                )
+
+    @contextmanager
+    def deferred(self) -> Iterator[None]:
+        # Writes made inside the block do not bump; the caller bumps once afterwards, so one action is one version.
+        token = _deferred.set(True)
+        try:
+            yield
+        finally:
+            _deferred.reset(token)
+
+    @handle_db_errors
+    @auto_recover
+    def get(self, workspace_id: str) -> int:
+        with self.connection_pool().reader() as conn:
+            row = conn.execute(
+                "SELECT version FROM state_versions WHERE workspace_id = ?", (workspace_id,)
+            ).fetchone()
+            return row[0] if row else 0
@@ -1,4 +1,3 @@
-from database.db_helpers import tuned_connection
 from .base_class import BaseRepository
 from models import ThemeEntry
 
@@ -27,7 +26,7 @@ class ThemeEntriesRepository(BaseRepository[ThemeEntry]):
                 ON theme_entries(coding_context_id, theme);
             """
         ]
-        with tuned_connection(self.database_path) as conn:
+        with self.connection_pool().writer() as conn:
             for sql in index_sqls:
                 conn.execute(sql)
             conn.commit()
@@ -27,6 +27,9 @@ def auto_recover(func):
                 cmd = f'{sqlite3_cli} "{corrupt_db}" ".recover" | {sqlite3_cli} "{recovered_db}"'
                 print(f"Running recovery command: {cmd}")
                 subprocess.check_call(cmd, shell=True)
+                # The pool's open connections still point at the corrupt file, which is about to be replaced.
+                from database.connection_pool import reset_connection_pool
+                reset_connection_pool(corrupt_db)
                 if os.path.exists(corrupt_db):
                     os.remove(corrupt_db)
                 shutil.move(recovered_db, corrupt_db)
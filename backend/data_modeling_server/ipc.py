@@ -4,14 +4,20 @@ import os
 import asyncio
 import socket
 import json
-from typing import Callable, Awaitable
-
-from errors.request_errors import RequestError
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Dict, Hashable, Optional
 
 # on Windows use TCP, otherwise Unix domain socket
 USE_TCP = sys.platform.startswith("win")
 ADDR = ("localhost", 11223) if USE_TCP else "/tmp/details_ws_ipc.sock"
 
+# Client side: messages kept while the server is slow or unreachable (oldest dropped first), lines per write,
+# and the longest wait between reconnect attempts.
+IPC_MAX_PENDING = 2000
+IPC_MAX_BATCH = 200
+IPC_RECONNECT_MAX_DELAY = 2.0
+
 ipc_owner = False
 
 async def start_ipc_server(
@@ -76,27 +82,186 @@ async def _tcp_client(
     await writer.wait_closed()
 
 
-async def send_ipc_message(app_id: str, message: str):
-    data = json.dumps({"app_id": app_id, "message": message}) + "\n"
-    for attempt in range(1, 4):
+class IpcClient:
+    """
+    One long-lived connection to the IPC server per process. send() only queues the line and returns, so
+    reporting never waits on the socket; a background task writes queued lines in batches and reconnects
+    with backoff when the server goes away.
+
+    A message sent with a coalesce_key replaces the queued, not yet written message with the same key,
+    so a burst of progress updates costs one line. Past max_pending queued lines the oldest are dropped.
+    """
+
+    def __init__(
+        self,
+        max_pending: int = IPC_MAX_PENDING,
+        max_batch: int = IPC_MAX_BATCH,
+        reconnect_max_delay: float = IPC_RECONNECT_MAX_DELAY,
+    ):
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self.reconnect_max_delay = reconnect_max_delay
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Entries are [coalesce_key, line]; keyed entries are also indexed so later sends can replace them.
+        self._pending: deque = deque()
+        self._keyed: Dict[Hashable, list] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._sender: Optional[asyncio.Task] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writing = False
+
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.connects = 0
+
+    def send(self, app_id: str, message: str, coalesce_key: Optional[Hashable] = None):
+        line = json.dumps({"app_id": app_id, "message": message}) + "\n"
+        key = (app_id, coalesce_key) if coalesce_key is not None else None
         try:
-            if USE_TCP:
-                reader, writer = await asyncio.open_connection(*ADDR)
-            else:
-                reader, writer = await asyncio.open_unix_connection(path=ADDR)
-            break
-        except FileNotFoundError:
-            if attempt < 3:
-                await asyncio.sleep(1)
-            else:
-                print(f"IPC server not running after {attempt} attempts, unable to send message: {message}")
-                raise RequestError(
-                    status_code=500,
-                    message=f"IPC server not running, unable to send message: {message}"
-                )
-    try:
-        writer.write(data.encode())
-        await writer.drain()
-    finally:
-        writer.close()
-        await writer.wait_closed()
\ No newline at end of file
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if self.loop is None or self.loop.is_closed():
+            if running is None:
+                print(f"No event loop to send IPC message: {message}")
+                return
+            self._bind(running)
+        if running is self.loop:
+            self._enqueue(key, line)
+        else:
+            self.loop.call_soon_threadsafe(self._enqueue, key, line)
+
+    def _bind(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self._wakeup = asyncio.Event()
+        self._sender = loop.create_task(self._run())
+        self._writer = self._reader = None
+
+    def _enqueue(self, key: Optional[Hashable], line: str):
+        if key is not None:
+            entry = self._keyed.get(key)
+            if entry is not None:
+                entry[1] = line
+                self.coalesced += 1
+                return
+        while len(self._pending) >= self.max_pending:
+            old_key, _ = self._pending.popleft()
+            if old_key is not None:
+                self._keyed.pop(old_key, None)
+            self.dropped += 1
+        entry = [key, line]
+        self._pending.append(entry)
+        if key is not None:
+            self._keyed[key] = entry
+        self._wakeup.set()
+
+    def _take_batch(self) -> list:
+        batch = []
+        while self._pending and len(batch) < self.max_batch:
+            key, line = self._pending.popleft()
+            if key is not None:
+                self._keyed.pop(key, None)
+            batch.append(line)
+        return batch
+
+    async def _connect(self):
+        if USE_TCP:
+            self._reader, self._writer = await asyncio.open_connection(*ADDR)
+        else:
+            self._reader, self._writer = await asyncio.open_unix_connection(path=ADDR)
+        self.connects += 1
+
+    def _connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing() and not self._reader.at_eof()
+
+    async def _disconnect(self):
+        writer, self._writer, self._reader = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def _run(self):
+        delay = 0.05
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending:
+                if not self._connected():
+                    await self._disconnect()
+                    try:
+                        await self._connect()
+                        delay = 0.05
+                    except OSError as e:
+                        print(f"IPC server not reachable ({e}), retrying in {delay:.2f}s; {len(self._pending)} message(s) queued")
+                        await asyncio.sleep(delay)
+                        delay = min(delay * 2, self.reconnect_max_delay)
+                        continue
+                batch = self._take_batch()
+                self._writing = True
+                try:
+                    self._writer.write("".join(batch).encode())
+                    await self._writer.drain()
+                    self.sent += len(batch)
+                except (OSError, RuntimeError) as e:
+                    print(f"IPC connection lost ({e}), requeueing {len(batch)} message(s)")
+                    await self._disconnect()
+                    room = self.max_pending - len(self._pending)
+                    self.dropped += max(0, len(batch) - room)
+                    for line in reversed(batch[:max(room, 0)]):
+                        self._pending.appendleft([None, line])
+                finally:
+                    self._writing = False
+
+    async def flush(self, timeout: float = 2.0):
+        if self._sender is None or self.loop is not asyncio.get_running_loop():
+            return
+        deadline = self.loop.time() + timeout
+        while (self._pending or self._writing) and self.loop.time() < deadline:
+            await asyncio.sleep(0.01)
+
+    async def close(self, timeout: float = 2.0):
+        await self.flush(timeout)
+        if self._sender is not None:
+            self._sender.cancel()
+            self._sender = None
+        await self._disconnect()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "connects": self.connects,
+        }
+
+
+_client: Optional[IpcClient] = None
+_client_lock = threading.Lock()
+
+
+def get_ipc_client() -> IpcClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = IpcClient()
+    return _client
+
+
+async def close_ipc_client():
+    if _client is not None:
+        await _client.close()
+
+
+async def send_ipc_message(app_id: str, message: str, coalesce_key: Optional[Hashable] = None):
+    # Queues the message on the process-wide connection and returns without waiting for the socket;
+    # yielding once lets the writer keep up with callers that send in a tight loop.
+    get_ipc_client().send(app_id, message, coalesce_key)
+    await asyncio.sleep(0)
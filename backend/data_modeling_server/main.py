@@ -1,3 +1,4 @@
+from datetime import datetime
 import json
 from multiprocessing import Process
 import multiprocessing
@@ -18,6 +19,9 @@ from database import (
     LlmPendingTaskRepository, LlmFunctionArgsRepository,
     SelectedPostIdsRepository, CodingContextRepository,
     ContextFilesRepository, ResearchQuestionsRepository,
+    LlmProviderBudgetRepository, LlmSchedulerLeaseRepository,
+    DumpExtractionsRepository, PostStatsRepository, LlmResponseCacheRepository,
+    StateVersionRepository, CollectionVersionRepository,
 )
 from constants import PATHS, get_default_transmission_cmd
 
@@ -39,21 +43,29 @@ def set_initial_settings():
         json.dump(settings, f, indent=4)
 
 
-set_initial_settings()
-
+def prepare_database():
+    initialize_database([
+        WorkspacesRepository, WorkspaceStatesRepository,
+        DatasetsRepository, PostsRepository, CommentsRepository,
+        LlmResponsesRepository, TorrentDownloadProgressRepository,
+        FileStatusRepository, PipelineStepsRepository, DumpExtractionsRepository,
+        PostStatsRepository,
+        FunctionProgressRepository, QectRepository,
+        LlmPendingTaskRepository, LlmFunctionArgsRepository,
+        SelectedPostIdsRepository, CodingContextRepository,
+        ContextFilesRepository, ResearchQuestionsRepository,
+        LlmProviderBudgetRepository, LlmSchedulerLeaseRepository,
+        LlmResponseCacheRepository, StateVersionRepository,
+        CollectionVersionRepository,
+    ])
+    FunctionProgressRepository().delete({}, all=True)
+    TorrentDownloadProgressRepository().delete({}, all=True)
+    LlmPendingTaskRepository().update(
+        {"status": ["pending", "enqueued", "in-progress"]},
+        {"status": "failed", "error": "System restarted", "completed_at": datetime.now()},
+    )
+    LlmSchedulerLeaseRepository().delete({}, all=True)
 
-initialize_database([
-    WorkspacesRepository, WorkspaceStatesRepository,
-    DatasetsRepository, PostsRepository, CommentsRepository,
-    LlmResponsesRepository, TorrentDownloadProgressRepository,
-    FileStatusRepository, PipelineStepsRepository,
-    FunctionProgressRepository, QectRepository,
-    LlmPendingTaskRepository, LlmFunctionArgsRepository,
-    SelectedPostIdsRepository, CodingContextRepository,
-    ContextFilesRepository, ResearchQuestionsRepository,
-])
-FunctionProgressRepository().delete({}, all=True)
-TorrentDownloadProgressRepository().delete({}, all=True)
 
 def run_http():
     uvicorn.run(
@@ -72,17 +84,20 @@ def run_ws():
     )
 
 if __name__ == "__main__":
-    os.makedirs(DATASETS_DIR, exist_ok=True)
-    os.makedirs(PATHS["transmission"], exist_ok=True)
-
-    # if getattr(sys, "frozen", False) and hasattr(sys, "_MEIPASS"):
+    # In the frozen build every spawned child (uvicorn workers, dataset parsers) starts here as __main__;
+    # freeze_support() hands it off before it can reset the progress tables below mid-run.
     multiprocessing.freeze_support()
     if sys.platform.startswith("win"):
         multiprocessing.set_start_method("spawn")
     else:
         multiprocessing.set_start_method("fork")
 
-    
+    set_initial_settings()
+    prepare_database()
+
+    os.makedirs(DATASETS_DIR, exist_ok=True)
+    os.makedirs(PATHS["transmission"], exist_ok=True)
+
 
     p_http = Process(target=run_http, name="http-server")
     p_http.start()
@@ -1,4 +1,5 @@
 from .route_error_handler import ErrorHandlingMiddleware
 from .route_execution_time_logger import ExecutionTimeMiddleware
 from .route_logger import LoggingMiddleware
-from .route_abort_on_disconnect import AbortOnDisconnectMiddleware
\ No newline at end of file
+from .route_abort_on_disconnect import AbortOnDisconnectMiddleware
+from .route_llm_cache import LlmCacheMiddleware
\ No newline at end of file
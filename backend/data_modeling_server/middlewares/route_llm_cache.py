@@ -0,0 +1,22 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from services.llm_response_cache import llm_cache_bypass
+
+class LlmCacheMiddleware:
+    # "X-LLM-Cache: bypass" (or "refresh") makes every LLM call of the request skip the response cache;
+    # the fresh responses still replace the cached ones.
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        mode = headers.get(b"x-llm-cache", b"").decode("latin-1").strip().lower()
+        token = llm_cache_bypass.set(mode in ("bypass", "refresh"))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            llm_cache_bypass.reset(token)
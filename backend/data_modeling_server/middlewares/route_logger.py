@@ -1,85 +1,254 @@
+import glob
 import json
-import time
-from uuid import uuid4
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import Message
+import os
 import queue
-import threading
+import random
 import sys
+import threading
+import time
+from typing import Dict, List, Optional
+from uuid import uuid4
 
-from constants import LOG_FILE
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super().__init__(app)
-        self.log_queue = queue.Queue()
-        self.logging_thread = threading.Thread(target=self.log_worker, daemon=True)
-        self.logging_thread.start()
+from constants import LOG_FILE, REQUEST_LOG
 
-    def log_worker(self):
-        while True:
+# Response bodies of these types are copied into the log; anything else (CSV downloads, files, binary
+# streams) is passed through untouched and only its size is logged.
+_LOGGED_BODY_TYPES = ("application/json", "text/plain", "text/html", "application/problem+json")
+
+
+class JsonlLogWriter:
+    """
+    Appends log entries as JSON lines from a background thread. The queue is bounded: when the disk cannot
+    keep up, new entries are dropped and counted rather than held in memory. Past max_file_bytes the file
+    is rotated, keeping backup_count old files.
+
+    Every uvicorn worker has its own writer on the same file, so the file is opened per batch instead of
+    held open, and rotation is decided from the size on disk. A worker therefore never keeps appending to a
+    file another worker has rotated away, and on Windows no open handle blocks the rename. A failed rename
+    is retried after rotate_retry_seconds rather than on every write.
+    """
+
+    def __init__(
+        self,
+        path: str = LOG_FILE,
+        max_queue: int = REQUEST_LOG["max_queue"],
+        max_file_bytes: int = REQUEST_LOG["max_file_bytes"],
+        backup_count: int = REQUEST_LOG["backup_count"],
+        rotate_retry_seconds: float = REQUEST_LOG["rotate_retry_seconds"],
+        max_batch: int = 1000,
+    ):
+        self.path = path
+        self.max_file_bytes = max_file_bytes
+        self.backup_count = backup_count
+        self.rotate_retry_seconds = rotate_retry_seconds
+        self.max_batch = max_batch
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.written = 0
+        self.rotate_after = 0.0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def put(self, entry: Dict):
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def rotate(self):
+        # The file is renamed to a unique time-stamped name, so workers rotating at the same moment never
+        # shift or overwrite each other's backups; the oldest beyond backup_count are then removed.
+        if os.stat(self.path).st_size < self.max_file_bytes:
+            return
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.{time.time_ns()}-{os.getpid()}")
+        else:
+            os.remove(self.path)
+        backups = sorted(glob.glob(glob.escape(self.path) + ".*"))
+        for backup in backups[:max(len(backups) - self.backup_count, 0)]:
             try:
-                log_entry = self.log_queue.get()
-                if log_entry is None: 
+                os.remove(backup)
+            except FileNotFoundError:
+                pass
+
+    def maybe_rotate(self):
+        if time.monotonic() < self.rotate_after:
+            return
+        try:
+            self.rotate()
+        except FileNotFoundError:
+            # Another worker rotated it first.
+            return
+        except OSError as e:
+            self.rotate_after = time.monotonic() + self.rotate_retry_seconds
+            print(f"Error rotating log, retrying in {self.rotate_retry_seconds}s: {e}", file=sys.stderr)
+
+    def write(self, entries: List[Dict]):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, default=str) + "\n")
+            self.written += len(entries)
+        except Exception as e:
+            print(f"Error writing log: {e}", file=sys.stderr)
+            return
+        self.maybe_rotate()
+
+    def run(self):
+        while True:
+            entries = [self.queue.get()]
+            while entries[-1] is not None and len(entries) < self.max_batch:
+                try:
+                    entries.append(self.queue.get_nowait())
+                except queue.Empty:
                     break
-                with open(LOG_FILE, "a") as f:
-                    f.write(json.dumps(log_entry) + "\n")
-                self.log_queue.task_done()
-            except Exception as e:
-                print(f"Error writing log: {e}", file=sys.stderr)
+            stop = entries[-1] is None
+            if stop:
+                entries.pop()
+            if entries:
+                self.write(entries)
+            if stop:
+                break
 
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        request_id = str(uuid4())
+    def close(self):
+        self.queue.put(None)
+
+
+class _BodyTee:
+    # Keeps the first `limit` bytes of a body that passes through, and counts the rest.
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.chunks: List[bytes] = []
+        self.kept = 0
+        self.size = 0
+
+    def add(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.kept < self.limit and chunk:
+            part = chunk[: self.limit - self.kept]
+            self.chunks.append(part)
+            self.kept += len(part)
 
-        request_body_bytes = await request.body()
+    def text(self) -> Optional[str]:
+        if not self.size:
+            return None
+        data = b"".join(self.chunks)
         try:
-            request_body_text = request_body_bytes.decode("utf-8")
+            return data.decode("utf-8")
         except UnicodeDecodeError:
-            request_body_text = str(request_body_bytes)
-
-        request_log = {
-            "request_id": request_id,
-            "timestamp": time.time(),
-            "event": "request",
-            "method": request.method,
-            "url": str(request.url),
-            "headers": dict(request.headers),
-            "body": request_body_text if request_body_text else None,
-        }
-        self.log_queue.put(request_log)
-
-        response = await call_next(request)
-        process_time = time.time() - start_time
-
-        response_body_bytes = b""
-        if hasattr(response, "body") and response.body is not None:
-            response_body_bytes = response.body
-        else:
-            async for chunk in response.body_iterator:
-                response_body_bytes += chunk
-            response = Response(
-                content=response_body_bytes,
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=response.media_type,
-            )
+            # A multi-byte character cut at the limit is dropped; anything else is not text.
+            return data.decode("utf-8", errors="ignore") if self.size > self.kept else str(data)
+
+    @property
+    def truncated(self) -> bool:
+        return self.size > self.kept
+
+
+def _sample_rate(path: str, sample_rates: Dict[str, float], default: float) -> float:
+    # Longest matching route prefix wins.
+    match = max((prefix for prefix in sample_rates if path.startswith(prefix)), key=len, default=None)
+    return sample_rates[match] if match is not None else default
+
+
+class LoggingMiddleware:
+    """
+    Logs every sampled request and its response to LOG_FILE without buffering either: request and response
+    messages are passed on as they arrive, while only the first max_body_bytes of each body are copied
+    into the log. Bodies of file downloads and other non-text responses are not copied at all.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_body_bytes: int = REQUEST_LOG["max_body_bytes"],
+        sample_rates: Optional[Dict[str, float]] = None,
+        default_sample_rate: float = REQUEST_LOG["default_sample_rate"],
+        writer: Optional[JsonlLogWriter] = None,
+    ):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+        self.sample_rates = sample_rates if sample_rates is not None else REQUEST_LOG["sample_rates"]
+        self.default_sample_rate = default_sample_rate
+        self.writer = writer or JsonlLogWriter()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rate = _sample_rate(scope["path"], self.sample_rates, self.default_sample_rate)
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.time()
+        request_id = str(uuid4())
+        request = Request(scope)
+        request_body = _BodyTee(self.max_body_bytes)
+        response_body = _BodyTee(self.max_body_bytes)
+        response_log: Dict = {}
+        request_logged = False
+
+        def log_request():
+            nonlocal request_logged
+            if request_logged:
+                return
+            request_logged = True
+            self.writer.put({
+                "request_id": request_id,
+                "timestamp": time.time(),
+                "event": "request",
+                "method": request.method,
+                "url": str(request.url),
+                "headers": dict(request.headers),
+                "body": request_body.text(),
+                "body_bytes": request_body.size,
+                "body_truncated": request_body.truncated,
+            })
+
+        async def logged_receive() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                request_body.add(message.get("body", b""))
+                if not message.get("more_body", False):
+                    log_request()
+            return message
+
+        async def logged_send(message: Message):
+            if message["type"] == "http.response.start":
+                log_request()
+                headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in message.get("headers", [])}
+                content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+                response_log.update({
+                    "status_code": message["status"],
+                    "headers": headers,
+                    "log_body": content_type in _LOGGED_BODY_TYPES
+                    and not headers.get("content-disposition", "").lower().startswith("attachment"),
+                })
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                if response_log.get("log_body"):
+                    response_body.add(body)
+                else:
+                    response_body.size += len(body)
+            await send(message)
 
         try:
-            response_body_text = response_body_bytes.decode("utf-8")
-        except Exception:
-            response_body_text = str(response_body_bytes)
-
-        response_log = {
-            "request_id": request_id,
-            "timestamp": time.time(),
-            "event": "response",
-            "status_code": response.status_code,
-            "headers": dict(response.headers),
-            "body": response_body_text if response_body_text else None,
-            "process_time": process_time,
-        }
-        self.log_queue.put(response_log)
-
-        return response
+            await self.app(scope, logged_receive, logged_send)
+        finally:
+            log_request()
+            self.writer.put({
+                "request_id": request_id,
+                "timestamp": time.time(),
+                "event": "response",
+                "status_code": response_log.get("status_code"),
+                "headers": response_log.get("headers"),
+                "body": response_body.text() if response_log.get("log_body") else None,
+                "body_bytes": response_body.size,
+                "body_truncated": response_body.truncated if response_log.get("log_body") else response_body.size > 0,
+                "process_time": time.time() - start_time,
+            })
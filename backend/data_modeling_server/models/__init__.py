@@ -3,15 +3,21 @@ from .table_dataclasses import (
     Post,  
     Comment, 
     Dataset, 
+    PostStat,
     LlmResponse, 
     Workspace, 
     TorrentDownloadProgress, 
     PipelineStep, 
     FileStatus, 
+    DumpExtraction,
     FunctionProgress, 
     QectResponse, 
     LlmPendingTask,  
     LlmFunctionArgs,
+    LlmProviderBudget,
+    LlmResponseCacheEntry,
+    EmbeddingCacheEntry,
+    LlmSchedulerLease,
     SelectedPostId,
     ErrorLog,
     StateDump,
@@ -26,4 +32,6 @@ from .table_dataclasses import (
     GroupedCodeEntry,
     ThemeEntry,
     CollectionContext,
+    StateVersion,
+    CollectionVersion,
 )
\ No newline at end of file
@@ -21,11 +21,14 @@ class RegenerateConceptsRequest(BaseCodingRouteRequest):
 
 
 class GenerateInitialCodesRequest(BaseCodingRouteRequest):
-    pass
+    # pack_posts codes several short posts per LLM request, up to pack_token_budget transcript tokens.
+    pack_posts: bool = False
+    pack_token_budget: int = 4000
 
 
 class GenerateFinalCodesRequest(BaseCodingRouteRequest):
-    pass
+    pack_posts: bool = False
+    pack_token_budget: int = 4000
 
   
 class ThemeGenerationRequest(BaseCodingRouteRequest):
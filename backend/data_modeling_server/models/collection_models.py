@@ -33,6 +33,14 @@ class ParseRedditFromTorrentRequest(BaseModel):
     submissions_only: bool = False
     use_fallback: bool = False
     download_dir: str = ""
+    direct_to_database: bool = False
+
+class ParseSubredditsFromTorrentRequest(BaseModel):
+    subreddits: list[str]
+    start_date: str = "2005-06"
+    end_date: str = "2023-12"
+    submissions_only: bool = False
+    download_dir: str = ""
 
 class ParseRedditFromTorrentFilesRequest(BaseModel):
     subreddit: str
@@ -112,6 +112,16 @@ class SelectedPostId(BaseDataclass):
     post_id: str = field(metadata={"primary_key": True, "foreign_key": "posts(id)"})
     type: Optional[str] = field(metadata={"not_null": True}, default="ungrouped")  # "sampled" or "unseen" corresponding to sampledPostReponse, unseenPostResponse Responses or "ungrouped"
 
+@dataclass
+class PostStat(BaseDataclass):
+    workspace_id: str = field(metadata={"primary_key": True, "foreign_key": "workspaces(id)"})
+    post_id: str = field(metadata={"primary_key": True, "not_null": True})
+    transcript_length: int = field(default=0)  # characters in the whole-post JSON transcript
+    token_estimate: int = field(default=0)
+    comment_count: int = field(default=0)
+    max_depth: int = field(default=0)  # comment nesting levels, 0 when the post has no comments
+    updated_at: Optional[datetime] = field(default_factory=datetime.now)
+
 @dataclass
 class Dataset(BaseDataclass):
     id: str = field(metadata={"primary_key": True})
@@ -210,6 +220,14 @@ class FileStatus(BaseDataclass):
     messages: Optional[str] = field(default="[]") 
     updated_at: Optional[datetime] = field(default_factory=datetime.now)
 
+@dataclass
+class DumpExtraction(BaseDataclass):
+    dump_file: str = field(metadata={"primary_key": True, "not_null": True})  # e.g. RC_2020-01
+    subreddit: str = field(metadata={"primary_key": True, "not_null": True})
+    output_path: str = field(metadata={"not_null": True})
+    records: Optional[int] = field(default=0)
+    completed_at: Optional[datetime] = field(default_factory=datetime.now)
+
 @dataclass
 class FunctionProgress(BaseDataclass):
     workspace_id: str = field(metadata={"foreign_key": "workspaces(id)", "primary_key": True})
@@ -264,6 +282,8 @@ class LlmPendingTask(BaseDataclass):
     created_at: datetime = field(default_factory=datetime.now)  
     started_at: Optional[datetime] = None                      
     completed_at: Optional[datetime] = None
+    owner: Optional[str] = None        # Process that submitted the task and holds its future
+    provider: Optional[str] = None     # LLM provider the task is scheduled against
 
 @dataclass
 class LlmFunctionArgs(BaseDataclass):
@@ -271,6 +291,46 @@ class LlmFunctionArgs(BaseDataclass):
     args_json: Optional[str] = None
     kwargs_json: Optional[str] = None
 
+@dataclass
+class LlmProviderBudget(BaseDataclass):
+    provider: str = field(metadata={"primary_key": True, "not_null": True})
+    tokens: float = field(default=0.0)
+    updated_at: float = field(default=0.0)
+
+@dataclass
+class LlmResponseCacheEntry(BaseDataclass):
+    cache_key: str = field(metadata={"primary_key": True, "not_null": True})   # sha256 of workspace, provider, model, temperature, seed, prompt
+    workspace_id: str = field(metadata={"foreign_key": "workspaces(id)", "not_null": True})
+    provider: str = field(metadata={"not_null": True})
+    model: str = field(metadata={"not_null": True})
+    prompt_hash: str = field(metadata={"not_null": True})
+    response_json: str = field(metadata={"not_null": True})
+    temperature: Optional[float] = None
+    seed: Optional[int] = None
+    hits: int = field(default=0)
+    created_at: float = field(default=0.0)
+    last_used_at: float = field(default=0.0)
+
+@dataclass
+class EmbeddingCacheEntry(BaseDataclass):
+    cache_key: str = field(metadata={"primary_key": True, "not_null": True})   # sha256 of provider, model, kind, text hash
+    provider: str = field(metadata={"not_null": True})
+    model: str = field(metadata={"not_null": True})
+    text_hash: str = field(metadata={"not_null": True})
+    dtype: str = field(metadata={"not_null": True})
+    vector: bytes = field(metadata={"not_null": True})
+    size_bytes: int = field(default=0)
+    created_at: float = field(default=0.0)
+    last_used_at: float = field(default=0.0)
+
+@dataclass
+class LlmSchedulerLease(BaseDataclass):
+    lease_id: str = field(metadata={"primary_key": True, "not_null": True})
+    provider: str = field(metadata={"not_null": True})
+    owner: str = field(metadata={"not_null": True})
+    acquired_at: float = field(default=0.0)
+    expires_at: float = field(default=0.0)
+
 
 @dataclass
 class ErrorLog(BaseDataclass):
@@ -370,4 +430,14 @@ class CollectionContext(BaseDataclass):
     metadata: Optional[str] = None
     mode_input: Optional[str] = None
     data_filters: Optional[str] = None
-    is_locked: bool = False
\ No newline at end of file
+    is_locked: bool = False
+
+@dataclass
+class StateVersion(BaseDataclass):
+    workspace_id: str = field(metadata={"primary_key": True, "foreign_key": "workspaces(id)", "not_null": True})
+    version: int = 0
+
+@dataclass
+class CollectionVersion(BaseDataclass):
+    collection: str = field(metadata={"primary_key": True, "not_null": True})
+    version: int = 0
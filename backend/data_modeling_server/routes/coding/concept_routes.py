@@ -1,3 +1,4 @@
+import asyncio
 import json
 import time
 from typing import List
@@ -20,6 +21,7 @@ from models.coding_models import GenerateConceptDefinitionsRequest, RegenerateCo
 from models.table_dataclasses import Concept, ConceptEntry, DataClassEncoder, SelectedConcept
 from services.langchain_llm import LangchainLLMService, get_llm_service
 from services.llm_service import GlobalQueueManager, get_llm_manager
+from services.retriever_service import cached_retriever
 from routes.websocket_routes import manager
 from utils.prompts import ConceptOutline, ContextPrompt
 
@@ -59,10 +61,10 @@ async def build_context_from_interests_endpoint(
 
     print("Initialize vector store")
     vector_store = initialize_vector_store(workspace_id, model, embeddings)
-    await save_context_files(app_id, workspace_id, contextFiles, vector_store)
+    await save_context_files(app_id, workspace_id, contextFiles, vector_store, model)
 
     await send_ipc_message(app_id, f"Dataset {workspace_id}: Creating retriever...")
-    retriever = vector_store.as_retriever(search_kwargs={'k': 20})
+    retriever = cached_retriever(vector_store, k=20)
 
     input_text = ContextPrompt.context_builder(mainTopic, researchQuestions, additionalInfo)
 
@@ -152,20 +154,20 @@ async def generate_definitions_endpoint(
     vector_store = initialize_vector_store(workspace_id, model, embeddings)
 
     await send_ipc_message(app_id, f"Dataset {workspace_id}: Creating retriever...")
-    retriever = vector_store.as_retriever(search_kwargs={'k': 20})
+    retriever = cached_retriever(vector_store, k=20)
     
     word_list = [word.strip() for word in words]
     
     batch_size = 70
     
     word_batches = list(batch_list(word_list, batch_size))
-    print("Word batches:", word_batches)
     
     regex_pattern = r"```json\s*([\s\S]*?)\s*```"
-    
-    results = []
-    
-    for batch_words in word_batches:
+
+    completed = 0
+
+    async def generate_batch(batch_words: List[str]) -> List[dict]:
+        nonlocal completed
         input_text = ConceptOutline.input_prompt_builder(
             mainTopic=mainTopic,
             researchQuestions=researchQuestions,
@@ -174,7 +176,7 @@ async def generate_definitions_endpoint(
         )
         
         parsed_output = await process_llm_task(
-            workspace_id=request.headers.get("x-workspace-id"),
+            workspace_id=workspace_id,
             app_id=app_id,
             manager=manager,
             llm_model=model,
@@ -187,34 +189,38 @@ async def generate_definitions_endpoint(
             llm_queue_manager=llm_queue_manager,
             raise_error=True,
         )
-        
 
         if isinstance(parsed_output, list):
             parsed_output = {"concepts": parsed_output}
 
-        results.extend(parsed_output.get("concepts", []))
-        print("Parsed output:", parsed_output)
-
         if isinstance(parsed_output.get("concepts"), list) and len(parsed_output.get("concepts")) == 1 and not isinstance(parsed_output.get("concepts")[0].get("word"), str):
             raise RequestError(status_code=400, message="Invalid response format from LLM.")
-        
-        concept_entries = [
-            ConceptEntry(
-                id=str(uuid4()),
-                coding_context_id=workspace_id,
-                word=entry.get("word"),
-                description=entry.get("description"),
-                is_marked=True
-            )
-            for entry in results
-        ]
-
-        try:
-            concept_entries_repo.delete({"coding_context_id": workspace_id})
-        except Exception as e:
-            print(e)
-
-        concept_entries_repo.insert_batch(concept_entries)
+
+        completed += 1
+        await send_ipc_message(app_id, f"Dataset {workspace_id}: Generated definitions for batch {completed}/{len(word_batches)}.")
+        return parsed_output.get("concepts", [])
+
+    # All batches go to the queue manager at once, which runs as many as the provider allows.
+    tasks = [asyncio.create_task(generate_batch(batch_words)) for batch_words in word_batches]
+    try:
+        batch_results = await asyncio.gather(*tasks)
+    except Exception:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    concept_entries = [
+        ConceptEntry(
+            id=str(uuid4()),
+            coding_context_id=workspace_id,
+            word=entry.get("word"),
+            description=entry.get("description"),
+            is_marked=True
+        )
+        for results in batch_results
+        for entry in results
+    ]
+    concept_entries_repo.replace_for_context(workspace_id, concept_entries)
     
     await send_ipc_message(app_id, f"Dataset {workspace_id}: Processing complete.")
     
@@ -248,7 +254,7 @@ async def regenerate_concepts_endpoint(
     llm, embeddings = llm_service.get_llm_and_embeddings(request_body.model)
 
     vector_store = initialize_vector_store(workspace_id, request_body.model, embeddings)
-    retriever = vector_store.as_retriever(search_kwargs={'k': 50})
+    retriever = cached_retriever(vector_store, k=50)
 
     selected_words = list(map(lambda x: x.word, filter(lambda x: x.id in selected_concepts, concepts)))
     unselected_words = list(map(lambda x: x.word, filter(lambda x: x.id not in selected_concepts, concepts)))
@@ -6,15 +6,13 @@ import tempfile
 from typing import Any, Dict, List
 from fastapi import APIRouter, Body, Depends, HTTPException, Header, Request, BackgroundTasks
 from fastapi.responses import FileResponse
-import numpy as np
-import pandas as pd
 
 from config import Settings, CustomSettings
 from constants import CODEBOOK_TYPE_MAP
 from controllers.coding_controller import process_llm_task
-from controllers.collection_controller import count_comments, get_reddit_post_by_id
+from controllers.collection_controller import get_reddit_post_by_id, refresh_post_stats
 from database import (
-    SelectedPostIdsRepository,
+    SelectedPostIdsRepository, PostStatsRepository,
     QectRepository, FunctionProgressRepository
 )
 from errors.request_errors import RequestError
@@ -30,12 +28,14 @@ from services.llm_service import GlobalQueueManager, get_llm_manager
 from utils.coding_helpers import generate_transcript
 from database.db_helpers import execute_query, tuned_connection
 from utils.prompts import  RefineSingleCode
+from utils.sampling import random_sample, stratified_groups
 
 
 router = APIRouter(dependencies=[Depends(get_app_id), Depends(get_workspace_id)])
 settings = Settings()
 
 selected_post_ids_repo = SelectedPostIdsRepository()
+post_stats_repo = PostStatsRepository()
 qect_repo = QectRepository()
 function_progress_repo = FunctionProgressRepository()
 
@@ -71,56 +71,23 @@ async def sample_posts_endpoint(
     except Exception as e:
         print("Error resetting selections:", e)
 
-    post_ids = [
-        doc["post_id"]
-        for doc in selected_post_ids_repo.find(
-            {"workspace_id": workspace_id, "type": "ungrouped"},
-            ["post_id"],
-            map_to_model=False
-        )
-    ]
-    print(f"Found {len(post_ids)} posts to sample")
-
-    sem = asyncio.Semaphore(os.cpu_count())
-
-    async def fetch_and_compute_length(pid: str):
-        async with sem:
-            try:
-                post = await asyncio.to_thread(
-                    get_reddit_post_by_id,
-                    workspace_id, pid,
-                    ["id", "title", "selftext"]
-                )
-                num_comments = count_comments(post.get("comments", []))
-                first_item = await anext(generate_transcript(post))
-                transcript = (
-                    first_item["transcript"]
-                    if isinstance(first_item, dict)
-                    else first_item
-                )
-                return pid, len(transcript), num_comments
-            except HTTPException as he:
-                print(f"Post {pid} not found: {he.detail}")
-                return pid, None, None
-            except Exception as e:
-                print(f"Error for post {pid}: {e}")
-                return pid, None, None
-
-    results = await asyncio.gather(*(fetch_and_compute_length(pid) for pid in post_ids))
-    valid   = [r for r in results if r[1] is not None]
-    invalid = [r[0] for r in results if r[1] is None]
-
-    if invalid:
-        print(f"Could not fetch posts: {invalid}")
-    if not valid:
+    # Lengths and comment counts come precomputed from post_stats; only posts ingested before the table
+    # existed are computed here, once.
+    await asyncio.to_thread(refresh_post_stats, workspace_id)
+    frame = await asyncio.to_thread(post_stats_repo.get_sampling_frame, workspace_id)
+
+    selected_count = selected_post_ids_repo.count({"workspace_id": workspace_id, "type": "ungrouped"})
+    print(f"Found {selected_count} posts to sample")
+    if selected_count > len(frame):
+        print(f"Could not fetch {selected_count - len(frame)} selected posts")
+    if not frame:
         raise HTTPException(status_code=400, detail="No valid posts found.")
 
-    df = pd.DataFrame(valid, columns=["post_id", "length", "num_comments"])
-   
-    np.random.seed(settings.ai.randomSeed)
-   
+    post_ids = [row[0] for row in frame]
+    lengths = [row[1] for row in frame]
+
     raw_sample_size = sample_size
-    N = len(df)
+    N = len(post_ids)
     if raw_sample_size < 1:
         total_samples = int(raw_sample_size * N)
     else:
@@ -134,8 +101,7 @@ async def sample_posts_endpoint(
         )
 
     if divisions == 1:
-        sampled = df.sample(n=total_samples, random_state=settings.ai.randomSeed)
-        return {"sampled": sampled["post_id"].tolist()}
+        return {"sampled": random_sample(post_ids, total_samples, settings.ai.randomSeed)}
 
     if divisions == 2:
         group_sizes = [total_samples, N - total_samples]
@@ -144,51 +110,7 @@ async def sample_posts_endpoint(
         rem = total_samples % divisions
         group_sizes = [base + (1 if i < rem else 0) for i in range(divisions)]
 
-    try:
-        df["stratum"] = pd.qcut(
-            df["length"],
-            q=4,
-            labels=False,
-            duplicates="drop"
-        )
-    except ValueError as e:
-        if "Bin edges must be unique" in str(e):
-            shuffled = df.sample(n=total_samples, random_state=settings.ai.randomSeed).reset_index(drop=True)
-            groups = []
-            idx = 0
-            for size in group_sizes:
-                s = int(size)
-                groups.append(shuffled.iloc[idx : idx + s]["post_id"].tolist())
-                idx += s
-        else:
-            raise HTTPException(status_code=500, detail=f"Stratification error: {e}")
-    else:
-        remaining = df.copy()
-        groups = []
-        for size in group_sizes:
-            if len(remaining) == 0:
-                groups.append([])
-                continue
-            grp = remaining.groupby("stratum")
-            counts = grp.size()
-            proportion = float(size) / len(remaining)
-            S_f = counts * proportion
-            S = S_f.astype(int)
-            leftover = int(size - int(S.sum()))
-            if leftover > 0:
-                fracs = S_f - S
-                top_bins = fracs.nlargest(leftover).index
-                for b in top_bins:
-                    S.at[b] += 1
-
-            sampled_ids = []
-            for stratum, subset in grp:
-                n = int(min(S.at[stratum], len(subset)))
-                if n > 0:
-                    sampled_ids += subset.sample(n=n, random_state=settings.ai.randomSeed)["post_id"].tolist()
-
-            groups.append(sampled_ids)
-            remaining = remaining[~remaining["post_id"].isin(sampled_ids)]
+    groups = stratified_groups(post_ids, lengths, group_sizes, settings.ai.randomSeed)
 
     if divisions == 2:
         names = ["sampled", "unseen"]
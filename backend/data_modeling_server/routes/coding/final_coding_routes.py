@@ -4,8 +4,7 @@ import json
 from uuid import uuid4
 from fastapi import APIRouter, Depends, HTTPException, Header, Request
 
-from controllers.coding_controller import filter_codes_by_transcript, filter_duplicate_codes_in_db,insert_responses_into_db, process_llm_task, stream_qect_pages, stream_selected_post_ids, summarize_codebook_explanations
-from controllers.collection_controller import get_reddit_post_by_id
+from controllers.coding_controller import filter_codes_by_transcript, filter_duplicate_codes_in_db,insert_responses_into_db, process_llm_task, split_packed_codes, stream_qect_pages, stream_selected_posts, summarize_codebook_explanations, coding_work_pool_options
 from database import (
     FunctionProgressRepository, 
     QectRepository, 
@@ -23,9 +22,12 @@ from models.coding_models import GenerateFinalCodesRequest, RedoFinalCodingReque
 from models.table_dataclasses import CodebookType, FunctionProgress, GenerationType, QectResponse
 from services.langchain_llm import LangchainLLMService, get_llm_service
 from services.llm_service import GlobalQueueManager, get_llm_manager
-from utils.coding_helpers import generate_transcript
+from services.progress_tracker import FunctionProgressTracker
+from utils.coding_helpers import generate_transcript, pack_transcripts
 from routes.websocket_routes import manager
-from utils.prompts import FinalCoding, RemakerPrompts
+from utils.token_counter import get_token_counter
+from utils.work_pool import WorkPoolProgress, run_work_pool
+from utils.prompts import FinalCoding, RemakerPrompts, post_transcripts_section
 
 
 router = APIRouter(dependencies=[Depends(get_app_id), Depends(get_workspace_id)])
@@ -92,21 +94,31 @@ async def final_coding_endpoint(
         except Exception as e:
             print(e)
 
-        async def process_post(post_id: str):
-            await send_ipc_message(app_id, f"Dataset {workspace_id}: Fetching data for post {post_id}...")
-            
-            print("Post data fetching")
-            post_data = get_reddit_post_by_id(workspace_id, post_id, [
-                "id", "title", "selftext"
-            ])
-            print("Post data fetched")
-
-            await asyncio.sleep(0)
+        def store_codes(post_id: str, codes: list, transcript: str, comment_map: dict):
+            for code in codes:
+                code["postId"] = post_id
+                code["id"] = str(uuid4())
+                src = code.get("source")
+                if isinstance(src, dict) and src.get("type") == "comment":
+                    label   = src["comment_id"]
+                    real_id = comment_map.get("comment "+label)
+                    if real_id:
+                        src["comment_id"] = real_id
+                if isinstance(src, dict):
+                    src["post_id"] = post_id
+                    code["source"] = json.dumps(src)
+
+            codes = filter_codes_by_transcript(workspace_id, codes, transcript, parent_function_name="final-coding", post_id=post_id, function_id=function_id)
+            return insert_responses_into_db(codes, workspace_id, request_body.model, CodebookType.FINAL.value, parent_function_name="final-coding", post_id=post_id, function_id=function_id)
+
+        async def process_post(post_id: str, post_data: dict):
+            if post_data is None:
+                raise HTTPException(status_code=404, detail="Post not found")
 
             await send_ipc_message(app_id, f"Dataset {workspace_id}: Generating transcript for post {post_id}...")
             transcripts_iter = generate_transcript(
                 post_data,
-                token_checker=llm.get_num_tokens
+                token_checker=get_token_counter(llm)
             )
             async for item in transcripts_iter:
                 transcript = item["transcript"]
@@ -147,40 +159,100 @@ async def final_coding_endpoint(
                     parsed_response = {"codes": parsed_response}
 
                 codes = parsed_response.get("codes", [])
-                for code in codes:
-                        code["postId"] = post_id
-                        code["id"] = str(uuid4())
-                        src = code.get("source")
-                        if isinstance(src, dict) and src.get("type") == "comment":
-                            label   = src["comment_id"]
-                            real_id = comment_map.get("comment "+label)
-                            if real_id:
-                                src["comment_id"] = real_id
-                        if isinstance(src, dict):
-                            src["post_id"] = post_id
-                            code["source"] = json.dumps(src)
-
-                codes = filter_codes_by_transcript(workspace_id, codes, transcript, parent_function_name="final-coding", post_id=post_id, function_id=function_id)
-                function_progress_repo.update({
-                        "function_id": function_id,
-                    }, {
-                        "current": function_progress_repo.find_one({
-                            "function_id": function_id
-                        }).current + 1
-                    })
-
-                codes = insert_responses_into_db(codes, workspace_id, request_body.model, CodebookType.FINAL.value, parent_function_name="final-coding", post_id=post_id, function_id=function_id)
+                codes = store_codes(post_id, codes, transcript, comment_map)
 
             await send_ipc_message(app_id, f"Dataset {workspace_id}: Generated codes for post {post_id}...")
             return codes
 
-        batches = stream_selected_post_ids(workspace_id, ["unseen"])
+        async def process_pack(pack: list):
+            # pack: (post_id, post_data, transcript item) for posts whose whole transcript fits in one chunk.
+            post_ids = [post_id for post_id, _, _ in pack]
+            parsed_response = await process_llm_task(
+                workspace_id=workspace_id,
+                app_id=app_id,
+                manager=manager,
+                llm_model=request_body.model,
+                regex_pattern=r"(\{[\s\S]*\})",
+                prompt_builder_func=FinalCoding.final_coding_multi_post_prompt,
+                llm_instance=llm,
+                parent_function_name="final-coding",
+                # The queue caches one prompt builder per function key, so packed prompts get their own key.
+                function_id=f"{function_id}-packed",
+                llm_queue_manager=llm_queue_manager,
+                retries=1,
+                final_codebook=json.dumps(final_codebook, indent=2),
+                concept_table=json.dumps(concept_table, indent=2),
+                main_topic=main_topic,
+                additional_info=additional_info,
+                research_questions=json.dumps(research_questions),
+                post_transcripts=post_transcripts_section((post_id, item["transcript"]) for post_id, _, item in pack),
+                cacheable_args={
+                    "args":[],
+                    "kwargs": [
+                        "main_topic",
+                        "additional_info",
+                        "research_questions",
+                        "concept_table",
+                        "final_codebook"
+                    ]
+                }
+            )
+            codes_by_post = split_packed_codes(parsed_response, post_ids)
+
+            fallback = []
+            for post_id, post_data, item in pack:
+                if post_id in codes_by_post:
+                    store_codes(post_id, codes_by_post[post_id], item["transcript"], item["comment_map"])
+                else:
+                    fallback.append((post_id, post_data))
+            if fallback:
+                print(f"Packed coding returned no result for {len(fallback)} of {len(pack)} posts, coding them one by one")
+                await asyncio.gather(*(process_post(post_id, post_data) for post_id, post_data in fallback))
+            await send_ipc_message(app_id, f"Dataset {workspace_id}: Generated codes for {len(pack)} packed posts...")
+
+        async def plan_batch(batch: list, posts: dict) -> list:
+            # Work units of (post_id, post_data, transcript item) lists: one post, or a pack of short posts.
+            if not request_body.pack_posts:
+                return [[(post_id, posts.get(post_id), None)] for post_id in batch]
+
+            singles, packable, token_counts = [], [], []
+            for post_id in batch:
+                post_data = posts.get(post_id)
+                items = [item async for item in generate_transcript(post_data, get_token_counter(llm))] if post_data else []
+                tokens = get_token_counter(llm).count(items[0]["transcript"]) if len(items) == 1 else None
+                if tokens is None or tokens > request_body.pack_token_budget // 2:
+                    singles.append([(post_id, post_data, None)])
+                else:
+                    packable.append((post_id, post_data, items[0]))
+                    token_counts.append(tokens)
+
+            packs = [[packable[i] for i in pack] for pack in pack_transcripts(token_counts, request_body.pack_token_budget)]
+            print(f"Packed {len(packable)} posts into {len(packs)} prompts, {len(singles)} posts coded alone")
+            return singles + packs
+
+        async def work_units():
+            async for batch, posts in stream_selected_posts(workspace_id, ["unseen"], ["id", "title", "selftext"]):
+                await send_ipc_message(app_id, f"Dataset {workspace_id}: Queueing batch of {len(batch)} posts...")
+                for unit in await plan_batch(batch, posts):
+                    yield unit
+
+        async def process_unit(unit: list):
+            if len(unit) > 1:
+                await process_pack(unit)
+            else:
+                await process_post(unit[0][0], unit[0][1])
+
+        async with FunctionProgressTracker(function_id, workspace_id, "final", total_posts, app_id) as tracker:
+            await run_work_pool(
+                work_units(),
+                process_unit,
+                progress=WorkPoolProgress(total_posts),
+                progress_key=function_id,
+                weight=len,
+                on_item_done=lambda unit: tracker.increment(len(unit)),
+                **coding_work_pool_options(llm_queue_manager, request_body.model),
+            )
 
-        for batch in batches:
-            await send_ipc_message(app_id, f"Dataset {workspace_id}: Processing batch of {len(batch)} posts...")
-            
-            await asyncio.gather(*(process_post(post_id) for post_id in batch))
-            
         await send_ipc_message(app_id, f"Dataset {workspace_id}: All posts processed successfully.")
 
         async for batch in stream_qect_pages(
@@ -287,15 +359,12 @@ async def redo_final_coding_endpoint(
         except Exception as e:
             print(e)
 
-        async def process_post(post_id: str):
-            await send_ipc_message(app_id, f"Dataset {workspace_id}: Fetching data for post {post_id}...")
-            
-            post_data = get_reddit_post_by_id(workspace_id, post_id, [
-                "id", "title", "selftext"
-            ])
+        async def process_post(post_id: str, post_data: dict):
+            if post_data is None:
+                raise HTTPException(status_code=404, detail="Post not found")
 
             await send_ipc_message(app_id, f"Dataset {workspace_id}: Generating transcript for post {post_id}...")
-            transcripts_iter = generate_transcript(post_data, llm.get_num_tokens)
+            transcripts_iter = generate_transcript(post_data, get_token_counter(llm))
 
             async for item in transcripts_iter:
                 transcript = item["transcript"]
@@ -358,13 +427,21 @@ async def redo_final_coding_endpoint(
             await send_ipc_message(app_id, f"Dataset {workspace_id}: Generated codes for post {post_id}...")
             return codes
 
-        batches = stream_selected_post_ids(workspace_id, ["unseen"])
-
-        for batch in batches:
-            await send_ipc_message(app_id, f"Dataset {workspace_id}: Processing batch of {len(batch)} posts...")
-            
-            await asyncio.gather(*(process_post(post_id) for post_id in batch))
-
+        async def work_units():
+            async for batch, posts in stream_selected_posts(workspace_id, ["unseen"], ["id", "title", "selftext"]):
+                await send_ipc_message(app_id, f"Dataset {workspace_id}: Queueing batch of {len(batch)} posts...")
+                for post_id in batch:
+                    yield post_id, posts.get(post_id)
+
+        async with FunctionProgressTracker(function_id, workspace_id, "final", total_posts, app_id) as tracker:
+            await run_work_pool(
+                work_units(),
+                lambda unit: process_post(*unit),
+                progress=WorkPoolProgress(total_posts),
+                progress_key=function_id,
+                on_item_done=lambda unit: tracker.increment(),
+                **coding_work_pool_options(llm_queue_manager, request_body.model),
+            )
 
         await send_ipc_message(app_id, f"Dataset {workspace_id}: All posts processed successfully.")
 
@@ -11,12 +11,12 @@ from uuid import uuid4
 from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile, Form, Body, Header
 from fastapi.responses import FileResponse
 from controllers.collection_controller import (
-    check_primary_torrent, create_dataset, delete_dataset, 
+    check_primary_torrent, clear_workspace_reddit_data, create_dataset, delete_dataset, 
     delete_run, filter_posts_by_deleted, get_post_transcripts_csv, 
-    get_reddit_data_from_torrent, get_reddit_post_by_id, 
+    get_multi_subreddit_data_from_torrent, get_reddit_data_from_torrent, get_reddit_post_by_id, 
     get_reddit_post_titles, get_reddit_posts_by_batch, 
-    list_datasets, parse_reddit_files, stream_upload_file, 
-    update_run_progress, upload_dataset_file
+    list_datasets, parse_reddit_files, refresh_post_stats, stream_upload_file, 
+    update_dataset, update_run_progress, upload_dataset_file
 )
 from database import PipelineStepsRepository, TorrentDownloadProgressRepository
 from errors.request_errors import RequestError
@@ -25,7 +25,7 @@ from ipc import send_ipc_message
 from models.collection_models import (
     FilterRedditPostsByDeleted, GetTorrentStatusRequest, 
     GetTranscriptsCsvRequest, ParseDatasetRequest, 
-    ParseRedditFromTorrentFilesRequest, ParseRedditFromTorrentRequest, 
+    ParseRedditFromTorrentFilesRequest, ParseRedditFromTorrentRequest, ParseSubredditsFromTorrentRequest, 
     ParseRedditPostByIdRequest, ParseRedditPostsRequest
 )
 from constants import DATASETS_DIR, TEMP_DIR
@@ -162,6 +162,11 @@ async def download_reddit_from_torrent_endpoint(
         last_day = calendar.monthrange(end_date.year, end_date.month)[1]
         end_date = end_date.replace(day=last_day)
 
+        if request_body.direct_to_database:
+            if not workspace_id:
+                workspace_id = str(uuid4())
+            clear_workspace_reddit_data(workspace_id)
+
 
         try:
             message = f"Fetching torrent data for months {start_month} through {end_month}..."
@@ -176,7 +181,10 @@ async def download_reddit_from_torrent_endpoint(
                 end_month, 
                 request_body.submissions_only,
                 request_body.use_fallback,
-                request_body.download_dir
+                request_body.download_dir,
+                direct_to_database=request_body.direct_to_database,
+                start_ts=start_date.timestamp(),
+                end_ts=end_date.timestamp(),
             )
 
             message = f"Finished downloading {len(output_files)} file(s)."
@@ -217,7 +225,10 @@ async def download_reddit_from_torrent_endpoint(
             update_run_progress(run_id, message, current_download_dir=request_body.download_dir)
 
             print("Parsing files in academic folder:", academic_folder)
-            if os.path.exists(academic_folder or ""):
+            if request_body.direct_to_database:
+                await asyncio.to_thread(refresh_post_stats, workspace_id)
+                update_dataset(workspace_id, name=request_body.subreddit)
+            elif os.path.exists(academic_folder or ""):
                 await parse_reddit_files(
                     app_id, workspace_id, academic_folder, date_filter={"start_date": start_date, "end_date": end_date}, is_primary = not request_body.use_fallback
                 )
@@ -240,6 +251,62 @@ async def download_reddit_from_torrent_endpoint(
             delete_run(run_id)
 
     return {"message": "Reddit data downloaded from torrent."}
+
+
+@router.post("/download-subreddits-from-torrent")
+async def download_subreddits_from_torrent_endpoint(
+    request: Request,
+    request_body: ParseSubredditsFromTorrentRequest,
+    transmission_manager: GlobalTransmissionDaemonManager = Depends(get_transmission_manager)
+):
+    if not request_body.subreddits:
+        raise HTTPException(status_code=400, detail="At least one subreddit is required.")
+
+    async with transmission_manager:
+        app_id = request.headers.get("x-app-id")
+        workspace_id = request.headers.get("x-workspace-id")
+        run_id = str(uuid4())
+
+        progress_repo.insert(TorrentDownloadProgress(
+            workspace_id=workspace_id,
+            run_id=run_id,
+            status="in-progress",
+            subreddit=", ".join(request_body.subreddits),
+            start_month=request_body.start_date,
+            end_month=request_body.end_date
+        ))
+
+        pipeline_repo.insert_batch(
+            list(map(
+                lambda step: PipelineStep(
+                    workspace_id=workspace_id,
+                    run_id=run_id,
+                    step_label=step
+                ), ["Metadata", "Verification", "Downloading", "Symlinks"]
+            ))
+        )
+
+        start_month = datetime.strptime(request_body.start_date, "%Y-%m").strftime("%Y-%m")
+        end_month = datetime.strptime(request_body.end_date, "%Y-%m").strftime("%Y-%m")
+        try:
+            output_files = await get_multi_subreddit_data_from_torrent(
+                manager, app_id, run_id,
+                workspace_id,
+                request_body.subreddits,
+                start_month,
+                end_month,
+                request_body.submissions_only,
+                request_body.download_dir
+            )
+        except Exception as e:
+            err_msg = f"ERROR: {str(e)}"
+            await send_ipc_message(app_id, err_msg)
+            print(err_msg)
+            raise e
+        finally:
+            delete_run(run_id)
+
+    return {"message": "Reddit data downloaded from torrent.", "files": output_files}
     
 
 @router.get("/get-torrent-data")
@@ -330,7 +397,7 @@ async def prepare_torrent_data_from_files(
             continue
    
         for f in os.listdir(target_folder):
-            if f.startswith(prefix) and month_part in f and f.endswith(".json"):
+            if f.startswith(prefix) and month_part in f and f.endswith((".json", ".jsonl")):
                 valid_files.append(os.path.join(target_folder, f))
 
     if not valid_files:
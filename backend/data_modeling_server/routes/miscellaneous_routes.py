@@ -8,11 +8,17 @@ import requests
 
 from controllers.collection_controller import get_post_and_comments_from_id
 from controllers.miscellaneous_controller import link_creator, normalize_text, search_slice
-from database import PostsRepository, CommentsRepository, FunctionProgressRepository
+from database import PostsRepository, CommentsRepository, FunctionProgressRepository, get_pool_stats
 from errors.credential_errors import InvalidCredentialError, MissingCredentialError
 from errors.llm_errors import UnsupportedEmbeddingModelError
 from models.miscellaneous_models import EmbeddingTestRequest, FunctionProgressRequest, ModelTestRequest, RedditPostByIdRequest, RedditPostIDAndTitleRequest, RedditPostIDAndTitleRequestBatch, RedditPostLinkRequest, UserCredentialTestRequest
 from services.langchain_llm import LangchainLLMService, get_llm_service
+from services.llm_response_cache import get_llm_response_cache
+from services.progress_tracker import get_progress_tracker
+from services.embedding_cache import get_embedding_cache
+from services.retriever_service import get_retriever_stats
+from utils.llm_logger import prompt_prefix_metrics
+from utils.work_pool import get_work_pool_progress
 from services.transmission_service import GlobalTransmissionDaemonManager, get_transmission_manager
 
 
@@ -217,14 +223,47 @@ async def get_function_progress(
     name = request_body.name
 
     try:
-        return function_progress_repo.find_one(
+        progress = function_progress_repo.find_one(
             {
                 "workspace_id": workspace_id,
                 "workspace_id": workspace_id,
                 "name": name
             }
         )
+        if not progress:
+            return progress
+        tracker = get_progress_tracker(progress.function_id)
+        pool = get_work_pool_progress(progress.function_id)
+        if tracker is None and pool is None:
+            return progress
+        response = progress.to_dict()
+        if tracker is not None:
+            response["current"] = tracker.current
+        if pool is not None:
+            response.update(pool.snapshot())
+        return response
     except Exception as e:
         print(e)
         raise HTTPException(status_code=500, detail="Failed to get function progress.")
-    
\ No newline at end of file
+    
+
+@router.get("/db-pool-stats")
+async def get_db_pool_stats_endpoint():
+    return {"pid": os.getpid(), "pools": get_pool_stats()}
+
+
+@router.get("/llm-cache-stats")
+async def get_llm_cache_stats_endpoint(workspace_id: str = None):
+    # hits/misses and prompt prefix reuse are counted per backend process; entries and stored_hits come
+    # from the shared table.
+    return {
+        "pid": os.getpid(),
+        "cache": get_llm_response_cache().stats(workspace_id),
+        "prompt_prefix": prompt_prefix_metrics.snapshot(),
+    }
+
+
+@router.get("/retriever-cache-stats")
+async def get_retriever_cache_stats_endpoint():
+    # Per Chroma collection; counted per backend process.
+    return {"pid": os.getpid(), "collections": get_retriever_stats(), "embeddings": get_embedding_cache().stats()}
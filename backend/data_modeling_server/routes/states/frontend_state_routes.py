@@ -24,6 +24,7 @@ from database import (
     ResearchQuestionsRepository,
     SelectedConceptsRepository,
     SelectedPostIdsRepository,
+    StateVersionRepository,
     ThemeEntriesRepository
 )
 from constants import FRONTEND_PAGE_MAPPER, PAGE_TO_STATES, TEMP_DIR
@@ -46,9 +47,22 @@ initial_codebook_repo = InitialCodebookEntriesRepository()
 grouped_codes_repo = GroupedCodeEntriesRepository()
 themes_repo = ThemeEntriesRepository()
 collection_context_repo = CollectionContextRepository()
+state_version_repo = StateVersionRepository()
 
 router = APIRouter()
 
+def build_row_patch(config: Dict[str, Any], diff: Dict[str, Any]) -> Dict[str, Any]:
+    # The diff in the shape of the full response: ids to drop, then rows to replace in place or append.
+    # Re-inserted rows are in both lists, since they move to the end of the table.
+    changed_ids = [row["id"] for row in diff.get("inserted", [])] + [row["id"] for row in diff.get("updated", [])]
+    order = {row_id: i for i, row_id in enumerate(dict.fromkeys(changed_ids))}
+    rows = config["repo"].find({"id": list(order)}) if order else []
+    rows.sort(key=lambda row: order[row.id])
+    return {
+        "deleted": [row["id"] for row in diff.get("deleted", [])],
+        "upserted": [config["format_func"](row) for row in rows],
+    }
+
 @router.post("/save-coding-context")
 async def save_coding_context(
     request: Request, 
@@ -72,16 +86,33 @@ async def save_coding_context(
         if not action or "type" not in action:
             raise HTTPException(status_code=400, detail="Invalid action")
         
-        diff = config["process_func"](workspace_id, action)
+        # Only the row tables the frontend patches (concept outline, initial codebook) are versioned. Their
+        # repositories bump the version on every write; one action should count as one version.
+        if config["repo"].state_version_column:
+            with state_version_repo.deferred():
+                diff = config["process_func"](workspace_id, action)
+            version = state_version_repo.bump(workspace_id)
+        else:
+            diff = config["process_func"](workspace_id, action)
+            version = None
+
+        # A client that was up to date before this action only needs the changed rows; anyone else gets the
+        # full table.
+        if (
+            version is not None
+            and request_body.get("responseMode") == "diff"
+            and request_body.get("baseVersion") == version - 1
+        ):
+            return {"success": True, "patch": build_row_patch(config, diff), "diff": diff, "version": version}
+
         if operation_type == "dispatchAllPostResponse" or operation_type == "dispatchSampledPostResponse" or operation_type == "dispatchUnseenPostResponse":
             data = []
         else:
             data = config["repo"].find(config["conditions"](workspace_id))
-            print(f"Finding data for operation type: {operation_type}", data)
         
         formatted_data = config["format_func"](data) if operation_type in ["dispatchGroupedCodes", "dispatchThemes"] else [config["format_func"](item) for item in data]
-        print("Formatted data:", formatted_data, "operation type:", operation_type)
-        return {"success": True, config["response_key"]: formatted_data, "diff": diff}
+        print(f"Saved {operation_type} for workspace {workspace_id}: {len(formatted_data)} rows, version {version}")
+        return {"success": True, config["response_key"]: formatted_data, "diff": diff, "version": version}
 
     if operation_type == "addContextFile":
         file_path = request_body.get("filePath")
@@ -220,7 +251,8 @@ async def load_coding_context(
             "concepts", "selectedConcepts", "conceptOutlineTable", "sampledPostIds"
         ]
 
-    response: Dict[str, Any] = {}
+    # Read before the states, so a save that lands in between makes the client's next diff fall back to full.
+    response: Dict[str, Any] = {"version": state_version_repo.get(workspace_id)}
 
     for state in states:
         if state in load_functions:
@@ -1,50 +1,139 @@
-from typing import Dict
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
 import asyncio
 import json
 
+from constants import WS_EVENTS
+
 router = APIRouter()
 
+EVENT_TYPES = ("progress", "log", "error", "done")
+
+
+@dataclass
+class WsEvent:
+    type: str
+    topic: str
+    frame: str
+
+
+def parse_event(message: str) -> WsEvent:
+    """
+    Types a message from the IPC channel. JSON objects with a known "type" (progress events from
+    services/progress_tracker.py) keep it, with the function they report on as topic; free-text lines are
+    errors when they start with "ERROR" and logs otherwise. The frame sent to the app is the message as is,
+    so text consumers in the app keep working.
+    """
+    if message.startswith("{"):
+        try:
+            data = json.loads(message)
+        except ValueError:
+            data = None
+        if isinstance(data, dict) and data.get("type") in EVENT_TYPES:
+            topic = data.get("function_id") or data.get("name") or data["type"]
+            return WsEvent(data["type"], str(topic), message)
+    if message.startswith("ERROR"):
+        return WsEvent("error", "error", message)
+    return WsEvent("log", "log", message)
+
+
+class AppConnection:
+    # One app's websocket with its own bounded send queue and sender task, so a slow app only delays itself.
+    def __init__(self, app_id: str, websocket: WebSocket, on_failure):
+        self.app_id = app_id
+        self.websocket = websocket
+        self.on_failure = on_failure
+        self.interval = 1 / WS_EVENTS["max_flush_hz"]
+        # Logs and errors in order; past max_queued the oldest are dropped.
+        self.ordered: deque = deque()
+        # topic -> latest progress or done event not sent yet. A done event replaces the topic's pending
+        # progress and is never dropped, so the app always receives the final count.
+        self.latest: Dict[str, WsEvent] = {}
+        self.wakeup = asyncio.Event()
+        self.sender = asyncio.create_task(self._run())
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def enqueue(self, event: WsEvent):
+        if event.type in ("progress", "done"):
+            if event.topic in self.latest:
+                self.coalesced += 1
+            self.latest[event.topic] = event
+        else:
+            if len(self.ordered) >= WS_EVENTS["max_queued"]:
+                self.ordered.popleft()
+                self.dropped += 1
+            self.ordered.append(event)
+        self.wakeup.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            started = loop.time()
+            frames = [event.frame for event in self.ordered] + [event.frame for event in self.latest.values()]
+            self.ordered.clear()
+            self.latest.clear()
+            try:
+                for frame in frames:
+                    await self.websocket.send_text(frame)
+                    self.sent += 1
+            except Exception as e:
+                print(f"Failed to send message to {self.app_id}: {e}")
+                self.on_failure(self.app_id, self.websocket)
+                return
+            await asyncio.sleep(max(0.0, self.interval - (loop.time() - started)))
+
+    def close(self):
+        self.sender.cancel()
+
+
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}  
         self.keep_alive_tasks: Dict[str, asyncio.Task] = {}   
+        self.app_connections: Dict[str, AppConnection] = {}
 
     async def add_connection(self, app_id: str, websocket: WebSocket):
+        if app_id in self.active_connections:
+            self.remove_connection(app_id)
         self.active_connections[app_id] = websocket
+        self.app_connections[app_id] = AppConnection(app_id, websocket, self.remove_connection)
         print(f"Added connection for app: {app_id}")
         self.keep_alive_tasks[app_id] = asyncio.create_task(self.keep_alive(app_id, websocket))
 
-    def remove_connection(self, app_id: str):
+    def remove_connection(self, app_id: str, websocket: Optional[WebSocket] = None):
+        # With a websocket given, only that connection is removed, not a newer one the app opened since.
+        if websocket is not None and self.active_connections.get(app_id) is not websocket:
+            return
         if app_id in self.active_connections:
             del self.active_connections[app_id]
             print(f"Removed connection for app: {app_id}")
 
+        connection = self.app_connections.pop(app_id, None)
+        if connection is not None:
+            connection.close()
+
         if app_id in self.keep_alive_tasks:
             self.keep_alive_tasks[app_id].cancel()
             del self.keep_alive_tasks[app_id]
 
     async def send_message(self, app_id: str, message: str):
-        # await asyncio.sleep(0)
-        print(f"Sending message to {app_id}: {message}")
-        if app_id in self.active_connections:
-            websocket = self.active_connections[app_id]
-            try:
-                await websocket.send_text(message)
-            except Exception as e:
-                print(f"Failed to send message to {app_id}: {e}")
-                self.remove_connection(app_id)
-        else:
+        # Only queues the message; the app's sender writes it, coalescing progress and capping the rate.
+        connection = self.app_connections.get(app_id)
+        if connection is None:
             print(f"No active connection for app {app_id}")
+            return
+        connection.enqueue(parse_event(message))
 
     async def broadcast(self, message: str):
-        for app_id, websocket in list(self.active_connections.items()):
-            try:
-                print(f"Broadcasting message to {app_id}: {message}")
-                await websocket.send_text(message)
-            except Exception as e:
-                print(f"Failed to send message to {app_id}: {e}")
-                self.remove_connection(app_id)
+        event = parse_event(message)
+        for connection in list(self.app_connections.values()):
+            connection.enqueue(event)
 
     async def keep_alive(self, app_id: str, websocket: WebSocket):
         try:
@@ -54,11 +143,22 @@ class ConnectionManager:
                     await websocket.send_text("ping")
                 except Exception as e:
                     print(f"Keep-alive failed for {app_id}: {e}")
-                    self.remove_connection(app_id)
+                    self.remove_connection(app_id, websocket)
                     break
         except asyncio.CancelledError:
             pass
 
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            app_id: {
+                "queued": len(connection.ordered) + len(connection.latest),
+                "sent": connection.sent,
+                "coalesced": connection.coalesced,
+                "dropped": connection.dropped,
+            }
+            for app_id, connection in self.app_connections.items()
+        }
+
 
 manager = ConnectionManager()
 
@@ -86,7 +186,7 @@ async def websocket_endpoint(websocket: WebSocket, app: str = Query(...)):
     except Exception as e:
         print(f"Error in WebSocket for app {app_id}: {e}")
     finally:
-        manager.remove_connection(app_id)
+        manager.remove_connection(app_id, websocket)
 
 @router.websocket("/notify")
 async def notify_endpoint(websocket: WebSocket):
@@ -97,3 +197,8 @@ async def notify_endpoint(websocket: WebSocket):
             await manager.broadcast(data)
     except WebSocketDisconnect:
         print("Notify WebSocket disconnected")
+
+
+@router.get("/stats")
+async def websocket_stats():
+    return manager.stats()
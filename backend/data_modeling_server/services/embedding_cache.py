@@ -0,0 +1,182 @@
+import hashlib
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from chromadb import EmbeddingFunction
+from langchain_core.embeddings import Embeddings
+
+from constants import EMBEDDING_CACHE
+from database import EmbeddingCacheRepository
+from models import EmbeddingCacheEntry
+
+
+class EmbeddingCache:
+    """
+    Embeddings keyed by (provider, embedding model, kind, sha256 of the text), persisted in their own SQLite
+    file and shared by every backend process. kind separates query from document embeddings, which some
+    providers compute differently for the same text.
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = EMBEDDING_CACHE["max_bytes"],
+        dtype: str = EMBEDDING_CACHE["dtype"],
+        evict_every: int = EMBEDDING_CACHE["evict_every"],
+    ):
+        self.repo = EmbeddingCacheRepository()
+        self.max_bytes = max_bytes
+        self.dtype = dtype
+        self.evict_every = evict_every
+
+        self._lock = threading.Lock()
+        self._stores_since_evict = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    @staticmethod
+    def make_key(provider: str, model: str, kind: str, text: str) -> Dict[str, str]:
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        identity = "\0".join([provider, model, kind, text_hash])
+        return {"cache_key": hashlib.sha256(identity.encode("utf-8")).hexdigest(), "text_hash": text_hash}
+
+    def embed(
+        self,
+        provider: str,
+        model: str,
+        kind: str,
+        texts: List[str],
+        compute: Callable[[List[str]], List[List[float]]],
+    ) -> List[List[float]]:
+        # Looks every text up, computes only the missing ones (each distinct text once) and stores them.
+        keys = [self.make_key(provider, model, kind, text) for text in texts]
+        try:
+            found = self.repo.lookup_many(list({key["cache_key"] for key in keys}))
+        except Exception as e:
+            self.handle_error("Lookup", e)
+            found = {}
+        vectors = {
+            cache_key: np.frombuffer(vector, dtype=dtype).astype(np.float32).tolist()
+            for cache_key, (dtype, vector) in found.items()
+        }
+
+        missing: Dict[str, int] = {}
+        for i, key in enumerate(keys):
+            if key["cache_key"] not in vectors:
+                missing.setdefault(key["cache_key"], i)
+        if missing:
+            computed = compute([texts[i] for i in missing.values()])
+            now = time.time()
+            entries = []
+            for (cache_key, i), vector in zip(missing.items(), computed):
+                vectors[cache_key] = [float(v) for v in vector]
+                blob = np.asarray(vector, dtype=self.dtype).tobytes()
+                entries.append(EmbeddingCacheEntry(
+                    **keys[i],
+                    provider=provider,
+                    model=model,
+                    dtype=self.dtype,
+                    vector=blob,
+                    size_bytes=len(blob),
+                    created_at=now,
+                    last_used_at=now,
+                ))
+            self.store(entries)
+
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        return [vectors[key["cache_key"]] for key in keys]
+
+    def store(self, entries: List[EmbeddingCacheEntry]):
+        try:
+            self.repo.store_many(entries)
+        except Exception as e:
+            self.handle_error("Store", e)
+            return
+        with self._lock:
+            self._stores_since_evict += len(entries)
+            evict = self._stores_since_evict >= self.evict_every
+            if evict:
+                self._stores_since_evict = 0
+        if evict:
+            self.evict()
+
+    def handle_error(self, action: str, error: Exception):
+        # Failures are cache misses; a corrupt cache file is thrown away and starts over empty.
+        print(f"[EMBEDDING CACHE] {action} failed: {error}")
+        message = str(error).lower()
+        if "malformed" in message or "corrupt" in message or "not a database" in message:
+            try:
+                self.repo.reset()
+                print("[EMBEDDING CACHE] Recreated the corrupt cache file")
+            except Exception as e:
+                print(f"[EMBEDDING CACHE] Could not recreate the cache file: {e}")
+
+    def evict(self) -> int:
+        if not self.max_bytes:
+            return 0
+        try:
+            removed = self.repo.evict(self.max_bytes)
+        except Exception as e:
+            self.handle_error("Evict", e)
+            return 0
+        with self._lock:
+            self.evicted += removed
+        if removed:
+            print(f"[EMBEDDING CACHE] Evicted {removed} vectors")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            counters = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evicted": self.evicted,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+        return {**counters, **self.repo.summary(), "max_bytes": self.max_bytes, "dtype": self.dtype}
+
+
+@lru_cache
+def get_embedding_cache() -> EmbeddingCache:
+    return EmbeddingCache()
+
+
+class CachedEmbeddings(Embeddings):
+    # Wraps a provider's LangChain embeddings; anything besides the two embed calls is passed through.
+    def __init__(self, embeddings: Embeddings, provider: str, model: str):
+        self.embeddings = embeddings
+        self.provider = provider
+        self.model = model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return get_embedding_cache().embed(self.provider, self.model, "document", texts, self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return get_embedding_cache().embed(
+            self.provider, self.model, "query", [text], lambda texts: [self.embeddings.embed_query(texts[0])]
+        )[0]
+
+    def __getattr__(self, name: str) -> Any:
+        if "embeddings" not in self.__dict__:
+            raise AttributeError(name)
+        return getattr(self.__dict__["embeddings"], name)
+
+
+class CachedEmbeddingFunction(EmbeddingFunction):
+    # The same for Chroma embedding functions, used when collections are imported.
+    def __init__(self, embedding_function: EmbeddingFunction, provider: str, model: str):
+        self.embedding_function = embedding_function
+        self.provider = provider
+        self.model = model
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return get_embedding_cache().embed(
+            self.provider, self.model, "document", list(input),
+            lambda texts: [list(vector) for vector in self.embedding_function(texts)],
+        )
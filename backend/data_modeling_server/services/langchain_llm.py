@@ -1,6 +1,7 @@
 import json
 from config import CustomSettings
 from errors.llm_errors import InvalidModelFormatError, UnsupportedEmbeddingModelError, UnsupportedModelError
+from services.embedding_cache import CachedEmbeddings
 from services.llm_providers.llm_provider_factory import LLMProviderFactory 
 
 class LangchainLLMService:
@@ -56,7 +57,8 @@ class LangchainLLMService:
             raise ValueError("Random seed must be a non-negative integer")
 
         llm = provider_instance.get_llm(model_name, num_ctx, num_predict, temperature, random_seed)
-        embeddings = provider_instance.get_embeddings(self.settings.ai.providers[provider_name].textEmbedding)
+        embedding_model = self.settings.ai.providers[provider_name].textEmbedding
+        embeddings = CachedEmbeddings(provider_instance.get_embeddings(embedding_model), provider_name, embedding_model)
         print(f"Initialized LLM and embeddings for model '{model}'")
         return llm, embeddings
     
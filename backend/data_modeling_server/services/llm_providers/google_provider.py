@@ -5,7 +5,7 @@ from langchain_core.callbacks import StreamingStdOutCallbackHandler
 from config import CustomSettings
 from errors.llm_errors import ConfigurationError, EmbeddingsInitializationError, LLMInitializationError
 from models.shared import LLMProvider
-from utils.llm_logger import AllChainDetails
+from utils.llm_logger import AllChainDetails, prompt_prefix_metrics
 
 class GoogleProvider(LLMProvider):
     def __init__(self, settings: CustomSettings):
@@ -22,7 +22,7 @@ class GoogleProvider(LLMProvider):
                 num_predict=num_predict,
                 temperature=temperature,
                 seed=random_seed,
-                callbacks=[StreamingStdOutCallbackHandler(), AllChainDetails()],
+                callbacks=[StreamingStdOutCallbackHandler(), AllChainDetails(), prompt_prefix_metrics],
                 google_api_key=self.settings.ai.providers["google"].apiKey
             )
         except Exception as e:
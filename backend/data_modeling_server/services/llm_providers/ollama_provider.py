@@ -8,7 +8,7 @@ from langchain_core.callbacks import StreamingStdOutCallbackHandler
 from config import CustomSettings
 from errors.llm_errors import EmbeddingsInitializationError, LLMInitializationError
 from models.shared import LLMProvider
-from utils.llm_logger import AllChainDetails
+from utils.llm_logger import AllChainDetails, prompt_prefix_metrics
 
 class CleanOllamaLLM(OllamaLLM):
     def _clean_content(self, content: str) -> str:
@@ -51,7 +51,7 @@ class OllamaProvider(LLMProvider):
                 num_ctx=min(num_ctx, 8192),
                 num_predict=min(num_predict, 8192),
                 temperature=temperature,
-                callbacks=[StreamingStdOutCallbackHandler(), AllChainDetails()]
+                callbacks=[StreamingStdOutCallbackHandler(), AllChainDetails(), prompt_prefix_metrics]
             )
         except Exception as e:
             raise LLMInitializationError(f"Failed to initialize Ollama LLM for model '{model_name}': {str(e)}")
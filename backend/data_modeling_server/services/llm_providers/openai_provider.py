@@ -5,7 +5,7 @@ from langchain_core.callbacks import StreamingStdOutCallbackHandler
 from config import CustomSettings
 from errors.llm_errors import ConfigurationError, EmbeddingsInitializationError, LLMInitializationError
 from models.shared import LLMProvider
-from utils.llm_logger import AllChainDetails
+from utils.llm_logger import AllChainDetails, prompt_prefix_metrics
 
 class OpenAIProvider(LLMProvider):
     def __init__(self, settings: CustomSettings):
@@ -20,7 +20,7 @@ class OpenAIProvider(LLMProvider):
                 max_tokens=num_predict,
                 temperature=temperature,
                 seed=random_seed,
-                callbacks=[StreamingStdOutCallbackHandler(), AllChainDetails()],
+                callbacks=[StreamingStdOutCallbackHandler(), AllChainDetails(), prompt_prefix_metrics],
                 api_key=self.settings.ai.providers["openai"].apiKey
             )
         except Exception as e:
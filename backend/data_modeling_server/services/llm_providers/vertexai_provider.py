@@ -7,7 +7,7 @@ import os
 from config import CustomSettings
 from errors.llm_errors import ConfigurationError, EmbeddingsInitializationError, LLMInitializationError
 from models.shared import LLMProvider
-from utils.llm_logger import AllChainDetails
+from utils.llm_logger import AllChainDetails, prompt_prefix_metrics
 
 from langchain_core.globals import set_debug
 set_debug(True)
@@ -33,7 +33,7 @@ class VertexAIProvider(LLMProvider):
                 model=model_name,
                 max_output_tokens=num_predict,
                 temperature=temperature,
-                callbacks=[StreamingStdOutCallbackHandler(), AllChainDetails()],
+                callbacks=[StreamingStdOutCallbackHandler(), AllChainDetails(), prompt_prefix_metrics],
                 project=project_id,
                 convert_system_message_to_human=True
             )
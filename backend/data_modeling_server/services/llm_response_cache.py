@@ -0,0 +1,160 @@
+import hashlib
+import json
+import threading
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+from config import CustomSettings
+from constants import LLM_RESPONSE_CACHE
+from database import LlmResponseCacheRepository
+from models import LlmResponseCacheEntry
+
+# Set per HTTP request by LlmCacheMiddleware; True means "call the model again and overwrite the entry".
+llm_cache_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+
+def encode_response(result: Any) -> Optional[str]:
+    # LLM.invoke returns a str and chat models return a message; anything else is not cached.
+    if isinstance(result, str):
+        return json.dumps({"type": "text", "text": result})
+    if isinstance(result, BaseMessage):
+        return json.dumps({"type": "message", "message": message_to_dict(result)})
+    return None
+
+
+def decode_response(response_json: str) -> Any:
+    payload = json.loads(response_json)
+    if payload["type"] == "text":
+        return payload["text"]
+    return messages_from_dict([payload["message"]])[0]
+
+
+def llm_cache_context(
+    workspace_id: str,
+    llm_model: str,
+    llm_instance: Any,
+    use_cache: Optional[bool] = None,
+) -> Dict[str, Any]:
+    # Everything besides the prompt that decides what the model answers. Providers that do not expose
+    # a seed on the LLM object still run with the configured one, so fall back to the settings.
+    settings = CustomSettings().ai
+    provider, _, model = (llm_model or "").partition("-")
+    temperature = getattr(llm_instance, "temperature", None)
+    seed = getattr(llm_instance, "seed", None)
+    return {
+        "workspace_id": workspace_id,
+        "provider": provider,
+        "model": model or llm_model,
+        "temperature": float(temperature if temperature is not None else settings.temperature),
+        "seed": int(seed if seed is not None else settings.randomSeed),
+        "bypass": (not use_cache) if use_cache is not None else llm_cache_bypass.get(),
+    }
+
+
+class LlmResponseCache:
+    def __init__(
+        self,
+        max_entries: Optional[int] = LLM_RESPONSE_CACHE["max_entries"],
+        max_age_days: Optional[float] = LLM_RESPONSE_CACHE["max_age_days"],
+        evict_every: int = LLM_RESPONSE_CACHE["evict_every"],
+    ):
+        self.repo = LlmResponseCacheRepository()
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400 if max_age_days else None
+        self.evict_every = evict_every
+
+        self._lock = threading.Lock()
+        self._stores_since_evict = 0
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.stores = 0
+        self.evicted = 0
+
+    @staticmethod
+    def make_key(context: Dict[str, Any], prompt: str) -> Dict[str, str]:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        identity = json.dumps(
+            [context["workspace_id"], context["provider"], context["model"], context["temperature"], context["seed"], prompt_hash]
+        )
+        return {"cache_key": hashlib.sha256(identity.encode("utf-8")).hexdigest(), "prompt_hash": prompt_hash}
+
+    def _min_created_at(self) -> float:
+        return time.time() - self.max_age if self.max_age else 0.0
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def lookup(self, context: Dict[str, Any], prompt: str) -> Optional[Any]:
+        if context.get("bypass"):
+            self._count("bypassed")
+            return None
+        response_json = self.repo.lookup(self.make_key(context, prompt)["cache_key"], self._min_created_at())
+        if response_json is None:
+            self._count("misses")
+            return None
+        try:
+            result = decode_response(response_json)
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"[LLM CACHE] Discarding unreadable entry: {e}")
+            self._count("misses")
+            return None
+        self._count("hits")
+        return result
+
+    def store(self, context: Dict[str, Any], prompt: str, result: Any) -> bool:
+        response_json = encode_response(result)
+        if response_json is None:
+            return False
+        now = time.time()
+        self.repo.store(LlmResponseCacheEntry(
+            **self.make_key(context, prompt),
+            workspace_id=context["workspace_id"],
+            provider=context["provider"],
+            model=context["model"],
+            response_json=response_json,
+            temperature=context["temperature"],
+            seed=context["seed"],
+            created_at=now,
+            last_used_at=now,
+        ))
+        with self._lock:
+            self.stores += 1
+            self._stores_since_evict += 1
+            evict = self._stores_since_evict >= self.evict_every
+            if evict:
+                self._stores_since_evict = 0
+        if evict:
+            self.evict()
+        return True
+
+    def evict(self) -> int:
+        removed = self.repo.evict(self.max_entries, self._min_created_at())
+        with self._lock:
+            self.evicted += removed
+        if removed:
+            print(f"[LLM CACHE] Evicted {removed} entries")
+        return removed
+
+    def stats(self, workspace_id: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            counters = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "stores": self.stores,
+                "evicted": self.evicted,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+        return {**counters, **self.repo.summary(workspace_id)}
+
+
+@lru_cache
+def get_llm_response_cache() -> LlmResponseCache:
+    return LlmResponseCache()
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import socket
+import uuid
+from typing import Dict, Optional
+
+from constants import LLM_PROVIDER_LIMITS
+from database import LlmProviderBudgetRepository, LlmSchedulerLeaseRepository
+
+
+class SharedLlmScheduler:
+    """
+    Admission control for LLM calls shared by every uvicorn worker.
+
+    Each worker process still runs its own GlobalQueueManager, but before a job is executed the worker has to
+    take a lease from the llm_scheduler_lease table. Leases cap the number of concurrent calls per provider
+    across all processes, and a token bucket in llm_provider_budget caps the request rate. Leases expire
+    on their own so a crashed worker cannot hold a slot forever.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Dict]] = None,
+        default_requests_per_minute: Optional[int] = None,
+        default_max_concurrency: Optional[int] = None,
+        lease_ttl: float = 600.0,
+        max_poll_interval: float = 2.0,
+    ):
+        self.limits = limits if limits is not None else LLM_PROVIDER_LIMITS
+        self.default_limits = {
+            "max_concurrency": default_max_concurrency,
+            "requests_per_minute": default_requests_per_minute,
+            "burst": 1,
+        }
+        self.lease_ttl = lease_ttl
+        self.max_poll_interval = max_poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+        LlmProviderBudgetRepository()
+        self.lease_repo = LlmSchedulerLeaseRepository()
+
+    def get_limits(self, provider: Optional[str]) -> Dict:
+        return {**self.default_limits, **self.limits.get(provider or "", {})}
+
+    async def acquire(self, provider: Optional[str], lease_ttl: Optional[float] = None) -> str:
+        provider = provider or "default"
+        limits = self.get_limits(provider)
+        lease_id = str(uuid.uuid4())
+        while True:
+            wait = await asyncio.to_thread(
+                self.lease_repo.try_acquire,
+                lease_id,
+                provider,
+                self.owner,
+                limits["max_concurrency"],
+                limits["requests_per_minute"],
+                limits["burst"],
+                lease_ttl or self.lease_ttl,
+            )
+            if wait <= 0:
+                return lease_id
+            await asyncio.sleep(min(wait, self.max_poll_interval))
+
+    async def release(self, lease_id: Optional[str]):
+        if not lease_id:
+            return
+        try:
+            await asyncio.to_thread(self.lease_repo.release, lease_id)
+        except Exception as e:
+            print(f"[SCHEDULER] Failed to release lease {lease_id}: {e}")
+
+    def release_all(self):
+        try:
+            self.lease_repo.release_owner(self.owner)
+        except Exception as e:
+            print(f"[SCHEDULER] Failed to release leases for {self.owner}: {e}")
@@ -14,6 +14,8 @@ from config import CustomSettings
 from constants import STUDY_DATABASE_PATH
 from database import LlmPendingTaskRepository, LlmFunctionArgsRepository
 from models import LlmPendingTask
+from services.llm_scheduler import SharedLlmScheduler
+from services.llm_response_cache import get_llm_response_cache
 
 class GlobalQueueManager:
     def __init__(
@@ -35,6 +37,8 @@ class GlobalQueueManager:
             self.worker_states: Dict[int, Tuple[str, float]] = {}
             self.running = False
             self.pending_tasks: Dict[str, ConcurrentFuture] = {}
+            # job_id -> llm_cache_context(...) for jobs whose response may be served from / saved to the cache
+            self.cache_contexts: Dict[str, Dict] = {}
             self._lock = threading.Lock()
             self.idle_threshold = idle_threshold
             settings = CustomSettings()
@@ -52,9 +56,6 @@ class GlobalQueueManager:
             self.cancelled_jobs_count: Dict[str, int] = defaultdict(int)
 
             self.rate_limit_per_minute = rate_limit_per_minute
-            self.rate_limit_per_sec = rate_limit_per_minute / 60.0 if rate_limit_per_minute else None
-            self.last_start_time = 0.0
-            self.rate_lock = asyncio.Lock()
             self.status_check_interval = status_check_interval
             self.stop_event = asyncio.Event()
 
@@ -74,12 +75,18 @@ class GlobalQueueManager:
             try:
                 self.pending_task_repo = LlmPendingTaskRepository()
                 self.function_args_repo = LlmFunctionArgsRepository()
+                self.scheduler = SharedLlmScheduler(
+                    default_requests_per_minute=rate_limit_per_minute,
+                    default_max_concurrency=num_workers,
+                )
+                self.owner = self.scheduler.owner
+                self.response_cache = get_llm_response_cache()
             except Exception as e:
                 print(f"[INIT] Failed to initialize database classes: {e}")
                 raise
 
             try:
-                stray_tasks = self.pending_task_repo.find(filters={"status": ["pending", "enqueued", "in-progress"]})
+                stray_tasks = self.pending_task_repo.find(filters={"status": ["pending", "enqueued", "in-progress"], "owner": self.owner})
                 for task in stray_tasks:
                     function_key = task.function_key
                     if function_key not in self.function_cache:
@@ -168,6 +175,7 @@ class GlobalQueueManager:
                     print("[STOP] Worker task cancelled")
 
             self.worker_tasks.clear()
+            self.scheduler.release_all()
             self.enqueue_task = None
             self.status_task = None 
             self.cacheable_args.clear()
@@ -183,7 +191,7 @@ class GlobalQueueManager:
                 with self._lock:
                     pending_count = len(self.pending_tasks)
                     queue_size = self.queue.qsize()
-                    pending_db = self.pending_task_repo.count(filters={"status": "pending"})
+                    pending_db = self.pending_task_repo.count(filters={"status": "pending", "owner": self.owner})
                     all_idle = all(state == "idle" for state, _ in self.worker_states.values())
 
                 if all_idle and pending_db == 0 and queue_size == 0:
@@ -198,7 +206,7 @@ class GlobalQueueManager:
 
                 print(f"[STATUS] Pending tasks: {pending_count}, Queue size: {queue_size}, "
                     f"DB pending: {pending_db}, functions: {len(self.function_cache)}")
-                pending_jobs_count = self.pending_task_repo.count(filters={"status": "pending"})
+                pending_jobs_count = self.pending_task_repo.count(filters={"status": "pending", "owner": self.owner})
                 print(f"[STATUS] Pending tasks: {pending_count}, Queue size: {queue_size}, DB pending: {pending_jobs_count}, function_cache: {len(self.function_cache)}, Current cutoff: {self.cutoff}")
             except Exception as e:
                 print(f"[STATUS] Error in status check: {e}")
@@ -215,7 +223,7 @@ class GlobalQueueManager:
                     print("[ENQUEUE] Queue full, waiting")
                     await asyncio.sleep(1)
                     continue
-                pending_tasks = self.pending_task_repo.find(filters={"status": "pending"}, limit=available_space)
+                pending_tasks = self.pending_task_repo.find(filters={"status": "pending", "owner": self.owner}, limit=available_space)
 
                 if available_space > 0 and len(pending_tasks) > 0:
                     for task in pending_tasks:
@@ -263,7 +271,7 @@ class GlobalQueueManager:
                                 print(f"[ENQUEUE] JSON decode error for task {job_id}: {e}")
                                 continue
                             try:
-                                await self.queue.put((job_id, function_key, args_tuple, full_kwargs, cfut))
+                                await self.queue.put((job_id, function_key, task.provider, args_tuple, full_kwargs, cfut))
                                 self.pending_task_repo.update(
                                     filters={"task_id": job_id},
                                     updates={"status": "enqueued"}
@@ -283,6 +291,7 @@ class GlobalQueueManager:
                             )
                             with self._lock:
                                 stray = self.pending_tasks.pop(job_id, None)
+                                self.cache_contexts.pop(job_id, None)
                             if stray is not None:
                                 stray.set_exception(ValueError("No pending future found"))
                             continue
@@ -307,7 +316,7 @@ class GlobalQueueManager:
             while not self.stop_event.is_set():
                 try:
                     job = await self.queue.get()
-                    job_id, function_key, args, kwargs, cfut = job
+                    job_id, function_key, provider, args, kwargs, cfut = job
 
                     if cfut.cancelled():
                         print(f"[WORKER {worker_id}] Job {job_id} was cancelled before start; discarding")
@@ -318,6 +327,7 @@ class GlobalQueueManager:
                         with self._lock:
                             if job_id in self.pending_tasks:
                                 del self.pending_tasks[job_id]
+                            self.cache_contexts.pop(job_id, None)
                             if function_key in self.function_jobs and job_id in self.function_jobs[function_key]:
                                 self.function_jobs[function_key].remove(job_id)
                                 if not self.function_jobs[function_key]:
@@ -327,8 +337,12 @@ class GlobalQueueManager:
 
                     with self._lock:
                         self.worker_states[worker_id] = ("busy", time.time())
+                        cache_context = self.cache_contexts.pop(job_id, None)
                     print(f"[WORKER {worker_id}] Dequeued job {job_id}")
 
+                    # Only plain prompt calls are cached; the key is built from the final prompt text.
+                    cache_prompt = args[0] if cache_context and len(args) == 1 and not kwargs and isinstance(args[0], str) else None
+
                     with self._lock:
                         if function_key not in self.function_cache:
                             print(f"[WORKER {worker_id}] Function {function_key} not in cache for task {job_id}")
@@ -341,18 +355,28 @@ class GlobalQueueManager:
                             continue
                         func = self.function_cache[function_key][0]
 
-                    if self.rate_limit_per_sec:
-                        async with self.rate_lock:
-                            now = time.time()
-                            min_interval = (1.0 / self.rate_limit_per_sec) + 0.1
-                            elapsed = now - self.last_start_time
-                            if elapsed < min_interval:
-                                delay = min_interval - elapsed
-                                print(f"[WORKER {worker_id}] Rate limit delay: {delay:.3f}s")
-                                await asyncio.sleep(delay)
-                            self.last_start_time = time.time()
-
+                    lease_id = None
                     try:
+                        if cache_prompt is not None:
+                            try:
+                                cached = await asyncio.to_thread(self.response_cache.lookup, cache_context, cache_prompt)
+                            except Exception as e:
+                                print(f"[WORKER {worker_id}] Cache lookup failed for job {job_id}: {e}")
+                                cached = None
+                            if cached is not None:
+                                cfut.set_result(cached)
+                                self.pending_task_repo.update(
+                                    filters={"task_id": job_id},
+                                    updates={"status": "completed", "result_json": json.dumps({"note": "Served from response cache"}), "completed_at": datetime.now()}
+                                )
+                                print(f"[WORKER {worker_id}] Job {job_id} served from response cache")
+                                continue
+
+                        wait_start = time.time()
+                        lease_id = await self.scheduler.acquire(provider, lease_ttl=self.cutoff + 60)
+                        waited = time.time() - wait_start
+                        if waited > 0.5:
+                            print(f"[WORKER {worker_id}] Waited {waited:.3f}s for a {provider} slot")
                         self.pending_task_repo.update(
                             filters={"task_id": job_id},
                             updates={"status": "in-progress", "started_at": datetime.now()}
@@ -363,6 +387,11 @@ class GlobalQueueManager:
                             timeout=self.cutoff
                         )
                         cfut.set_result(result)
+                        if cache_prompt is not None:
+                            try:
+                                await asyncio.to_thread(self.response_cache.store, cache_context, cache_prompt, result)
+                            except Exception as e:
+                                print(f"[WORKER {worker_id}] Cache store failed for job {job_id}: {e}")
                         try:
                             result_json = json.dumps(result)
                         except TypeError:
@@ -408,6 +437,7 @@ class GlobalQueueManager:
                                 updates={"status": "failed", "error": str(e), "completed_at": datetime.now()}
                             )
                     finally:
+                        await self.scheduler.release(lease_id)
                         with self._lock:
                             self.worker_states[worker_id] = ("idle", time.time())
                             if job_id in self.pending_tasks:
@@ -436,21 +466,24 @@ class GlobalQueueManager:
         except Exception as e:
             print(f"[WORKER {worker_id}] Unexpected error: {e}")
             
-    async def submit_task(self, func: Callable, function_key: str, *args, cacheable_args: Optional[Dict[str, List]] = None, **kwargs) -> Tuple[str, asyncio.Future]:
+    async def submit_task(self, func: Callable, function_key: str, *args, cacheable_args: Optional[Dict[str, List]] = None, provider: Optional[str] = None, cache_context: Optional[Dict] = None, **kwargs) -> Tuple[str, asyncio.Future]:
         try:
             job_id = str(uuid.uuid4())
             cfut = ConcurrentFuture()
             with self._lock:
                 self.pending_tasks[job_id] = cfut
+                if cache_context is not None:
+                    self.cache_contexts[job_id] = cache_context
                 print(f"[SUBMIT] Added task {job_id} to pending_tasks")
 
             try:
                 print(f"[SUBMIT] Calling submit_task_sync for job_id {job_id}")
-                self.submit_task_sync(job_id, func, function_key, cacheable_args, *args, **kwargs)
+                self.submit_task_sync(job_id, func, function_key, cacheable_args, *args, provider=provider, **kwargs)
                 print(f"[SUBMIT] submit_task_sync completed for job_id {job_id}")
             except Exception as e:
                 with self._lock:
                     self.pending_tasks.pop(job_id, None)
+                    self.cache_contexts.pop(job_id, None)
                 print(f"[SUBMIT] submit_task_sync failed for {job_id}: {e}")
                 cfut.set_exception(e)
                 raise
@@ -465,7 +498,7 @@ class GlobalQueueManager:
             print(f"[SUBMIT] Failed to submit task: {e}")
             raise
 
-    def submit_task_sync(self, job_id: str, func: Callable, function_key: str, cacheable_args: Optional[Dict[str, List]] = None, *args, **kwargs):
+    def submit_task_sync(self, job_id: str, func: Callable, function_key: str, cacheable_args: Optional[Dict[str, List]] = None, *args, provider: Optional[str] = None, **kwargs):
         try:
             with self._lock:
                 if function_key in self.function_cache:
@@ -506,7 +539,9 @@ class GlobalQueueManager:
                     function_key=function_key,
                     args_json=json.dumps(variable_args),
                     kwargs_json=json.dumps(variable_kwargs),
-                    created_at=datetime.now()
+                    created_at=datetime.now(),
+                    owner=self.owner,
+                    provider=provider,
                 )
                 self.pending_task_repo.insert(task)
                 print(f"[SUBMIT_SYNC] Inserted task {job_id} and added to function_jobs")
@@ -514,6 +549,16 @@ class GlobalQueueManager:
             print(f"[SUBMIT_SYNC] Failed to insert task {job_id}: {e}")
             raise e
 
+    def capacity(self, provider: Optional[str] = None) -> int:
+        # Jobs this process can run at once for the provider: the worker count, capped by the shared scheduler limit.
+        limit = self.scheduler.get_limits(provider).get("max_concurrency")
+        return min(self._num_workers, limit) if limit else self._num_workers
+
+    def backlog(self) -> int:
+        # Submitted jobs whose futures have not resolved yet, whether still pending, queued or running.
+        with self._lock:
+            return len(self.pending_tasks)
+
 
 @lru_cache
 def get_llm_manager():
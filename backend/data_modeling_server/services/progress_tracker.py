@@ -0,0 +1,130 @@
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from constants import FUNCTION_PROGRESS
+from database import FunctionProgressRepository
+from ipc import send_ipc_message
+
+function_progress_repo = FunctionProgressRepository()
+
+# function_id -> tracker of the function currently running in this process.
+_active_trackers: Dict[str, "FunctionProgressTracker"] = {}
+
+
+class FunctionProgressTracker:
+    """
+    Counts progress of one function_progress row in memory. increment() is atomic and never touches the
+    database; a background task adds the accumulated count to the row with a single UPDATE at most once
+    per flush interval and pushes the new count to the app over IPC, so the frontend does not have to poll.
+
+    Use as an async context manager; leaving it flushes whatever is still pending.
+    """
+
+    def __init__(
+        self,
+        function_id: str,
+        workspace_id: str,
+        name: str,
+        total: int,
+        app_id: Optional[str] = None,
+        current: int = 0,
+        flush_interval_ms: int = FUNCTION_PROGRESS["flush_interval_ms"],
+    ):
+        self.function_id = function_id
+        self.workspace_id = workspace_id
+        self.name = name
+        self.total = total
+        self.app_id = app_id
+        self.flush_interval = flush_interval_ms / 1000
+        self.status = "started"
+
+        self._lock = threading.Lock()
+        self._current = current
+        self._pending = 0
+        self._changed = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+        self.flushes = 0
+
+    @property
+    def current(self) -> int:
+        with self._lock:
+            return self._current
+
+    def increment(self, amount: int = 1):
+        if amount <= 0:
+            return
+        with self._lock:
+            self._current += amount
+            self._pending += amount
+        self._changed.set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "type": "progress" if self.status == "started" else "done",
+            "workspace_id": self.workspace_id,
+            "name": self.name,
+            "function_id": self.function_id,
+            "current": self.current,
+            "total": self.total,
+            "status": self.status,
+        }
+
+    async def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, 0
+        if pending:
+            try:
+                await asyncio.to_thread(function_progress_repo.increment_current, self.function_id, pending)
+                self.flushes += 1
+            except Exception as e:
+                print(f"[PROGRESS] Failed to store progress for {self.function_id}: {e}")
+                with self._lock:
+                    self._pending += pending
+        await self.push()
+
+    async def push(self):
+        if not self.app_id:
+            return
+        try:
+            await send_ipc_message(self.app_id, json.dumps(self.snapshot()), coalesce_key=("progress", self.function_id))
+        except Exception as e:
+            print(f"[PROGRESS] Failed to push progress for {self.function_id}: {e}")
+
+    async def _flush_loop(self):
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            started = time.monotonic()
+            await self.flush()
+            await asyncio.sleep(max(0.0, self.flush_interval - (time.monotonic() - started)))
+
+    async def start(self):
+        _active_trackers[self.function_id] = self
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        await self.push()
+
+    async def close(self, status: str = "completed"):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        self.status = status
+        await self.flush()
+        _active_trackers.pop(self.function_id, None)
+
+    async def __aenter__(self) -> "FunctionProgressTracker":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close("completed" if exc_type is None else "failed")
+
+
+def get_progress_tracker(function_id: str) -> Optional[FunctionProgressTracker]:
+    return _active_trackers.get(function_id)
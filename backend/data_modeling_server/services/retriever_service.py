@@ -0,0 +1,142 @@
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Hashable, List
+
+from chromadb import HttpClient
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from constants import CHROMA_PORT, RETRIEVER_CACHE
+from database import CollectionVersionRepository
+
+
+collection_version_repo = CollectionVersionRepository()
+
+
+@lru_cache(maxsize=1)
+def get_chroma_client() -> HttpClient:
+    # One HTTP client per process; every vector store of every request shares its connections.
+    return HttpClient(host="localhost", port=CHROMA_PORT)
+
+
+class LruCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+class RetrieverService:
+    """
+    Retrieval for one Chroma collection (one workspace and embedding model). Query embeddings are cached by
+    query text, and top-k results by (collection version, k, query text). The version lives in SQLite and is
+    bumped by invalidate_retriever_cache() whenever the collection's documents change, so results cached
+    by other workers are skipped as well.
+    """
+
+    def __init__(
+        self,
+        collection: str,
+        max_results: int = RETRIEVER_CACHE["max_results"],
+        max_embeddings: int = RETRIEVER_CACHE["max_embeddings"],
+    ):
+        self.collection = collection
+        self.results = LruCache(max_results)
+        self.embeddings = LruCache(max_embeddings)
+
+    def embed_query(self, vector_store: Any, query: str) -> List[float]:
+        embedding = self.embeddings.get(query)
+        if embedding is None:
+            embedding = vector_store.embeddings.embed_query(query)
+            self.embeddings.put(query, embedding)
+        return embedding
+
+    def search(self, vector_store: Any, query: str, k: int) -> List[Document]:
+        key = (collection_version_repo.get(self.collection), k, query)
+        docs = self.results.get(key)
+        if docs is None:
+            docs = vector_store.similarity_search_by_vector(self.embed_query(vector_store, query), k=k)
+            self.results.put(key, docs)
+        return list(docs)
+
+    def invalidate(self):
+        self.results.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"results": self.results.stats(), "query_embeddings": self.embeddings.stats()}
+
+
+_services: Dict[str, RetrieverService] = {}
+_services_lock = threading.Lock()
+
+
+def get_retriever_service(collection: str) -> RetrieverService:
+    with _services_lock:
+        if collection not in _services:
+            _services[collection] = RetrieverService(collection)
+        return _services[collection]
+
+
+def invalidate_retriever_cache(collection: str):
+    # Call after adding or deleting documents; other workers notice the new version on their next search.
+    collection_version_repo.bump(collection)
+    with _services_lock:
+        service = _services.get(collection)
+    if service is not None:
+        service.invalidate()
+
+
+def get_retriever_stats() -> Dict[str, Any]:
+    with _services_lock:
+        services = list(_services.values())
+    return {service.collection: service.stats() for service in services}
+
+
+class CachedRetriever(BaseRetriever):
+    # Drop-in for vector_store.as_retriever(search_kwargs={"k": k}) that goes through the collection's
+    # RetrieverService, so repeated queries (retries, concurrent batches, re-runs) skip the embedding call
+    # and the Chroma round trip.
+    vector_store: Any
+    collection: str
+    k: int
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return get_retriever_service(self.collection).search(self.vector_store, query, self.k)
+
+
+def cached_retriever(vector_store: Any, k: int) -> CachedRetriever:
+    return CachedRetriever(vector_store=vector_store, collection=vector_store._collection.name, k=k)
@@ -30,6 +30,9 @@ from chromadb.utils.embedding_functions.ollama_embedding_function import (
     OllamaEmbeddingFunction,
 )
 
+from services.embedding_cache import CachedEmbeddingFunction
+from services.retriever_service import invalidate_retriever_cache
+
 C = TypeVar("C")
 
 
@@ -369,7 +372,11 @@ def chroma_import(
 ) -> None:
     _embedding_function = SupportedEmbeddingFunctions.ollama
     if embedding_function is not None:
-        _embedding_function = get_embedding_function_for_name(embedding_function, model=model)
+        _embedding_function = CachedEmbeddingFunction(
+            get_embedding_function_for_name(embedding_function, model=model),
+            provider=str(getattr(embedding_function, "value", embedding_function)),
+            model=model or "default",
+        )
     client = HttpClient(host="localhost", port=8000)
     _collection = collection
     _batch_size = batch_size
@@ -433,4 +440,5 @@ def chroma_import(
             if len(_batch["documents"]) > 0:
                 executor.submit(
                     add_to_col, chroma_collection, _batch, _upsert, _embedding_function
-                )
\ No newline at end of file
+                )
+    invalidate_retriever_cache(_collection)
\ No newline at end of file
@@ -31,22 +31,25 @@ def process_comments(
 
     return comment_list, label_map
 
-async def _generate_whole_transcript_async(
-    post: Dict[str, Any]
-) -> Any:
+def build_transcript(post: Dict[str, Any]) -> Dict[str, Any]:
     comment_list, comment_map = process_comments(post.get("comments", []))
     transcript_dict = {
         "title": post["title"],
         "body": post["selftext"],
         "comments": comment_list
     }
-    transcript_json = json.dumps(transcript_dict)
-    await asyncio.sleep(0)
-    yield {
-        "transcript": transcript_json,
+    return {
+        "transcript": json.dumps(transcript_dict),
         "comment_map": comment_map
     }
 
+async def _generate_whole_transcript_async(
+    post: Dict[str, Any]
+) -> Any:
+    item = build_transcript(post)
+    await asyncio.sleep(0)
+    yield item
+
 async def _generate_chunks_async(
     post: Dict[str, Any],
     token_checker: Callable[[str], int],
@@ -66,13 +69,18 @@ async def _generate_chunks_async(
             "comment_map": comment_map
         }
     else:
+        # A chunk is the header plus ", "-joined top-level comments, so its size is the header's tokens plus
+        # each comment's tokens plus one per separator. Counting every piece once keeps this linear in the
+        # number of comments instead of re-tokenizing the growing chunk after each one.
+        header_tokens = token_checker(json.dumps({**header, "comments": []}))
         current_comments: List[Dict[str, Any]] = []
+        used = header_tokens
         for comment in comment_list:
-            temp = current_comments + [comment]
-            chunk_dict = {**header, "comments": temp}
-            chunk_json = json.dumps(chunk_dict)
-            if token_checker(chunk_json) <= max_tokens:
-                current_comments = temp
+            comment_tokens = token_checker(json.dumps(comment))
+            separator_tokens = 1 if current_comments else 0
+            if used + separator_tokens + comment_tokens <= max_tokens:
+                current_comments.append(comment)
+                used += separator_tokens + comment_tokens
             else:
                 if current_comments:
                     yield {
@@ -80,6 +88,7 @@ async def _generate_chunks_async(
                         "comment_map": comment_map
                     }
                 current_comments = [comment]
+                used = header_tokens + comment_tokens
         if current_comments:
             yield {
                 "transcript": json.dumps({**header, "comments": current_comments}),
@@ -100,6 +109,23 @@ async def generate_transcript(
             await asyncio.sleep(0)
             yield item
 
+def pack_transcripts(token_counts: List[int], token_budget: int, max_items: int = 8) -> List[List[int]]:
+    # First-fit decreasing: returns groups of indexes into token_counts whose totals stay within token_budget
+    # (an item larger than the budget gets a group of its own). Indexes keep their input order in each group.
+    packs: List[List[int]] = []
+    totals: List[int] = []
+    for index in sorted(range(len(token_counts)), key=lambda i: -token_counts[i]):
+        tokens = token_counts[index]
+        for pack_index, total in enumerate(totals):
+            if total + tokens <= token_budget and len(packs[pack_index]) < max_items:
+                packs[pack_index].append(index)
+                totals[pack_index] += tokens
+                break
+        else:
+            packs.append([index])
+            totals.append(tokens)
+    return [sorted(pack) for pack in packs]
+
 def generate_context_with_codebook(references, main_code, codebook):
     context = ""
     context += f"Main Code:\n{main_code}\n\n"
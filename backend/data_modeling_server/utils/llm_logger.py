@@ -1,5 +1,7 @@
 from datetime import datetime
 import json
+import threading
+import time
 from uuid import UUID
 from langchain_core.callbacks.base import BaseCallbackHandler
 from langchain_core.documents import Document
@@ -208,4 +210,114 @@ class AllChainDetails(BaseCallbackHandler):
                 self.out.key_info(f"Document number {doc_num} of {len(documents)}")
                 self.out.key_info_labeled("Metadata", f"{doc.metadata}")
                 self.out.key_info("Document contents:")
-                self.out.tool_output(doc.page_content)
\ No newline at end of file
+                self.out.tool_output(doc.page_content)
+
+
+def common_prefix_length(a: str, b: str) -> int:
+    # Binary search over slice comparisons, so long prompts are compared at C speed.
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class PromptPrefixMetrics(BaseCallbackHandler):
+    """
+    Tracks how much of each prompt repeats the previous prompt sent to the same model, which is the part
+    Ollama can serve from its KV cache and OpenAI/Gemini from their prompt caches. Where the provider reports
+    it, also records the prompt evaluation time (Ollama) and the number of cached input tokens (OpenAI/Gemini).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._last_prompt: Dict[str, str] = {}
+        self._runs: Dict[UUID, Tuple[str, float]] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    @staticmethod
+    def _model_name(serialized: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> str:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name")
+        if not model and serialized:
+            model = (serialized.get("kwargs") or {}).get("model") or (serialized.get("kwargs") or {}).get("model_name")
+        return str(model or "unknown")
+
+    def _model_stats(self, model: str) -> Dict[str, float]:
+        if model not in self._stats:
+            self._stats[model] = {
+                "calls": 0, "prompt_chars": 0, "shared_prefix_chars": 0, "calls_reusing_prefix": 0,
+                "completed": 0, "latency_s": 0.0,
+                "ollama_calls": 0, "ollama_prompt_eval_tokens": 0, "ollama_prompt_eval_s": 0.0, "ollama_load_s": 0.0,
+                "input_tokens": 0, "cached_input_tokens": 0,
+            }
+        return self._stats[model]
+
+    def _record_start(self, model: str, prompt: str, run_id: Optional[UUID]) -> None:
+        with self._lock:
+            previous = self._last_prompt.get(model)
+            shared = common_prefix_length(previous, prompt) if previous else 0
+            self._last_prompt[model] = prompt
+            stats = self._model_stats(model)
+            stats["calls"] += 1
+            stats["prompt_chars"] += len(prompt)
+            stats["shared_prefix_chars"] += shared
+            if shared:
+                stats["calls_reusing_prefix"] += 1
+            if run_id is not None:
+                self._runs[run_id] = (model, time.perf_counter())
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
+        if prompts:
+            self._record_start(self._model_name(serialized, kwargs), prompts[0], kwargs.get("run_id"))
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], **kwargs: Any) -> None:
+        if messages:
+            prompt = "".join(str(getattr(message, "content", message)) for message in messages[0])
+            self._record_start(self._model_name(serialized, kwargs), prompt, kwargs.get("run_id"))
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        with self._lock:
+            run = self._runs.pop(kwargs.get("run_id"), None)
+            if run is None:
+                return
+            model, started = run
+            stats = self._model_stats(model)
+            stats["completed"] += 1
+            stats["latency_s"] += time.perf_counter() - started
+
+            generation = response.generations[0][0] if response.generations and response.generations[0] else None
+            info = (generation.generation_info or {}) if generation is not None else {}
+            if "prompt_eval_duration" in info:
+                stats["ollama_calls"] += 1
+                stats["ollama_prompt_eval_tokens"] += info.get("prompt_eval_count") or 0
+                stats["ollama_prompt_eval_s"] += (info.get("prompt_eval_duration") or 0) / 1e9
+                stats["ollama_load_s"] += (info.get("load_duration") or 0) / 1e9
+
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            stats["input_tokens"] += usage.get("input_tokens") or 0
+            stats["cached_input_tokens"] += (usage.get("input_token_details") or {}).get("cache_read") or 0
+
+    def on_llm_error(self, error: Union[Exception, KeyboardInterrupt], **kwargs: Any) -> None:
+        with self._lock:
+            self._runs.pop(kwargs.get("run_id"), None)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            result = {}
+            for model, stats in self._stats.items():
+                stats = dict(stats)
+                stats["prefix_reuse_ratio"] = stats["shared_prefix_chars"] / stats["prompt_chars"] if stats["prompt_chars"] else 0.0
+                if stats["ollama_calls"]:
+                    # Time to first token is dominated by loading the model and evaluating the uncached prompt.
+                    stats["ollama_avg_ttft_s"] = (stats["ollama_prompt_eval_s"] + stats["ollama_load_s"]) / stats["ollama_calls"]
+                if stats["input_tokens"]:
+                    stats["cached_input_ratio"] = stats["cached_input_tokens"] / stats["input_tokens"]
+                result[model] = stats
+            return result
+
+
+prompt_prefix_metrics = PromptPrefixMetrics()
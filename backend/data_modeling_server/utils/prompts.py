@@ -1,3 +1,56 @@
+# Per-post prompts are laid out as <prefix built only from the run's shared arguments> + <transcript>.
+# Keeping everything that does not change between posts in front, byte for byte, lets Ollama reuse the KV
+# cache of the previous call and lets OpenAI/Gemini apply their automatic prompt caching to the prefix.
+def transcript_section(post_transcript: str) -> str:
+    return f"""
+Transcript:
+{post_transcript}
+"""
+
+
+def post_transcripts_section(posts) -> str:
+    # posts: (post_id, transcript) pairs packed into one multi-post prompt.
+    return "".join(f"""
+Post {post_id} transcript:
+{transcript}
+""" for post_id, transcript in posts)
+
+
+MULTI_POST_OUTPUT_FORMAT = """
+Output Format and Constraints:
+Return **only** valid JSON, exactly matching this structure:
+
+```json
+{{
+  "posts": [
+    {{
+      "post_id": "The post id exactly as given before its transcript.",
+      "codes": [
+        {{
+          "quote": "Complete and exact phrase from this post's transcript (from the start to the end of the sentence).",
+          "explanation": "{explanation}",
+          "code": "{code}",
+          "source": {{
+            "type": "comment", // "comment" or "post"
+            "comment_id": "1.2", // required if type is "comment"; numbering within this post's transcript
+            "title": false // required if type is "post": true = title, false = body
+          }}
+        }}
+        // …additional code objects for this post…
+      ]
+    }}
+    // …one object per post, in the order the transcripts are given…
+  ]
+}}
+```
+
+* Code every post independently; never attribute a quote to a post it does not come from.
+* Include every post id, with "codes": [] when nothing in that post applies.
+* If a quote fits multiple codes, list each as a separate entry.
+* **Do not** include any text outside the JSON.
+"""
+
+
 class ContextPrompt:
     concept_json_template = """
 ```json{{
@@ -149,11 +202,10 @@ Important Notes:
 
 class InitialCodePrompts:
     @staticmethod
-    def initial_code_prompt(main_topic: str,
+    def initial_code_prefix(main_topic: str,
                             additional_info: str,
                             research_questions: str,
-                            concept_table: str,
-                            post_transcript: str) -> str:
+                            concept_table: str) -> str:
         return f"""
 You are an expert in qualitative research, specializing in Braun & Clarke's six-phase thematic analysis. 
 
@@ -164,11 +216,10 @@ Context:
 - **Additional Information:** {additional_info}  
 - **Research Questions:** {research_questions}  
 - **Concept Table (JSON):** {concept_table}  
-- **Transcript:** {post_transcript}
 
 Step-by-Step Process Guidance:
 1. Read the Transcript
-First, read the entire transcript to understand its overall content and context. Only code the post if it contains quotes that link to the main topic, that are evidence to answer research questions, support additional information, and concept table; otherwise, skip it.
+First, read the entire transcript (given at the end of this prompt) to understand its overall content and context. Only code the post if it contains quotes that link to the main topic, that are evidence to answer research questions, support additional information, and concept table; otherwise, skip it.
 
 2. Line-by-Line Coding
 - **Extract:** For each relevant segment, copy the complete, exact quote.
@@ -207,11 +258,56 @@ Return **only** valid JSON, exactly matching this structure:
 * **Do not** include any text outside the JSON.
 """
 
+    @staticmethod
+    def initial_code_prompt(main_topic: str,
+                            additional_info: str,
+                            research_questions: str,
+                            concept_table: str,
+                            post_transcript: str) -> str:
+        return InitialCodePrompts.initial_code_prefix(main_topic, additional_info, research_questions, concept_table) + transcript_section(post_transcript)
+
+    @staticmethod
+    def initial_code_multi_post_prefix(main_topic: str,
+                                       additional_info: str,
+                                       research_questions: str,
+                                       concept_table: str) -> str:
+        return f"""
+You are an expert in qualitative research, specializing in Braun & Clarke's six-phase thematic analysis. 
+
+Your task is to generate codes by extracting meaningful quotes from each of several post transcripts that link to the main topic, that are evidence to answer research questions, support additional information, and concept table.
+
+Context: 
+- **Main Topic:** {main_topic}  
+- **Additional Information:** {additional_info}  
+- **Research Questions:** {research_questions}  
+- **Concept Table (JSON):** {concept_table}  
+
+Step-by-Step Process Guidance:
+1. Read the Transcripts
+The transcripts are given at the end of this prompt, each introduced by its post id. Read each transcript in full to understand its overall content and context. Only code a post if it contains quotes that link to the main topic, that are evidence to answer research questions, support additional information, and concept table; otherwise, skip it.
+
+2. Line-by-Line Coding
+- **Extract:** For each relevant segment, copy the complete, exact quote.
+- **Code:** Assign a concise label that reflects its meaning relative to the main topic, additional information, research questions, and concept table.
+- **Skip:** Do *not* code irrelevant or off-topic content. Avoid generic labels like “irrelevant,” “off-topic,” etc.
+- Generate each code as a natural phrase - just as a expert human qualitative researcher would. Each word in the code should be seperated by a space.
+""" + MULTI_POST_OUTPUT_FORMAT.format(
+            explanation="How this quote supports the research focus.",
+            code="Assigned code label.",
+        )
+
+    @staticmethod
+    def initial_code_multi_post_prompt(main_topic: str,
+                                       additional_info: str,
+                                       research_questions: str,
+                                       concept_table: str,
+                                       post_transcripts: str) -> str:
+        return InitialCodePrompts.initial_code_multi_post_prefix(main_topic, additional_info, research_questions, concept_table) + post_transcripts
+
 
 class FinalCoding:
     @staticmethod
-    def final_coding_prompt(final_codebook: str,
-                            post_transcript: str,
+    def final_coding_prefix(final_codebook: str,
                             concept_table: str,
                             main_topic: str,
                             additional_info: str = "",
@@ -227,11 +323,10 @@ Context:
 - **Research Questions:** {research_questions}
 - **Concept Table (JSON):** {concept_table}
 - **Final Codebook:** {final_codebook}
-- **Transcript:** {post_transcript}
 
 Step-by-Step Process Guidance:
 1. Read the Transcript
-First, read the entire transcript to understand its overall content and context. Only code the post if it contains quotes that link to the main topic, that are evidence to answer research questions, support additional information, and concept table; otherwise, skip it.
+First, read the entire transcript (given at the end of this prompt) to understand its overall content and context. Only code the post if it contains quotes that link to the main topic, that are evidence to answer research questions, support additional information, and concept table; otherwise, skip it.
 
 2. Line-by-Line Coding
 - **Extract:** For each relevant segment, copy the complete, exact quote.
@@ -271,6 +366,56 @@ Return **only** valid JSON, exactly matching this structure:
 ***Do not** include any text outside the JSON.
 """
 
+    @staticmethod
+    def final_coding_prompt(final_codebook: str,
+                            post_transcript: str,
+                            concept_table: str,
+                            main_topic: str,
+                            additional_info: str = "",
+                            research_questions: str = ""):
+        return FinalCoding.final_coding_prefix(final_codebook, concept_table, main_topic, additional_info, research_questions) + transcript_section(post_transcript)
+
+    @staticmethod
+    def final_coding_multi_post_prefix(final_codebook: str,
+                                       concept_table: str,
+                                       main_topic: str,
+                                       additional_info: str = "",
+                                       research_questions: str = ""):
+        return f"""
+You are an expert in qualitative research, specializing in Braun & Clarke's six-phase thematic analysis. 
+
+Your task is to assign codes — either by selecting existing codes from the final codebook or generating new ones directly from the data — to meaningful quotes from each of several post transcripts that link to the main topic, that are evidence to answer research questions, support additional information, and concept table.
+
+Context:
+- **Main Topic:** {main_topic}
+- **Additional Information:** {additional_info}
+- **Research Questions:** {research_questions}
+- **Concept Table (JSON):** {concept_table}
+- **Final Codebook:** {final_codebook}
+
+Step-by-Step Process Guidance:
+1. Read the Transcripts
+The transcripts are given at the end of this prompt, each introduced by its post id. Read each transcript in full to understand its overall content and context. Only code a post if it contains quotes that link to the main topic, that are evidence to answer research questions, support additional information, and concept table; otherwise, skip it.
+
+2. Line-by-Line Coding
+- **Extract:** For each relevant segment, copy the complete, exact quote.
+- **Code:** Assign a label from the final codebook or generate a concise new label that reflects its meaning relative to the main topic, additional information, research questions, concept table and final codebook.
+- **Skip:** Do *not* code irrelevant or off-topic content. Avoid generic labels like “irrelevant,” “off-topic,” etc.
+- Generate each code as a natural phrase - just as a expert human qualitative researcher would. Each word in the code should be seperated by a space.
+""" + MULTI_POST_OUTPUT_FORMAT.format(
+            explanation="How this quote supports the research focus and fits the assigned code.",
+            code="Assigned code from the final codebook.",
+        )
+
+    @staticmethod
+    def final_coding_multi_post_prompt(final_codebook: str,
+                                       post_transcripts: str,
+                                       concept_table: str,
+                                       main_topic: str,
+                                       additional_info: str = "",
+                                       research_questions: str = ""):
+        return FinalCoding.final_coding_multi_post_prefix(final_codebook, concept_table, main_topic, additional_info, research_questions) + post_transcripts
+
 
 
 class ThemeGeneration:
@@ -614,11 +759,10 @@ No additional commentary outside the JSON object.
 
 class RemakerPrompts:
     @staticmethod
-    def redo_initial_coding_prompt(main_topic: str,
+    def redo_initial_coding_prefix(main_topic: str,
                                    additional_info: str,
                                    research_questions: str,
                                    concept_table: str,
-                                   post_transcript: str,
                                    current_codebook: str,
                                    feedback: str):
         return f"""
@@ -633,11 +777,10 @@ Context:
 - **Concept Table (JSON):** {concept_table}  
 - **Initial Codebook:** {current_codebook}
 - **Feedback:** {feedback}
-- **Transcript:** {post_transcript}
 
 Step-by-Step Process Guidance:
 1. Read the Transcript
-First, read the entire transcript to understand its overall content and context. Only code the post if it contains quotes that link to the main topic, that are evidence to answer research questions, support additional information, and concept table; otherwise, skip it.
+First, read the entire transcript (given at the end of this prompt) to understand its overall content and context. Only code the post if it contains quotes that link to the main topic, that are evidence to answer research questions, support additional information, and concept table; otherwise, skip it.
 
 2. Review and Integrate Feedback
 The initial coding was completed once, but the user found the resulting codebook underwhelming.
@@ -683,20 +826,31 @@ Return **only** valid JSON, exactly matching this structure:
 * **Do not** include any text outside the JSON.
 """
 
+    @staticmethod
+    def redo_initial_coding_prompt(main_topic: str,
+                                   additional_info: str,
+                                   research_questions: str,
+                                   concept_table: str,
+                                   post_transcript: str,
+                                   current_codebook: str,
+                                   feedback: str):
+        return RemakerPrompts.redo_initial_coding_prefix(
+            main_topic, additional_info, research_questions, concept_table, current_codebook, feedback
+        ) + transcript_section(post_transcript)
+
 
 
 
 
 
     @staticmethod
-    def redo_final_coding_prompt(main_topic: str,
-                                additional_info: str,
-                                research_questions: str,
-                                final_codebook: str,
-                                current_codebook: str,
-                                concept_table: str,
-                                post_transcript: str,
-                                feedback: str):
+    def redo_final_coding_prefix(main_topic: str,
+                                 additional_info: str,
+                                 research_questions: str,
+                                 final_codebook: str,
+                                 current_codebook: str,
+                                 concept_table: str,
+                                 feedback: str):
         return f"""
 You are an expert in qualitative research, specializing in Braun & Clarke's six-phase thematic analysis. 
 
@@ -711,11 +865,10 @@ Context:
 - **Current Codebook:** {current_codebook}
 - **Concept Table (JSON):** {concept_table}
 - **Feedback:** {feedback}
-- **Transcript:** {post_transcript}
 
 Step-by-Step Process Guidance:
 1. Read the Transcript
-First, read the entire transcript to understand its overall content and context. Only code the post if it contains quotes that link to the main topic, that are evidence to answer research questions, support additional information, and concept table; otherwise, skip it.
+First, read the entire transcript (given at the end of this prompt) to understand its overall content and context. Only code the post if it contains quotes that link to the main topic, that are evidence to answer research questions, support additional information, and concept table; otherwise, skip it.
 
 2. Review and Integrate Feedback
 The final coding was completed once, but the user found the resulting codebook underwhelming.
@@ -762,6 +915,19 @@ Return **only** valid JSON, exactly matching this structure:
 * **Do not** include any text outside the JSON.
 """
 
+    @staticmethod
+    def redo_final_coding_prompt(main_topic: str,
+                                additional_info: str,
+                                research_questions: str,
+                                final_codebook: str,
+                                current_codebook: str,
+                                concept_table: str,
+                                post_transcript: str,
+                                feedback: str):
+        return RemakerPrompts.redo_final_coding_prefix(
+            main_topic, additional_info, research_questions, final_codebook, current_codebook, concept_table, feedback
+        ) + transcript_section(post_transcript)
+
     
 class GroupCodes:
     @staticmethod
@@ -0,0 +1,141 @@
+import json
+import re
+import subprocess
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Pushshift dumps are compressed with --long=31, which needs a 2 GB window to decompress.
+MAX_WINDOW_SIZE = 1 << 31
+READ_SIZE = 1 << 22
+
+# (subreddit, raw JSON line, decoded record)
+DumpRecord = Tuple[Optional[str], bytes, Dict[str, Any]]
+
+
+def iter_zst_chunks(path: str, zstd_executable: Optional[str] = None, read_size: int = READ_SIZE) -> Iterator[bytes]:
+    if zstandard is not None:
+        with open(path, "rb") as fh:
+            dctx = zstandard.ZstdDecompressor(max_window_size=MAX_WINDOW_SIZE)
+            with dctx.stream_reader(fh, read_size=read_size) as reader:
+                while True:
+                    chunk = reader.read(read_size)
+                    if not chunk:
+                        return
+                    yield chunk
+
+    # Without the python bindings fall back to the bundled zstd binary, still without a shell or temp file.
+    if not zstd_executable:
+        raise RuntimeError("zstandard is not installed and no zstd executable was given")
+    process = subprocess.Popen(
+        [zstd_executable, "-cdq", "--memory=2048MB", path],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        while True:
+            chunk = process.stdout.read(read_size)
+            if not chunk:
+                break
+            yield chunk
+        stderr = process.stderr.read().decode(errors="replace").strip()
+        if process.wait() != 0:
+            raise RuntimeError(f"zstd failed on {path}: {stderr}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        process.stderr.close()
+
+
+def subreddit_pattern(subreddits: Iterable[str]) -> "re.Pattern[bytes]":
+    # Any whitespace after ':' is accepted, as dumps re-serialized by other tools may use tabs or more spaces.
+    # One alternation scans each chunk once however many subreddits are wanted; a bytes.find per subreddit
+    # costs a full scan each.
+    names = b"|".join(re.escape(json.dumps(subreddit).encode()) for subreddit in sorted(set(subreddits)))
+    return re.compile(rb'"subreddit":\s*(?:' + names + b")")
+
+
+def _candidate_spans(data: bytes, end: int, pattern: "re.Pattern[bytes]") -> Iterator[Tuple[int, int]]:
+    # Finds the lines containing a match without splitting the chunk, so chunks with no match cost one
+    # regex scan and no per-line Python work.
+    pos = 0
+    while True:
+        match = pattern.search(data, pos, end)
+        if match is None:
+            return
+        start = data.rfind(b"\n", 0, match.start()) + 1
+        stop = data.find(b"\n", match.start(), end)
+        if stop == -1:
+            stop = end
+        yield start, stop
+        pos = stop
+
+
+def iter_dump_records(
+    path: str,
+    subreddits: Optional[Iterable[str]] = None,
+    zstd_executable: Optional[str] = None,
+) -> Iterator[DumpRecord]:
+    # Streams the records of a .zst dump. With subreddits set, only lines whose bytes name one of them
+    # are decoded, and a decoded record is kept only if its top-level subreddit matches exactly.
+    wanted = set(subreddits) if subreddits else None
+    pattern = subreddit_pattern(wanted) if wanted else None
+
+    def decode(line: bytes) -> Optional[DumpRecord]:
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(record, dict):
+            return None
+        subreddit = record.get("subreddit")
+        if wanted is not None and subreddit not in wanted:
+            return None
+        return subreddit, line, record
+
+    pending = b""
+    for chunk in iter_zst_chunks(path, zstd_executable):
+        data = pending + chunk if pending else chunk
+        cut = data.rfind(b"\n") + 1
+        pending = data[cut:]
+        if not cut:
+            continue
+        if pattern is None:
+            lines = data[:cut].split(b"\n")
+        else:
+            lines = [data[start:stop] for start, stop in _candidate_spans(data, cut, pattern)]
+        for line in lines:
+            decoded = decode(line)
+            if decoded is not None:
+                yield decoded
+
+    if pending:
+        if pattern is None or pattern.search(pending):
+            decoded = decode(pending)
+            if decoded is not None:
+                yield decoded
+
+
+def iter_dump_batches(
+    path: str,
+    subreddits: Optional[Iterable[str]] = None,
+    zstd_executable: Optional[str] = None,
+    batch_size: int = 5000,
+) -> Iterator[List[DumpRecord]]:
+    # Groups records so async callers can pull them with one thread hop per batch.
+    batch = []
+    for item in iter_dump_records(path, subreddits, zstd_executable):
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,274 @@
+import json
+import multiprocessing
+import os
+import queue
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+POST_COLUMNS = [
+    "id", "workspace_id", "title", "over_18", "subreddit", "score", "thumbnail", "permalink",
+    "is_self", "domain", "created_utc", "url", "num_comments", "selftext", "author",
+    "hide_score", "subreddit_id",
+]
+
+COMMENT_COLUMNS = [
+    "id", "workspace_id", "post_id", "parent_id", "body", "author", "created_utc", "link_id",
+    "controversiality", "score_hidden", "score", "subreddit_id", "retrieved_on", "gilded",
+]
+
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+def iter_json_records(path: str, chunk_size: int = 1 << 20) -> Iterator[Any]:
+    # Yields the elements of a top-level JSON array, or the lines of a JSONL file, without
+    # ever holding more than one chunk plus one record in memory.
+    decoder = json.JSONDecoder(strict=False)
+    with open(path, "r", encoding="utf-8") as f:
+        buf = f.read(chunk_size)
+        pos = _SEPARATORS.match(buf).end()
+        if pos >= len(buf) or buf[pos] != "[":
+            f.seek(0)
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield decoder.decode(line)
+                except json.JSONDecodeError as e:
+                    print(f"Skipping malformed line {line_number} in {path}: {e}")
+            return
+
+        pos += 1
+        eof = False
+        while True:
+            pos = _SEPARATORS.match(buf, pos).end()
+            if pos >= len(buf):
+                if eof:
+                    raise ValueError(f"Unterminated JSON array in {path}")
+                more = f.read(chunk_size)
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                record, end = None, len(buf)
+            if end >= len(buf) and not eof:
+                # The record may continue past the end of the buffer; read more and decode it again.
+                more = f.read(chunk_size)
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+                continue
+            yield record
+            pos = end
+            if pos > chunk_size:
+                buf, pos = buf[pos:], 0
+
+
+def _created_utc(record: Dict[str, Any]) -> float:
+    try:
+        return float(record.get("created_utc", 0))
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _strip_kind(fullname: Any) -> Optional[str]:
+    value = str(fullname or "")
+    return value.split("_")[1] if "_" in value else None
+
+
+def post_to_row(p: Dict[str, Any], workspace_id: str, created: float) -> Optional[Tuple]:
+    if not p.get("id"):
+        return None
+    return (
+        p["id"],
+        workspace_id,
+        p.get("title", ""),
+        p.get("over_18", 0),
+        p.get("subreddit", ""),
+        p.get("score", 0),
+        p.get("thumbnail", ""),
+        p.get("permalink", ""),
+        p.get("is_self", 0),
+        p.get("domain", ""),
+        int(created),
+        p.get("url", ""),
+        p.get("num_comments", 0),
+        p.get("selftext", ""),
+        p.get("author", ""),
+        p.get("hide_score", 0),
+        p.get("subreddit_id", ""),
+    )
+
+
+def comment_to_row(c: Dict[str, Any], workspace_id: str, created: float) -> Optional[Tuple]:
+    link_id = _strip_kind(c.get("link_id"))
+    parent_id = _strip_kind(c.get("parent_id"))
+    if not c.get("id") or not link_id or not parent_id:
+        return None
+    return (
+        c["id"],
+        workspace_id,
+        link_id,
+        parent_id,
+        c.get("body", ""),
+        c.get("author", ""),
+        int(created),
+        link_id,
+        c.get("controversiality", 0),
+        c.get("score_hidden", False),
+        c.get("score", 0),
+        c.get("subreddit_id", ""),
+        c.get("retrieved_on", 0),
+        c.get("gilded", 0),
+    )
+
+
+def record_to_row(
+    record: Any,
+    file_type: str,
+    workspace_id: str,
+    start_ts: Optional[float] = None,
+    end_ts: Optional[float] = None,
+) -> Optional[Tuple]:
+    if not isinstance(record, dict):
+        return None
+    created = _created_utc(record)
+    if (start_ts and created < start_ts) or (end_ts and created > end_ts):
+        return None
+    if file_type == "submissions":
+        return post_to_row(record, workspace_id, created)
+    return comment_to_row(record, workspace_id, created)
+
+
+def file_type_for(name: str) -> Optional[str]:
+    base = os.path.basename(name)
+    if base.startswith("RS_") or "_submissions." in base:
+        return "submissions"
+    if base.startswith("RC_") or "_comments." in base:
+        return "comments"
+    return None
+
+
+def iter_row_batches(
+    path: str,
+    file_type: str,
+    workspace_id: str,
+    start_ts: Optional[float] = None,
+    end_ts: Optional[float] = None,
+    batch_size: int = 5000,
+) -> Iterator[Tuple[List[Tuple], Optional[str], int]]:
+    # Yields (rows, last subreddit seen, records read so far) for posts or comments in insert column order.
+    rows: List[Tuple] = []
+    subreddit = None
+    records = 0
+
+    for index, record in enumerate(iter_json_records(path)):
+        # Exports from the frontend start with a metadata object that is not a Reddit record.
+        if index == 0 and isinstance(record, dict) and "id" not in record:
+            continue
+        if not isinstance(record, dict):
+            continue
+        records += 1
+
+        row = record_to_row(record, file_type, workspace_id, start_ts, end_ts)
+        if row is None:
+            continue
+        subreddit = record.get("subreddit", subreddit)
+        rows.append(row)
+
+        if len(rows) >= batch_size:
+            yield rows, subreddit, records
+            rows = []
+
+    yield rows, subreddit, records
+
+
+# Messages yielded by iter_file_batches / iter_parallel_file_batches:
+#   ("rows", file_index, rows, subreddit, records_read)
+#   ("done", file_index, None, None, records_read)
+#   ("error", file_index, error_type, message, records_read)
+FileBatch = Tuple[str, int, Any, Any, int]
+
+
+def _file_batches(index: int, path: str, file_type: str, workspace_id: str, start_ts, end_ts, batch_size: int) -> Iterator[FileBatch]:
+    records = 0
+    try:
+        for rows, subreddit, records in iter_row_batches(path, file_type, workspace_id, start_ts, end_ts, batch_size):
+            yield ("rows", index, rows, subreddit, records)
+    except Exception as e:
+        yield ("error", index, type(e).__name__, str(e), records)
+        return
+    yield ("done", index, None, None, records)
+
+
+def iter_file_batches(files: List[Dict[str, str]], workspace_id: str, start_ts=None, end_ts=None, batch_size: int = 5000) -> Iterator[FileBatch]:
+    for index, file in enumerate(files):
+        yield from _file_batches(index, file["path"], file["type"], workspace_id, start_ts, end_ts, batch_size)
+
+
+def _parse_worker(tasks, results, workspace_id: str, start_ts, end_ts, batch_size: int):
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        index, path, file_type = task
+        for message in _file_batches(index, path, file_type, workspace_id, start_ts, end_ts, batch_size):
+            results.put(message)
+
+
+def iter_parallel_file_batches(
+    files: List[Dict[str, str]],
+    workspace_id: str,
+    start_ts=None,
+    end_ts=None,
+    batch_size: int = 5000,
+    workers: int = 2,
+    max_pending_batches: int = 16,
+) -> Iterator[FileBatch]:
+    # Decodes files in separate processes; the caller stays the only SQLite writer. The results queue is
+    # bounded so fast parsers block instead of piling batches up in memory while the writer catches up.
+    # spawn (not fork) because the callers live inside a threaded uvicorn worker.
+    ctx = multiprocessing.get_context("spawn")
+    tasks = ctx.Queue()
+    results = ctx.Queue(maxsize=max_pending_batches)
+    for index, file in enumerate(files):
+        tasks.put((index, file["path"], file["type"]))
+    workers = max(1, min(workers, len(files)))
+    for _ in range(workers):
+        tasks.put(None)
+
+    processes = [
+        ctx.Process(target=_parse_worker, args=(tasks, results, workspace_id, start_ts, end_ts, batch_size), daemon=True)
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    remaining = len(files)
+    try:
+        while remaining:
+            try:
+                message = results.get(timeout=1.0)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    raise RuntimeError("Reddit parser processes exited before finishing all files")
+                continue
+            if message[0] in ("done", "error"):
+                remaining -= 1
+            yield message
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join(timeout=5)
+        tasks.close()
+        results.close()
+
+
+def default_ingest_workers() -> int:
+    return max(1, min(4, (os.cpu_count() or 2) - 1))
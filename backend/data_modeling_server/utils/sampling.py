@@ -0,0 +1,67 @@
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+def quantile_strata(values: np.ndarray, q: int = 4) -> Optional[np.ndarray]:
+    # Same bins as pd.qcut(values, q, labels=False, duplicates="drop"): right-closed intervals with the
+    # lowest edge included. None when every value is equal and there is nothing to stratify on.
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, q + 1)))
+    if len(edges) < 2:
+        return None
+    return np.clip(np.searchsorted(edges, values, side="left") - 1, 0, len(edges) - 2)
+
+
+def allocate_proportionally(counts: np.ndarray, size: int) -> np.ndarray:
+    # Largest-remainder split of size across strata in proportion to their counts.
+    total = int(counts.sum())
+    if total == 0 or size <= 0:
+        return np.zeros_like(counts)
+    exact = counts * (min(size, total) / total)
+    allocation = exact.astype(np.int64)
+    leftover = min(size, total) - int(allocation.sum())
+    if leftover > 0:
+        allocation[np.argsort(allocation - exact, kind="stable")[:leftover]] += 1
+    return np.minimum(allocation, counts)
+
+
+def stratified_groups(
+    post_ids: Sequence[str],
+    lengths: Sequence[int],
+    group_sizes: List[int],
+    seed: int,
+    q: int = 4,
+) -> List[List[str]]:
+    # Draws consecutive groups without replacement, each stratified by transcript-length quartile.
+    rng = np.random.default_rng(seed)
+    ids = np.asarray(post_ids, dtype=object)
+    strata = quantile_strata(np.asarray(lengths, dtype=np.float64), q)
+
+    if strata is None:
+        order = rng.permutation(len(ids))
+        bounds = np.cumsum([0] + [int(size) for size in group_sizes])
+        return [ids[order[start:stop]].tolist() for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    remaining = np.ones(len(ids), dtype=bool)
+    groups = []
+    for size in group_sizes:
+        candidates = np.flatnonzero(remaining)
+        if len(candidates) == 0:
+            groups.append([])
+            continue
+        candidate_strata = strata[candidates]
+        allocation = allocate_proportionally(np.bincount(candidate_strata, minlength=int(strata.max()) + 1), int(size))
+        chosen = [
+            rng.choice(candidates[candidate_strata == stratum], allocation[stratum], replace=False)
+            for stratum in np.flatnonzero(allocation)
+        ]
+        chosen = np.concatenate(chosen) if chosen else np.empty(0, dtype=np.int64)
+        remaining[chosen] = False
+        groups.append(ids[chosen].tolist())
+    return groups
+
+
+def random_sample(post_ids: Sequence[str], size: int, seed: int) -> List[str]:
+    rng = np.random.default_rng(seed)
+    ids = np.asarray(post_ids, dtype=object)
+    return ids[rng.choice(len(ids), min(size, len(ids)), replace=False)].tolist()
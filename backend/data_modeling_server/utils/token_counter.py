@@ -0,0 +1,78 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+# Strings up to this length are used as cache keys directly; longer ones by digest so the cache does not pin them.
+_INLINE_KEY_LENGTH = 256
+
+
+class TokenCounter:
+    # Memoizes a provider's token counting function. LLM objects are created per request, so counters are
+    # shared per model through get_token_counter and the cache survives across requests and routes.
+    def __init__(self, count_fn: Callable[[str], int], max_entries: int = 100_000):
+        self.count_fn = count_fn
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(text: str) -> Hashable:
+        if len(text) <= _INLINE_KEY_LENGTH:
+            return text
+        return (len(text), hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest())
+
+    def count(self, text: str) -> int:
+        key = self._key(text)
+        with self._lock:
+            tokens = self._cache.get(key)
+            if tokens is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return tokens
+            self.misses += 1
+        tokens = self.count_fn(text)
+        with self._lock:
+            self._cache[key] = tokens
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return tokens
+
+    __call__ = count
+
+    def count_many(self, texts: Iterable[str]) -> List[int]:
+        return [self.count(text) for text in texts]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+_counters: Dict[Tuple[str, str], TokenCounter] = {}
+_counters_lock = threading.Lock()
+
+
+def _model_key(llm_instance: Any) -> Optional[Tuple[str, str]]:
+    model = getattr(llm_instance, "model", None) or getattr(llm_instance, "model_name", None)
+    if not model:
+        return None
+    return type(llm_instance).__name__, str(model)
+
+
+def get_token_counter(llm_instance: Any) -> TokenCounter:
+    if isinstance(llm_instance, TokenCounter):
+        return llm_instance
+    key = _model_key(llm_instance)
+    if key is None:
+        # Without a model name there is nothing safe to share on; the counter lives as long as the caller's.
+        return TokenCounter(llm_instance.get_num_tokens)
+    counter = _counters.get(key)
+    if counter is None:
+        with _counters_lock:
+            counter = _counters.get(key)
+            if counter is None:
+                counter = TokenCounter(llm_instance.get_num_tokens)
+                _counters[key] = counter
+    return counter
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Optional
+
+_DONE = object()
+
+# function_id -> progress of the pool currently running for it, read by /get-function-progress.
+_active_pools: Dict[str, "WorkPoolProgress"] = {}
+
+
+class WorkPoolProgress:
+    def __init__(self, total: int = 0):
+        self.total = total
+        self.processed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.started_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started_at
+        rate = self.processed / elapsed if self.processed and elapsed > 0 else 0.0
+        remaining = max(self.total - self.processed, 0)
+        return {
+            "processed": self.processed,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "elapsed_seconds": round(elapsed, 1),
+            "items_per_minute": round(rate * 60, 2),
+            "eta_seconds": round(remaining / rate, 1) if rate else None,
+        }
+
+
+def get_work_pool_progress(function_id: str) -> Optional[WorkPoolProgress]:
+    return _active_pools.get(function_id)
+
+
+async def run_work_pool(
+    items: AsyncIterable[Any],
+    handle: Callable[[Any], Awaitable[Any]],
+    concurrency: int,
+    progress: Optional[WorkPoolProgress] = None,
+    progress_key: Optional[str] = None,
+    weight: Callable[[Any], int] = lambda item: 1,
+    should_pause: Optional[Callable[[], bool]] = None,
+    on_item_done: Optional[Callable[[Any], Any]] = None,
+    queue_size: Optional[int] = None,
+    pause_interval: float = 0.5,
+) -> WorkPoolProgress:
+    """
+    Feeds items from a producer into a fixed number of consumers, so one slow item only holds its own
+    consumer instead of a whole batch. The bounded queue keeps the producer at most queue_size items
+    ahead, and should_pause holds consumers back before starting new items while it returns True.
+
+    A failing handle is counted and logged; it does not stop the pool. on_item_done is called after every
+    item either way. An exception from the producer stops the pool and is raised.
+    """
+    concurrency = max(1, concurrency)
+    progress = progress or WorkPoolProgress()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size or concurrency)
+
+    async def produce():
+        async for item in items:
+            await queue.put(item)
+        for _ in range(concurrency):
+            await queue.put(_DONE)
+
+    async def consume():
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            if should_pause is not None:
+                while should_pause():
+                    await asyncio.sleep(pause_interval)
+            progress.in_flight += 1
+            try:
+                await handle(item)
+            except Exception as e:
+                progress.failed += weight(item)
+                print(f"[WORK POOL] Item failed: {e}")
+            finally:
+                progress.in_flight -= 1
+                progress.processed += weight(item)
+            if on_item_done is not None:
+                try:
+                    result = on_item_done(item)
+                    if asyncio.iscoroutine(result):
+                        await result
+                except Exception as e:
+                    print(f"[WORK POOL] Progress callback failed: {e}")
+
+    if progress_key:
+        _active_pools[progress_key] = progress
+    tasks = [asyncio.create_task(produce())] + [asyncio.create_task(consume()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        if progress_key:
+            _active_pools.pop(progress_key, None)
+    return progress
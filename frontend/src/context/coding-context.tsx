@@ -1,4 +1,4 @@
-import React, { createContext, useState, useEffect, useContext, FC, useMemo } from 'react';
+import React, { createContext, useState, useEffect, useContext, FC, useMemo, useRef } from 'react';
 import { useLocation } from 'react-router-dom';
 import { useLoadingContext } from './loading-context';
 import { PAGE_ROUTES } from '../constants/Coding/shared';
@@ -60,6 +60,20 @@ export const CodingContext = createContext<ICodingContext>({
     dispatchSampledCopyPostResponse: async () => {}
 });
 
+// Changed rows of a table as sent by save-coding-context: ids to drop, then rows to replace in place or append.
+type RowPatch<T> = { deleted: string[]; upserted: T[] };
+
+function applyRowPatch<T>(rows: T[], patch: RowPatch<T>): T[] {
+    const rowId = (row: T) => (row as { id?: string }).id;
+    const deleted = new Set(patch.deleted);
+    const upserted = new Map(patch.upserted.map((row) => [rowId(row), row]));
+    const kept = rows
+        .filter((row) => !deleted.has(rowId(row) ?? ''))
+        .map((row) => upserted.get(rowId(row)) ?? row);
+    const present = new Set(kept.map(rowId));
+    return [...kept, ...patch.upserted.filter((row) => !present.has(rowId(row)))];
+}
+
 export const CodingProvider: FC<ILayout> = ({ children }) => {
     const location = useLocation();
     const { loadingState, lockedUpdate } = useLoadingContext();
@@ -83,6 +97,13 @@ export const CodingProvider: FC<ILayout> = ({ children }) => {
         []
     );
 
+    // Server state version each patched table was last known to match; null sends the full table back.
+    const tableVersions = useRef<Record<string, number | null>>({});
+    const versionedRequest = (table: string) => ({
+        responseMode: 'diff',
+        baseVersion: tableVersions.current[table] ?? null
+    });
+
     const saveCodingContext = async (operationType: string, payload: any) => {
         try {
             const { data, error } = await fetchData(REMOTE_SERVER_ROUTES.SAVE_CODING_CONTEXT, {
@@ -287,6 +308,10 @@ export const CodingProvider: FC<ILayout> = ({ children }) => {
                 try {
                     const fetchedData = await fetchStates(statesToFetch);
                     if (fetchedData) {
+                        ['conceptOutlineTable', 'initialCodebookTable'].forEach((table) => {
+                            if (fetchedData[table] !== undefined)
+                                tableVersions.current[table] = fetchedData.version ?? null;
+                        });
                         statesToFetch.forEach((stateName) => {
                             console.log(`Setting state: ${stateName}`, fetchedData[stateName]);
                             if (
@@ -395,10 +420,13 @@ export const CodingProvider: FC<ILayout> = ({ children }) => {
             dispatchConceptOutlinesTable: (action: ConceptsTableAction) =>
                 lockedUpdate('dispatch-concepts-table', async () => {
                     const data = await saveCodingContext('dispatchConceptOutlinesTable', {
-                        action
+                        action,
+                        ...versionedRequest('conceptOutlineTable')
                     });
-                    if (data.conceptOutlineTable) setConceptTableState(data.conceptOutlineTable);
+                    if (data.patch) setConceptTableState((prev) => applyRowPatch(prev, data.patch));
+                    else if (data.conceptOutlineTable) setConceptTableState(data.conceptOutlineTable);
                     else setConceptTableState((prev) => [...prev]);
+                    tableVersions.current.conceptOutlineTable = data.version ?? null;
                     return data;
                 }),
             updateContext: (updates: Partial<ICodingContext>) =>
@@ -426,6 +454,7 @@ export const CodingProvider: FC<ILayout> = ({ children }) => {
                 lockedUpdate('reset-context', async () => {
                     const data = await saveCodingContext('resetContext', {});
                     if (data.success) {
+                        tableVersions.current = {};
                         setContextFilesState({});
                         setMainTopicState('');
                         setAdditionalInfoState('');
@@ -549,10 +578,14 @@ export const CodingProvider: FC<ILayout> = ({ children }) => {
             dispatchInitialCodebookTable: (action: InitialCodebookTableAction) =>
                 lockedUpdate('dispatch-initial-codebook-table', async () => {
                     const data = await saveCodingContext('dispatchInitialCodebookTable', {
-                        action
+                        action,
+                        ...versionedRequest('initialCodebookTable')
                     });
-                    if (data.initialCodebookTable)
+                    if (data.patch)
+                        setInitialCodebookTableState((prev) => applyRowPatch(prev, data.patch));
+                    else if (data.initialCodebookTable)
                         setInitialCodebookTableState(data.initialCodebookTable);
+                    tableVersions.current.initialCodebookTable = data.version ?? null;
                     return data;
                 })
         }),
@@ -36,22 +36,31 @@ const CodingLoader = () => {
     const [postsFinished, setPostsFinished] = useState<number>(0);
 
     const currentPostIds = headingText.includes('Final') ? unseenPostIds : sampledPostIds;
+    const functionName = headingText.includes('Final') ? 'final' : 'initial';
+
+    const { fetchData } = useApi();
+    const { currentWorkspace } = useWorkspaceContext();
 
     const handleWebsocketMessage = (message: string) => {
         console.log('Websocket message:', message);
-        const match = message.match(
-            /Dataset\s+([^}]+):\s+Generated codes for post\s+([^}]+)\.\.\./
-        );
-
-        if (match) {
-            console.log('Match:', match);
-            setPostsFinished((prev) => prev + 1);
+        if (!message.startsWith('{')) return;
+
+        try {
+            // The backend pushes the whole count of the running function, throttled, as progress events
+            // and a final done event.
+            const event = JSON.parse(message);
+            if (
+                (event.type === 'progress' || event.type === 'done') &&
+                event.name === functionName &&
+                event.workspace_id === currentWorkspace?.id
+            ) {
+                setPostsFinished(event.current ?? 0);
+            }
+        } catch (e) {
+            console.error('Invalid progress event:', e);
         }
     };
 
-    const { fetchData } = useApi();
-    const { currentWorkspace } = useWorkspaceContext();
-
     const getFunctionProgress = async () => {
         const { data, error } = await fetchData<{
             total: number;
@@ -59,7 +68,7 @@ const CodingLoader = () => {
         }>(REMOTE_SERVER_ROUTES.CHECK_FUNCTION_PROGRESS, {
             method: 'POST',
             body: JSON.stringify({
-                name: headingText.includes('Final') ? 'final' : 'initial',
+                name: functionName,
                 workspace_id: currentWorkspace!.id
             })
         });